@@ -0,0 +1,119 @@
+# encoding: UTF-8
+
+"""Common utilities of the virtual accelerators: EPICS database generation
+and cached working directories.
+"""
+
+import hashlib
+import logging
+import os
+
+from phantasy import __version__
+
+# name of the EPICS database file in working directory
+EPICSDB_FILENAME = "va.db"
+
+# record fields excluded from the database key, initial values are put to
+# the setpoint channels when the cached database is reused.
+_KEY_EXCLUDED_FIELDS = ("VAL",)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def iter_epicsdb(epicsdb):
+    """Generate the text lines of EPICS database.
+
+    Parameters
+    ----------
+    epicsdb : list
+        List of records, each record is a tuple of (record type, record
+        name, dict of fields), the fields of value None are ignored.
+    """
+    for rtype, rname, fields in epicsdb:
+        yield 'record({}, "{}") {{\r\n'.format(rtype, rname)
+        for name, value in fields.items():
+            if value is None:
+                continue
+            if isinstance(value, (int, float)):
+                yield '    field("{}", {})\r\n'.format(name, value)
+            else:
+                yield '    field("{}", "{}")\r\n'.format(name, value)
+        yield "}\r\n\r\n"
+
+
+def write_epicsdb(epicsdb, buf):
+    """Write EPICS database *epicsdb* to *buf* in one pass, see
+    :func:`iter_epicsdb`.
+    """
+    buf.write(''.join(iter_epicsdb(epicsdb)))
+
+
+def epicsdb_key(epicsdb, *args):
+    """Return the hash of EPICS database *epicsdb* and the extra string
+    arguments, initial values are not counted.
+
+    The key is determined by the layout (records), the settings schema
+    (setpoint fields and limits) and the channel prefix (record names).
+    """
+    h = hashlib.sha1(__version__.encode())
+    for arg in args:
+        h.update(str(arg).encode())
+    for rtype, rname, fields in epicsdb:
+        h.update('{}|{}'.format(rtype, rname).encode())
+        for name, value in fields.items():
+            if name not in _KEY_EXCLUDED_FIELDS and value is not None:
+                h.update('|{}={}'.format(name, value).encode())
+    return h.hexdigest()
+
+
+def prepare_cached_work_dir(cache_dir, prefix, epicsdb, *args):
+    """Return a tuple of the path of cached working directory and if the
+    EPICS database in it can be reused, the directory is created if not
+    exists.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Root directory of all the cached working directories.
+    prefix : str
+        Prefix of the name of working directory, e.g. 'va_flame'.
+    epicsdb : list
+        List of EPICS records, see :func:`iter_epicsdb`.
+
+    Other Parameters
+    ----------------
+    args :
+        Extra arguments counted in the key of working directory.
+    """
+    key = epicsdb_key(epicsdb, *args)
+    work_dir = os.path.join(os.path.abspath(os.path.expanduser(cache_dir)),
+                            "{}_{}".format(prefix, key))
+    epicsdbpath = os.path.join(work_dir, EPICSDB_FILENAME)
+    if os.path.isfile(epicsdbpath):
+        _LOGGER.info("VA: Reuse cached working directory: %s", work_dir)
+        return work_dir, True
+    os.makedirs(work_dir, exist_ok=True)
+    # write to a temporary file then rename, never reuse a partial database
+    tmppath = epicsdbpath + ".{}.tmp".format(os.getpid())
+    with open(tmppath, "w") as outfile:
+        write_epicsdb(epicsdb, outfile)
+    os.replace(tmppath, epicsdbpath)
+    _LOGGER.info("VA: Write EPICS database to %s", epicsdbpath)
+    return work_dir, False
+
+
+def link_data_files(data_dir, work_dir):
+    """Symlink all the files of *data_dir* to *work_dir*, existing links
+    are kept.
+    """
+    for datafile in os.listdir(data_dir):
+        srcpath = os.path.join(data_dir, datafile)
+        if not os.path.isfile(srcpath):
+            continue
+        destpath = os.path.join(work_dir, datafile)
+        if os.path.islink(destpath):
+            if os.readlink(destpath) == srcpath:
+                continue
+            os.remove(destpath)
+        os.symlink(srcpath, destpath)
+        _LOGGER.debug("VA: Link data file %s to %s", srcpath, destpath)
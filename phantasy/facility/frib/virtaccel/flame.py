@@ -4,18 +4,22 @@
 
 import json
 import logging
+import multiprocessing
 import numpy
 import math
 import os.path
-import random
 import re
 import shutil
 import subprocess
 import tempfile
 import time
+import traceback
 from collections import OrderedDict
+from collections import deque
+from contextlib import contextmanager
 from copy import deepcopy
 from datetime import datetime
+from multiprocessing.connection import wait as _wait_connections
 from flame_utils import generate_latfile
 
 from io import StringIO
@@ -65,9 +69,13 @@ from phantasy.library.layout import TargetElement
 from phantasy.library.layout import WedgeElement
 from phantasy.library.layout import ELDElement
 from phantasy.library.lattice import FlameLatticeFactory
+from .common import EPICSDB_FILENAME
+from .common import prepare_cached_work_dir
+from .common import write_epicsdb
 
 DEFAULT_NOISE_LEVEL = 0.001  # i.e. 0.1%
 DEFAULT_REP_RATE = 1         # Hz
+DEFAULT_CHECKPOINT_INTERVAL = 20  # elements between BeamState checkpoints
 
 # configuration options
 
@@ -80,6 +88,7 @@ CONFIG_DRIFT_MASK = "drift_mask"
 # default values
 
 _TEMP_DIRECTORY_SUFFIX = "_va_flame"
+_CACHE_DIRECTORY_PREFIX = "va_flame"
 
 # _DEFAULT_ERROR_VALUE = 0.0
 
@@ -117,6 +126,11 @@ def start(layout, **kwargs):
         Path of directory containing FLAME data files.
     work_dir :
         Path of directory for execution of FLAME.
+    segments : list
+        Names of the elements at which the lattice is split into segments
+        propagated in parallel worker processes.
+    cache_dir : str
+        Path of directory for the cached working directories.
     """
 
     global _VIRTUAL_ACCELERATOR
@@ -163,6 +177,22 @@ def build_virtaccel(layout, **kwargs):
         Path of directory for execution of FLAME.
     machine : str
         String prefix to all PV names, override Config defined one.
+    checkpoint_interval : int
+        Number of elements between BeamState checkpoints, from which the
+        propagation resumes when settings change, default is 20.
+    deadband : float
+        If defined, READ channels changed within deadband are not put,
+        default is None, i.e. put all the channels every cycle.
+    segments : list
+        Names of the elements at which the lattice is split, each segment
+        is propagated in a worker process and passes the exit BeamState to
+        the downstream one, default is None, i.e. propagate the whole
+        lattice in the VA process.
+    cache_dir : str
+        If defined and *work_dir* is not defined, the working directory
+        with the generated EPICS database is kept in this directory, and
+        reused by the VA of the same layout, settings schema and channel
+        prefix, default is None, i.e. use a temporary working directory.
 
     Returns
     -------
@@ -194,6 +224,11 @@ class VirtualAcceleratorFactory(object):
         self.rate = kwargs.get("rate", DEFAULT_REP_RATE)
         self.noise = kwargs.get("noise", DEFAULT_REP_RATE)
         self.pv_suffix = kwargs.get('pv_suffix', '') # only for rate/noise/cnt/status PVs.
+        self.checkpoint_interval = kwargs.get("checkpoint_interval",
+                                              DEFAULT_CHECKPOINT_INTERVAL)
+        self.deadband = kwargs.get("deadband", None)
+        self.segments = kwargs.get("segments", None)
+        self.cache_dir = kwargs.get("cache_dir", None)
 
         # machine: read from config file, the PV prefix
         if self.config is not None:
@@ -351,7 +386,11 @@ class VirtualAcceleratorFactory(object):
         va = VirtualAccelerator(latfactory, settings, chanprefix, data_dir, work_dir,
                                 noise=self.noise,
                                 rate=self.rate,
-                                pv_suffix=self.pv_suffix)
+                                pv_suffix=self.pv_suffix,
+                                checkpoint_interval=self.checkpoint_interval,
+                                deadband=self.deadband,
+                                segments=self.segments,
+                                cache_dir=self.cache_dir)
 
         for elem in self.layout.iter(start=self.start, end=self.end):
             # check drift mask first
@@ -579,9 +618,28 @@ class VirtualAccelerator(object):
         # suffix for noise/rate/cnt/status PVs
         self._pv_suffix = kws.get('pv_suffix', '')
 
+        # interval (number of elements) of BeamState checkpoints, propagation
+        # resumes from the checkpoint just upstream of the first changed
+        # element.
+        self._checkpoint_interval = max(1, int(kws.get(
+            'checkpoint_interval', DEFAULT_CHECKPOINT_INTERVAL)))
+        # if settings changed since the last cycle
+        self._settings_changed = True
+        # skip putting the READ channels changed within deadband, None: put all
+        self._deadband = kws.get('deadband', None)
+        # flat settings array of all CSET channels, see _init_settings_array()
+        self._setting_values = None
+        self._rng = numpy.random.default_rng()
+        # names of the elements at which the lattice is split into segments
+        self._segments = kws.get('segments', None)
+        self._pool = None
+        # root directory of the cached working directories
+        self._cache_dir = kws.get('cache_dir', None)
+
         self._started = False
         self._continue = False
         self._rm_work_dir = False
+        self._cached_work_dir = False
 
         self._ioc_process = None
         self._ioc_logfile = None
@@ -804,6 +862,11 @@ class VirtualAccelerator(object):
             execute_error = e
         finally:
             _LOGGER.info("VA: Cleanup")
+            if self._pool is not None:
+                _LOGGER.debug("VA: Cleanup: stop segment workers")
+                self._pool.close()
+                self._pool = None
+
             if self._subscriptions is not None:
                 _LOGGER.debug("VA: Cleanup: close connections")
                 for sub in self._subscriptions:
@@ -829,6 +892,11 @@ class VirtualAccelerator(object):
             else:
                 _LOGGER.debug("VA: Cleanup: work directory is NONE")
 
+            if self._cached_work_dir:
+                # pick up the cached working directory at next start
+                self.work_dir = None
+                self._cached_work_dir = False
+
             self._started = False
             self._continue = False
 
@@ -840,16 +908,21 @@ class VirtualAccelerator(object):
     def _co_execute(self):
         """Execute the virtual accelerator. This includes the following:
 
-        1. Creating a temporary working directory for execution of FLAME.
+        1. Creating a temporary working directory for execution of FLAME,
+           or reuse the cached one.
         2. Set up the working directory by symlinking from the data directory.
-        3. Writing the EPICS DB to the working directory (va.db).
+        3. Writing the EPICS DB to the working directory (va.db), unless
+           the cached one is reused.
         4. Starting the softIoc and channel initializing monitors.
         5. Add noise to the settings for all input (CSET) channels.
-        6. Create or update the FLAME machine configuration.
-        7. Propagate the FLAME simulation and read the results.
+        6. Create or update the FLAME machine configuration, only the
+           elements with changed configuration are reconfigured.
+        7. Propagate the FLAME simulation from the checkpoint upstream of
+           the first changed element and read the results.
         8. Update the READ channels of all devives.
         9. Update the REST channels of input devies.
-        10. Repeat from step #5.
+        10. Repeat from step #5, skip #5-#7 if neither the settings nor the
+            noise level changed.
         """
         _LOGGER.debug("VA: Execute virtual accelerator")
         _LOGGER.info("VA: Running at " + self._ts_now)
@@ -909,6 +982,18 @@ class VirtualAccelerator(object):
             ])))
         _LOGGER.info("VA: MPS PV is " + chan_mps_stat)
 
+        # Channels for execution timing and health
+        chanstats = OrderedDict()
+        for key, desc, egu in _CycleStats.CHANNELS:
+            chanstats[key] = f"{chanprefix}:SVR:{key}{suffix_str}"
+            self._epicsdb.append(("ai", chanstats[key], OrderedDict([
+                ("DESC", desc),
+                ("VAL", 0.0),
+                ("PREC", 3),
+                ("EGU", egu)
+                ])))
+        _LOGGER.info("VA: Timing PVs are " + ", ".join(chanstats.values()))
+
         #
         chancharge = f"{chanprefix}:SVR:CHARGE{suffix_str}"
         self._epicsdb.append(("ai", chancharge, OrderedDict([
@@ -927,10 +1012,17 @@ class VirtualAccelerator(object):
         _LOGGER.info("VA: Init beam condition PV is " + chanbsrc)
 
         #
+        self._cached_work_dir = self.work_dir is None and self._cache_dir is not None
+        reuse_epicsdb = False
         if self.work_dir is not None:
             os.makedirs(self.work_dir)
             self._rm_work_dir = False
             latticepath = os.path.join(self.work_dir, "test.lat")
+        elif self._cached_work_dir:
+            self.work_dir, reuse_epicsdb = prepare_cached_work_dir(
+                self._cache_dir, _CACHE_DIRECTORY_PREFIX, self._epicsdb)
+            self._rm_work_dir = False
+            latticepath = None
         else:
             self.work_dir = tempfile.mkdtemp(_TEMP_DIRECTORY_SUFFIX)
             self._rm_work_dir = True
@@ -939,7 +1031,7 @@ class VirtualAccelerator(object):
         _LOGGER.info("VA: Working directory: %s", self._work_dir)
 
         # input file paths
-        epicsdbpath = os.path.join(self.work_dir, "va.db")
+        epicsdbpath = os.path.join(self.work_dir, EPICSDB_FILENAME)
 
         #output file paths
         epicslogpath = os.path.join(self.work_dir, "softioc.log")
@@ -951,18 +1043,26 @@ class VirtualAccelerator(object):
             abs_data_dir = os.path.abspath(self.data_dir)
             self._latfactory.dataDir = os.path.abspath(self.data_dir)
 
-        with open(epicsdbpath, "w") as outfile:
-            self._write_epicsdb(outfile)
-        _LOGGER.info("VA: Write EPICS database to %s", epicsdbpath)
-        #_LOGGER.debug("VA: Write EPICS database to %s", epicsdbpath)
+        if not self._cached_work_dir:
+            with open(epicsdbpath, "w") as outfile:
+                self._write_epicsdb(outfile)
+            _LOGGER.info("VA: Write EPICS database to %s", epicsdbpath)
 
         self._ioc_logfile = open(epicslogpath, "w")
-        self._ioc_process = Popen(["softIoc", "-d", "va.db"], cwd=self.work_dir,
+        self._ioc_process = Popen(["softIoc", "-d", EPICSDB_FILENAME], cwd=self.work_dir,
                                   stdout=self._ioc_logfile, stderr=subprocess.STDOUT)
         _LOGGER.debug("VA: Start EPICS soft IOC with log %s", epicslogpath)
 
         _LOGGER.debug("VA: Connecting to channels: {}".format(len(self._csetmap.keys())))
 
+        self._init_settings_array()
+
+        if reuse_epicsdb:
+            # initial values of the cached database are out of date
+            batch = catools.CABatch(zip(self._cset_names,
+                                        self._setting_values.tolist()))
+            batch.caput()
+
         self._subscriptions = []
         self._subscriptions.append(catools.camonitor(chanrate, self._handle_rate_monitor))
         self._subscriptions.append(catools.camonitor(channoise, self._handle_noise_monitor))
@@ -971,129 +1071,83 @@ class VirtualAccelerator(object):
         _LOGGER.debug("VA: Connecting to channels: Done")
 
         machine = None
+        # element configurations applied to machine
+        confs = None
+        # element names of FLAME lattice
+        output_map = None
+        # {element index: BeamState before propagating this element}
+        checkpoints = {}
+        # readback channels and the collected BeamState data
+        plan = None
+        bsrc_applied = None
+        self._published = {}
+        stats = self._stats = _CycleStats()
 
         while self._continue:
-            # update the RSET channels with new settings
-            batch = catools.CABatch()
-            for cset in self._csetmap.items():
-                name, field = self._fieldmap[cset[0]]
-                batch[cset[1][0]] = self._settings[name][field]
-            batch.caput()
-
-            settings = self._copy_settings_with_noise()
-            self._latfactory.settings = settings
-            lattice = self._latfactory.build()
-
             start = time.time()
-
-            if machine is None:
-                _LOGGER.debug("VA: Create FLAME machine from configuration")
-                machine = Machine(lattice.conf())
+            stats.start_cycle(start)
+
+            changed = []
+            with stats.stage('settings'):
+                # update the RSET channels with new settings
+                batch = catools.CABatch(zip(self._rset_names,
+                                            self._setting_values.tolist()))
+                batch.caput()
+                rebuild = self._settings_changed or self._noise != 0.0 \
+                          or self._bsrc is not bsrc_applied
+                if rebuild:
+                    self._settings_changed = False
+                    settings, setting_values = self._copy_settings_with_noise()
+
+            if rebuild:
+                with stats.stage('build'):
+                    self._latfactory.settings = settings
+                    lattice = self._latfactory.build()
+
+                with stats.stage('reconfigure'):
+                    if machine is None or len(machine) != len(lattice.elements):
+                        _LOGGER.debug("VA: Create FLAME machine from configuration")
+                        machine = Machine(lattice.conf())
+                        output_map = [elem[3].get('name', None)
+                                      for elem in lattice.elements]
+                        plan = _OutputPlan(output_map, self._elemmap,
+                                           self._readfieldmap)
+                        checkpoints = {}
+                        changed.append(0)
+                        if self._segments:
+                            if self._pool is None:
+                                self._pool = _SegmentPool(
+                                    _segment_bounds(output_map, self._segments),
+                                    self._checkpoint_interval)
+                            self._pool.configure(lattice.conf(), plan)
+                        # init beam config is applied to the new machine
+                        confs, bsrc_applied = None, None
+                    changed.extend(self._reconfigure(
+                        machine, lattice.elements, confs, bsrc_applied))
+                    confs = [elem[2] for elem in lattice.elements]
+                    bsrc_applied = self._bsrc
+
+                    if changed and latticepath is not None:
+                        _LOGGER.debug(f"VA: Write FLAME lattice file to {outfile}")
+                        generate_latfile(machine, latfile=latticepath)
+
+            if self._pool is not None:
+                # segments run in the worker processes, wait for the last
+                # segment to catch up with the changes within one period,
+                # then publish the latest BeamState data of all segments.
+                with stats.stage('propagate'):
+                    if changed:
+                        self._pool.submit()
+                    self._pool.collect(plan, max(
+                        0.0, 1.0 / self._rate - (time.time() - start)))
+            elif changed:
+                with stats.stage('propagate'):
+                    self._propagate(machine, min(changed), checkpoints, plan)
             else:
-                _LOGGER.debug("VA: Reconfigure FLAME machine from configuration")
-                for idx, elem in enumerate(lattice.elements):
-                    machine.reconfigure(idx, elem[2])
-
-                if self._bsrc is not None:
-                    _LOGGER.info("VA: Reconfigure FLAME machine with init beam config")
-                    machine.reconfigure(self._bsrc['index'], self._bsrc['properties'])
-
-            if latticepath is not None:
-                _LOGGER.debug(f"VA: Write FLAME lattice file to {outfile}")
-                generate_latfile(machine, latfile=latticepath)
-
-            _LOGGER.debug("VA: Allocate FLAME state from configuration")
-            S = machine.allocState({})
-
-            output_map = []
-            for elem in lattice.elements:
-                if 'name' in elem[3]:
-                    output_map.append(elem[3]['name'])
-                else:
-                    output_map.append(None)
-
-            batch = catools.CABatch()
-            for i in range(0, len(machine)):
-                machine.propagate(S, i, 1)
-
-                if output_map[i] in self._elemmap:
-                    elem = self._elemmap[output_map[i]]
-
-                    if isinstance(elem, BPMElement):
-                        x_centroid = S.moment0_env[0]/1.0e3 # convert mm to m
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.x_phy], x_centroid)
-                        batch[self._readfieldmap[elem.name][elem.fields.x_phy]] = x_centroid
-                        y_centroid = S.moment0_env[2]/1.0e3 # convert mm to m
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.y_phy], y_centroid)
-                        batch[self._readfieldmap[elem.name][elem.fields.y_phy]] = y_centroid
-                         # convert rad to deg and adjust for 161MHz sampling frequency
-                        phase = _normalize_phase(2.0 * S.ref_phis * (180.0 / math.pi))
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.phase_phy], phase)
-                        batch[self._readfieldmap[elem.name][elem.fields.phase_phy]] = phase
-                        energy = S.ref_IonEk/1.0e6 # convert eV to MeV
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.energy_phy], energy)
-                        batch[self._readfieldmap[elem.name][elem.fields.energy_phy]] = energy
-
-                    elif isinstance(elem, PMElement):
-                        x_centroid = S.moment0_env[0]/1.0e3 # convert mm to m
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.x], x_centroid)
-                        batch[self._readfieldmap[elem.name][elem.fields.x]] = x_centroid
-                        y_centroid = S.moment0_env[2]/1.0e3 # convert mm to m
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.y], y_centroid)
-                        batch[self._readfieldmap[elem.name][elem.fields.y]] = y_centroid
-                        x_rms = S.moment0_rms[0]/1.0e3 # convert mm to m
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.xrms], x_rms)
-                        batch[self._readfieldmap[elem.name][elem.fields.xrms]] = x_rms
-                        y_rms = S.moment0_rms[2]/1.0e3
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.yrms], y_rms)
-                        batch[self._readfieldmap[elem.name][elem.fields.yrms]] = y_rms
-
-                        sign = elem.sign
-                        xy_centroid = (sign*x_centroid + y_centroid)/math.sqrt(2.0) # convert mm to m
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.xy], xy_centroid)
-                        batch[self._readfieldmap[elem.name][elem.fields.xy]] = xy_centroid
-
-                        xy_rms = 1.0e-3*math.sqrt(
-                                (S.moment1_env[0, 0] + S.moment1_env[2, 2])*0.5
-                                + sign*S.moment1_env[0, 2]
-                        )
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.xyrms], xy_rms)
-                        batch[self._readfieldmap[elem.name][elem.fields.xyrms]] = xy_rms
-
-                        cxy = sign * S.moment1_env[0, 2] * 1e-6 / x_rms / y_rms
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.cxy], cxy)
-                        batch[self._readfieldmap[elem.name][elem.fields.cxy]] = cxy
-
-                    elif isinstance(elem, (FCElement, VDElement, TargetElement, DumpElement, WedgeElement)):
-                        x_centroid = S.moment0_env[0]/1.0e3 # convert mm to m
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.x], x_centroid)
-                        batch[self._readfieldmap[elem.name][elem.fields.x]] = x_centroid
-                        y_centroid = S.moment0_env[2]/1.0e3 # convert mm to m
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.y], y_centroid)
-                        batch[self._readfieldmap[elem.name][elem.fields.y]] = y_centroid
-                        x_rms = S.moment0_rms[0]/1.0e3 # convert mm to m
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.xrms], x_rms)
-                        batch[self._readfieldmap[elem.name][elem.fields.xrms]] = x_rms
-                        y_rms = S.moment0_rms[2]/1.0e3
-                        _LOGGER.debug("VA: Update read: %s to %s",
-                                      self._readfieldmap[elem.name][elem.fields.yrms], y_rms)
-                        batch[self._readfieldmap[elem.name][elem.fields.yrms]] = y_rms
+                _LOGGER.debug("VA: Settings not changed, skip FLAME execution")
 
-            batch.caput()
+            with stats.stage('publish'):
+                self._publish('readback', plan.channels, plan.values())
 
             _LOGGER.info("VA: FLAME execution time: %f s", time.time()-start)
 
@@ -1101,12 +1155,8 @@ class VirtualAccelerator(object):
             # before the device setting readbacks PVs.
             cothread.Yield()
 
-            batch = catools.CABatch()
-            for name, value in self._csetmap.items():
-                name, field = self._fieldmap[name]
-                _LOGGER.debug("VA: Update read: %s to %s", value[1], settings[name][field])
-                batch[value[1]] = settings[name][field]
-            batch.caput()
+            with stats.stage('publish'):
+                self._publish('setting', self._read_names, setting_values)
 
             # Sleep for a fraction (10%) of the total execution time
             # when one simulation costs more than 0.50 seconds.
@@ -1115,25 +1165,98 @@ class VirtualAccelerator(object):
             # then the scan server has a period of time to update
             # setpoints before the next run of IMPACT.
             delt = time.time() - start
+            stats.end_cycle(delt, 1.0 / self._rate)
+            batch = catools.CABatch(
+                (chanstats[k], v) for k, v in stats.values().items())
+            batch.caput()
             if delt > 0.50:
                 cothread.Sleep(delt * 0.1)
             else:
                 cothread.Sleep(1.0 / self._rate - delt)
 
+    def _reconfigure(self, machine, elements, confs, bsrc_applied):
+        """Reconfigure the elements of *machine* of which the configuration
+        changed from *confs* (None if *machine* is just created), and the
+        element of the init beam config if it is updated since
+        *bsrc_applied* or the element is reconfigured, return the list of
+        the indices of reconfigured elements.
+        """
+        changed = []
+        if confs is not None:
+            _LOGGER.debug("VA: Reconfigure FLAME machine from configuration")
+            for idx, elem in enumerate(elements):
+                if not _conf_equal(confs[idx], elem[2]):
+                    machine.reconfigure(idx, elem[2])
+                    changed.append(idx)
+                    if self._pool is not None:
+                        self._pool.reconfigure(idx, elem[2])
+
+        if self._bsrc is not None and (
+                self._bsrc is not bsrc_applied
+                or self._bsrc['index'] in changed):
+            _LOGGER.info("VA: Reconfigure FLAME machine with init beam config")
+            machine.reconfigure(self._bsrc['index'], self._bsrc['properties'])
+            changed.append(self._bsrc['index'])
+            if self._pool is not None:
+                self._pool.reconfigure(self._bsrc['index'],
+                                       self._bsrc['properties'])
+        return changed
+
+    def _propagate(self, machine, index, checkpoints, plan):
+        """Propagate FLAME machine from the checkpoint just upstream of
+        element *index* to the end, update *checkpoints* and the BeamState
+        data of all the output elements downstream.
+        """
+        k = max((i for i in checkpoints if i <= index), default=0)
+        if k == 0:
+            _LOGGER.debug("VA: Allocate FLAME state from configuration")
+            S = machine.allocState({})
+        else:
+            _LOGGER.debug("VA: Resume FLAME propagation from element %d", k)
+            S = checkpoints[k].clone()
+        rows, data = plan.rows, plan.data
+        for i in range(k, len(machine)):
+            if i > 0 and i % self._checkpoint_interval == 0:
+                checkpoints[i] = S.clone()
+            machine.propagate(S, i, 1)
+            if i in rows:
+                data[rows[i]] = _state_components(S)
+
+    def _publish(self, key, names, values):
+        """Put *values* to channels of *names*, if deadband is defined, skip
+        the channels of which the value changed within deadband since the
+        last put, *key* is the name of the channel group.
+        """
+        last = self._published.get(key)
+        if self._deadband is None or last is None:
+            idx = numpy.arange(len(names))
+            self._published[key] = numpy.array(values, dtype=float)
+        else:
+            idx = numpy.flatnonzero(~(numpy.abs(values - last) <= self._deadband))
+            last[idx] = values[idx]
+        _LOGGER.debug("VA: Update read of %d %s channels", idx.size, key)
+        if idx.size == 0:
+            return
+        batch = catools.CABatch(zip([names[i] for i in idx],
+                                    values[idx].tolist()))
+        batch.caput()
+
     def _handle_cset_monitor(self, value, idx):
         """Handle updates of CSET channels by updating
            the corresponding setting and RSET channel.
         """
-        cset = list(self._csetmap.items())[idx]
-        _LOGGER.debug("VA: Update cset: '%s' to %s", cset[0], value)
-        name, field = self._fieldmap[cset[0]]
+        name, field = self._setting_fields[idx]
+        _LOGGER.debug("VA: Update cset: '%s' to %s", self._cset_names[idx], value)
+        self._setting_values[idx] = value
         self._settings[name][field] = float(value)
+        self._settings_changed = True
 
     def _handle_noise_monitor(self, value):
         """Handle updates of the NOISE channel.
         """
         _LOGGER.info(f"VA: Updated noise level: {value * 100}%")
         self._noise = float(value)
+        self._settings_changed = True
 
     def _handle_bsrc_monitor(self, value):
         """Handle updates of the bsrc channel.
@@ -1158,25 +1281,458 @@ class VirtualAccelerator(object):
         _LOGGER.info(f"VA: Updated rep-rate: {value} Hz")
         self._rate = float(value)
 
+    def _init_settings_array(self):
+        """Flatten the settings of all CSET channels into an array, indexed
+        as the order of CSET channels (also the index of CSET monitors).
+        """
+        self._cset_names = list(self._csetmap.keys())
+        self._rset_names = [v[0] for v in self._csetmap.values()]
+        self._read_names = [v[1] for v in self._csetmap.values()]
+        self._setting_fields = [self._fieldmap[i] for i in self._cset_names]
+        self._setting_values = numpy.array(
+            [self._settings[name][field] for name, field in self._setting_fields],
+            dtype=float)
+        # settings passed to lattice factory, only CSET fields are updated
+        self._noisy_settings = deepcopy(self._settings)
+        self._noisy_refs = [(self._noisy_settings[name], field)
+                            for name, field in self._setting_fields]
+
     def _copy_settings_with_noise(self):
-        s = deepcopy(self._settings)
-        for name, field in self._fieldmap.values():
-            s[name][field] = s[name][field] + s[name][field] * self._noise * 2.0*(random.random()-0.5)
-        return s
+        """Return a tuple of settings with noise applied to all CSET fields,
+        and the array of the noisy values.
+        """
+        values = self._setting_values
+        if self._noise != 0.0:
+            values = values * (1.0 + self._noise * self._rng.uniform(
+                -1.0, 1.0, values.size))
+        for (d, field), v in zip(self._noisy_refs, values.tolist()):
+            d[field] = v
+        return self._noisy_settings, values
 
     def _write_epicsdb(self, buf):
-        for record in self._epicsdb:
-            buf.write("record({}, \"{}\") {{\r\n".format(record[0], record[1]))
-            for name, value in record[2].items():
-                if value is None:
-                    pass  # ignore fields with value None
-                elif isinstance(value, int):
-                    buf.write("    field(\"{}\", {})\r\n".format(name, value))
-                elif isinstance(value, float):
-                    buf.write("    field(\"{}\", {})\r\n".format(name, value))
-                else:
-                    buf.write("    field(\"{}\", \"{}\")\r\n".format(name, value))
-            buf.write("}\r\n\r\n")
+        write_epicsdb(self._epicsdb, buf)
+
+
+class _CycleStats(object):
+    """Timing and health statistics of the execution cycles of virtual
+    accelerator, published as 'SVR:' channels.
+
+    Parameters
+    ----------
+    window : int
+        Number of the latest cycles for the rolling percentiles.
+    """
+    # stage name: channel key
+    STAGES = OrderedDict([
+        ('settings', 'T_SETTINGS'),
+        ('build', 'T_BUILD'),
+        ('reconfigure', 'T_RECONF'),
+        ('propagate', 'T_PROPAGATE'),
+        ('publish', 'T_PUBLISH'),
+    ])
+    # (channel key, description, unit)
+    CHANNELS = [
+        ('T_SETTINGS', "Time of gathering settings", "ms"),
+        ('T_BUILD', "Time of building lattice", "ms"),
+        ('T_RECONF', "Time of reconfiguring machine", "ms"),
+        ('T_PROPAGATE', "Time of FLAME propagation", "ms"),
+        ('T_PUBLISH', "Time of publishing readbacks", "ms"),
+        ('T_CYCLE', "Execution time of last cycle", "ms"),
+        ('T_CYCLE_P50', "Median execution time of cycles", "ms"),
+        ('T_CYCLE_P95', "95th percentile execution time", "ms"),
+        ('RATE_RD', "Achieved rep-rate", "Hz"),
+        ('DROPPED', "Cycles slower than rep-rate", ""),
+    ]
+
+    def __init__(self, window=100):
+        self._times = OrderedDict((k, 0.0) for k in self.STAGES)
+        self._history = deque(maxlen=window)
+        self._t_start = None
+        self._rate = 0.0
+        self.dropped = 0
+
+    def start_cycle(self, t):
+        """Start a new cycle at time *t* (second)."""
+        if self._t_start is not None and t > self._t_start:
+            self._rate = 1.0 / (t - self._t_start)
+        self._t_start = t
+        for k in self._times:
+            self._times[k] = 0.0
+
+    @contextmanager
+    def stage(self, name):
+        """Accumulate the time elapsed in the context to stage *name*."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._times[name] += time.perf_counter() - t0
+
+    def end_cycle(self, delt, period):
+        """End current cycle, *delt* is the execution time and *period* is
+        the expected period of cycles, both in second.
+        """
+        self._history.append(delt)
+        if delt > period:
+            self.dropped += 1
+
+    def values(self):
+        """Return a dict of channel key and value."""
+        r = OrderedDict((self.STAGES[k], v * 1.0e3)
+                        for k, v in self._times.items())
+        p50, p95 = numpy.percentile(self._history, [50, 95]) * 1.0e3 \
+            if self._history else (0.0, 0.0)
+        r['T_CYCLE'] = self._history[-1] * 1.0e3 if self._history else 0.0
+        r['T_CYCLE_P50'] = p50
+        r['T_CYCLE_P95'] = p95
+        r['RATE_RD'] = self._rate
+        r['DROPPED'] = self.dropped
+        return r
+
+
+# BeamState data collected at output elements, see _state_components().
+_STATE_COMPONENTS = ('x', 'y', 'xrms', 'yrms', 'phis', 'ek', 's00', 's22', 's02')
+
+# readback quantities, c: dict of BeamState data arrays, sign: PM sign array.
+_READ_QUANTITIES = {
+    'x': lambda c, sign: c['x'] / 1.0e3,  # convert mm to m
+    'y': lambda c, sign: c['y'] / 1.0e3,
+    'xrms': lambda c, sign: c['xrms'] / 1.0e3,
+    'yrms': lambda c, sign: c['yrms'] / 1.0e3,
+    # convert rad to deg and adjust for 161MHz sampling frequency
+    'phase': lambda c, sign: (2.0 * c['phis'] * (180.0 / math.pi) + 180.0) % 360.0 - 180.0,
+    'energy': lambda c, sign: c['ek'] / 1.0e6,  # convert eV to MeV
+    'xy': lambda c, sign: (sign * c['x'] + c['y']) / 1.0e3 / math.sqrt(2.0),
+    'xyrms': lambda c, sign: 1.0e-3 * numpy.sqrt(
+        (c['s00'] + c['s22']) * 0.5 + sign * c['s02']),
+    'cxy': lambda c, sign: sign * c['s02'] / c['xrms'] / c['yrms'],
+}
+
+
+def _state_components(S):
+    """Return the BeamState data of *S* defined by _STATE_COMPONENTS."""
+    return (S.moment0_env[0], S.moment0_env[2],
+            S.moment0_rms[0], S.moment0_rms[2],
+            S.ref_phis, S.ref_IonEk,
+            S.moment1_env[0, 0], S.moment1_env[2, 2], S.moment1_env[0, 2])
+
+
+class _OutputPlan(object):
+    """Readback channels of the virtual accelerator, compiled once from the
+    element names of FLAME lattice.
+
+    Parameters
+    ----------
+    output_map : list
+        Element name of each FLAME lattice element, or None.
+    elemmap : dict
+        Accelerator elements of the virtual accelerator, keyed by name.
+    readfieldmap : dict
+        READ channels, {element name: {field: channel}}.
+
+    Attributes
+    ----------
+    rows : dict
+        {FLAME lattice element index: row index of *data*}.
+    data : array
+        BeamState data collected at each output element, each row is
+        defined by _STATE_COMPONENTS.
+    channels : list
+        Names of all readback channels.
+    """
+    def __init__(self, output_map, elemmap, readfieldmap):
+        self.rows = {}
+        self.channels = []
+        groups = OrderedDict()
+        for i, name in enumerate(output_map):
+            elem = elemmap.get(name, None)
+            if elem is None:
+                continue
+            fields = _OutputPlan._read_fields(elem)
+            if not fields:
+                continue
+            row = self.rows.setdefault(i, len(self.rows))
+            sign = getattr(elem, 'sign', 1.0)
+            for q, field in fields:
+                pos, rows, signs = groups.setdefault(q, ([], [], []))
+                pos.append(len(self.channels))
+                rows.append(row)
+                signs.append(sign)
+                self.channels.append(readfieldmap[elem.name][field])
+        self._groups = [(_READ_QUANTITIES[q], numpy.array(pos, dtype=int),
+                         numpy.array(rows, dtype=int), numpy.array(signs))
+                        for q, (pos, rows, signs) in groups.items()]
+        self.data = numpy.full((len(self.rows), len(_STATE_COMPONENTS)),
+                               numpy.nan)
+
+    @staticmethod
+    def _read_fields(elem):
+        # list of (quantity, field) of element.
+        f = elem.fields
+        if isinstance(elem, BPMElement):
+            return [('x', f.x_phy), ('y', f.y_phy),
+                    ('phase', f.phase_phy), ('energy', f.energy_phy)]
+        elif isinstance(elem, PMElement):
+            return [('x', f.x), ('y', f.y), ('xrms', f.xrms), ('yrms', f.yrms),
+                    ('xy', f.xy), ('xyrms', f.xyrms), ('cxy', f.cxy)]
+        elif isinstance(elem, (FCElement, VDElement, TargetElement,
+                               DumpElement, WedgeElement)):
+            return [('x', f.x), ('y', f.y), ('xrms', f.xrms), ('yrms', f.yrms)]
+        return []
+
+    def values(self):
+        """Return an array of the values of all readback channels."""
+        r = numpy.empty(len(self.channels))
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            for func, pos, rows, signs in self._groups:
+                c = dict(zip(_STATE_COMPONENTS, self.data[rows].T))
+                r[pos] = func(c, signs)
+        return r
+
+
+# BeamState attributes passed from one segment to the downstream one.
+_STATE_ATTRS = ('pos',
+                'ref_IonZ', 'ref_IonQ', 'ref_IonEs', 'ref_IonW', 'ref_gamma',
+                'ref_beta', 'ref_bg', 'ref_SampleIonK', 'ref_phis', 'ref_IonEk',
+                'ref_SampleFreq',
+                'IonZ', 'IonQ', 'IonEs', 'IonW', 'gamma', 'beta', 'bg',
+                'SampleIonK', 'phis', 'IonEk', 'SampleFreq',
+                'moment0', 'moment1', 'moment0_env', 'moment0_rms', 'moment1_env',
+                'last_caviphi0')
+
+
+def _state_to_dict(S):
+    """Return a picklable dict of the BeamState data of *S*."""
+    r = {}
+    for k in _STATE_ATTRS:
+        v = getattr(S, k)
+        r[k] = v.copy() if isinstance(v, numpy.ndarray) else v
+    return r
+
+
+def _state_from_dict(machine, d):
+    """Allocate a BeamState of *machine* from the data of *d*, see
+    _state_to_dict().
+    """
+    # the number of charge states is defined at allocation
+    conf = {'IonChargeStates': d['IonZ'], 'NCharge': d['IonQ'],
+            'IonEk': d['ref_IonEk'], 'IonEs': d['ref_IonEs']}
+    for i in range(len(d['IonZ'])):
+        conf['moment0{}'.format(i)] = d['moment0'][:, i]
+        conf['initial{}'.format(i)] = d['moment1'][:, :, i].flatten()
+    S = machine.allocState(conf)
+    for k, v in d.items():
+        setattr(S, k, v)
+    return S
+
+
+def _segment_bounds(output_map, names):
+    """Return a list of (first, last + 1) FLAME element index of each
+    segment, the lattice is split at the elements of *names*.
+    """
+    idx = set()
+    for name in names:
+        try:
+            idx.add(output_map.index(name))
+        except ValueError:
+            raise RuntimeError("VA: Segment boundary not found: {}".format(name))
+    bounds = sorted(idx.union([0]).difference([len(output_map)]))
+    return list(zip(bounds, bounds[1:] + [len(output_map)]))
+
+
+def _segment_worker(conn, upstream, downstream):
+    """Propagate one segment of FLAME machine in a worker process.
+
+    Messages from the VA process (*conn*):
+
+    - ('init', conf, first, last, outputs, checkpoint_interval): create
+      machine from lattice configuration *conf*, the segment is the
+      elements within [first, last), *outputs* is the list of element
+      index of which the BeamState data is reported;
+    - ('reconf', generation, {index: conf}): reconfigure elements;
+    - ('stop', ): exit.
+
+    The BeamState at the exit of this segment is sent to *downstream* as
+    ('state', generation, data), the BeamState data of output elements is
+    sent to *conn* as ('data', generation, {index: data}).
+    """
+    machine = None
+    lo = hi = 0
+    state_in = None
+    checkpoints = {}
+    dirty = None
+    generation = 0
+    try:
+        while True:
+            conns = [c for c in (conn, upstream) if c is not None]
+            msgs = []
+            for c in _wait_connections(conns):
+                while c.poll():
+                    msgs.append(c.recv())
+            for msg in msgs:
+                if msg[0] == 'stop':
+                    return
+                elif msg[0] == 'init':
+                    _, conf, lo, hi, outputs, interval = msg
+                    machine = Machine(conf)
+                    outputs = set(outputs)
+                    state_in, checkpoints, dirty = None, {}, None
+                elif msg[0] == 'reconf':
+                    _, g, changes = msg
+                    for idx, c in changes.items():
+                        machine.reconfigure(idx, c)
+                    first = min(changes) if changes else lo
+                    dirty = first if dirty is None else min(dirty, first)
+                    generation = max(generation, g)
+                elif msg[0] == 'state':
+                    _, g, state_in = msg
+                    dirty = lo
+                    generation = max(generation, g)
+
+            if dirty is None or (lo > 0 and state_in is None):
+                continue
+
+            k = max((i for i in checkpoints if i <= dirty), default=lo)
+            if k > lo:
+                S = checkpoints[k].clone()
+            elif lo > 0:
+                S = _state_from_dict(machine, state_in)
+            else:
+                S = machine.allocState({})
+            data = {}
+            for i in range(k, hi):
+                if i > lo and (i - lo) % interval == 0:
+                    checkpoints[i] = S.clone()
+                machine.propagate(S, i, 1)
+                if i in outputs:
+                    data[i] = _state_components(S)
+            dirty = None
+            if downstream is not None:
+                downstream.send(('state', generation, _state_to_dict(S)))
+            conn.send(('data', generation, data))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    except Exception:
+        conn.send(('error', generation, traceback.format_exc()))
+
+
+class _SegmentPool(object):
+    """Worker processes of the lattice segments, each segment is
+    propagated by one worker, the exit BeamState is passed to the worker
+    of the downstream segment directly, so that the upstream segments
+    keep running while the downstream ones recompute.
+
+    Parameters
+    ----------
+    bounds : list
+        List of (first, last + 1) FLAME element index of each segment.
+    checkpoint_interval : int
+        Number of elements between BeamState checkpoints.
+    """
+    def __init__(self, bounds, checkpoint_interval):
+        self._bounds = bounds
+        self._checkpoint_interval = checkpoint_interval
+        # avoid forking the cothread scheduler
+        ctx = multiprocessing.get_context('spawn')
+        self._conns = []
+        self._procs = []
+        upstream = None
+        for i in range(len(bounds)):
+            conn, child_conn = ctx.Pipe()
+            if i < len(bounds) - 1:
+                next_upstream, downstream = ctx.Pipe(duplex=False)
+            else:
+                next_upstream, downstream = None, None
+            proc = ctx.Process(target=_segment_worker,
+                               args=(child_conn, upstream, downstream),
+                               daemon=True)
+            proc.start()
+            self._conns.append(conn)
+            self._procs.append(proc)
+            upstream = next_upstream
+        _LOGGER.info("VA: Started %d segment workers", len(bounds))
+        self._generation = 0
+        self._received = 0
+        self._pending = [{} for _ in bounds]
+        self._restart = False
+
+    def configure(self, conf, plan):
+        """Create the machine of all segments from lattice configuration
+        *conf*, *plan* is the output plan of the VA.
+        """
+        for conn, (lo, hi) in zip(self._conns, self._bounds):
+            outputs = [i for i in plan.rows if lo <= i < hi]
+            conn.send(('init', conf, lo, hi, outputs, self._checkpoint_interval))
+        self._pending = [{} for _ in self._bounds]
+        # propagate from the beginning at next submit
+        self._restart = True
+
+    def reconfigure(self, index, conf):
+        """Reconfigure element *index* at next submit."""
+        for i, (lo, hi) in enumerate(self._bounds):
+            if lo <= index < hi:
+                self._pending[i][index] = conf
+                break
+
+    def submit(self):
+        """Send the pending reconfigurations to the segment workers."""
+        self._generation += 1
+        for i, (conn, changes) in enumerate(zip(self._conns, self._pending)):
+            if changes or (i == 0 and self._restart):
+                conn.send(('reconf', self._generation, changes))
+        self._pending = [{} for _ in self._bounds]
+        self._restart = False
+
+    def collect(self, plan, timeout):
+        """Update the BeamState data of *plan* with the results of the
+        segment workers, wait up to *timeout* seconds until the last
+        segment reports the results of the latest submit.
+        """
+        t_end = time.time() + timeout
+        while True:
+            for i, conn in enumerate(self._conns):
+                while conn.poll():
+                    kind, g, data = conn.recv()
+                    if kind == 'error':
+                        raise RuntimeError(
+                            "VA: Segment {} failed: {}".format(i, data))
+                    for idx, comps in data.items():
+                        plan.data[plan.rows[idx]] = comps
+                    if i == len(self._conns) - 1:
+                        self._received = max(self._received, g)
+            if self._received >= self._generation or time.time() >= t_end:
+                break
+            cothread.Sleep(0.001)
+        if self._received < self._generation:
+            _LOGGER.debug("VA: Publish while segments are running")
+
+    def close(self):
+        """Stop all the segment workers."""
+        for conn in self._conns:
+            try:
+                conn.send(('stop', ))
+            except (OSError, ValueError):
+                pass
+        for proc in self._procs:
+            proc.join(1.0)
+            if proc.is_alive():
+                proc.terminate()
+        for conn in self._conns:
+            conn.close()
+
+
+def _conf_equal(c1, c2):
+    """Test if two FLAME element configurations are the same."""
+    if c1.keys() != c2.keys():
+        return False
+    for k, v in c1.items():
+        if isinstance(v, (numpy.ndarray, list)) or \
+                isinstance(c2[k], (numpy.ndarray, list)):
+            if not numpy.array_equal(v, c2[k]):
+                return False
+        elif v != c2[k]:
+            return False
+    return True
 
 
 def _normalize_phase(phase):
@@ -36,6 +36,10 @@ from phantasy.library.layout import SolCorElement
 from phantasy.library.layout import StripElement
 from phantasy.library.layout import ValveElement
 from phantasy.library.parser import Configuration
+from .common import EPICSDB_FILENAME
+from .common import link_data_files
+from .common import prepare_cached_work_dir
+from .common import write_epicsdb
 
 __copyright__ = "Copyright (c) 2015, Facility for Rare Isotope Beams"
 
@@ -51,6 +55,7 @@ CONFIG_IMPACT_DATA_DIR = "impact_data_dir"
 
 _DEFAULT_IMPACT_EXE = "impact"
 _TEMP_DIRECTORY_SUFFIX = "_va_impact"
+_CACHE_DIRECTORY_PREFIX = "va_impact"
 _DEFAULT_ERROR_VALUE = 0.0
 _VA_STATUS_GOOD = "OK"
 _VA_STATUS_BAD = "ERR"
@@ -86,6 +91,8 @@ def start(layout, **kwargs):
         Path of directory containing IMPACT data files.
     work_dir :
         Path of directory for execution of IMPACT.
+    cache_dir :
+        Path of directory for the cached working directories.
     """
 
     global _VIRTUAL_ACCELERATOR
@@ -130,6 +137,11 @@ def build_virtaccel(layout, **kwargs):
         Path of directory containing IMPACT data files
     work_dir :
         Path of directory for execution of IMPACT
+    cache_dir :
+        If defined and *work_dir* is not defined, the working directory
+        with the generated EPICS database and data file links is kept in
+        this directory, and reused by the VA of the same layout, settings
+        schema, channel prefix and data directory
 
     Returns
     -------
@@ -158,6 +170,7 @@ class VirtualAcceleratorFactory(object):
         self.end = kwargs.get("end", None)
         self.data_dir = kwargs.get("data_dir", None)
         self.work_dir = kwargs.get("work_dir", None)
+        self.cache_dir = kwargs.get("cache_dir", None)
 
     @property
     def layout(self):
@@ -302,7 +315,8 @@ class VirtualAcceleratorFactory(object):
             # be converted from unicode
             chanprefix = str(m.group(1))
 
-        va = VirtualAccelerator(latfactory, settings, chanprefix, impact_exe, data_dir, work_dir)
+        va = VirtualAccelerator(latfactory, settings, chanprefix, impact_exe, data_dir, work_dir,
+                                cache_dir=self.cache_dir)
 
         for elem in self.layout.iter(start=self.start, end=self.end):
 
@@ -417,7 +431,8 @@ class VirtualAccelerator(object):
        EPICS IOC process and IMPACT simulation process.
     """
 
-    def __init__(self, latfactory, settings, chanprefix, impact_exe, data_dir, work_dir=None):
+    def __init__(self, latfactory, settings, chanprefix, impact_exe, data_dir, work_dir=None,
+                 cache_dir=None):
         if not isinstance(latfactory, LatticeFactory):
             raise TypeError("VirtualAccelerator: Invalid type for LatticeFactory")
         self._latfactory = latfactory
@@ -430,6 +445,8 @@ class VirtualAccelerator(object):
         self.impact_exe = impact_exe
         self.data_dir = data_dir
         self.work_dir = work_dir
+        # root directory of the cached working directories
+        self._cache_dir = cache_dir
 
         self._epicsdb = []
         self._csetmap = OrderedDict()
@@ -442,6 +459,7 @@ class VirtualAccelerator(object):
         self._started = False
         self._continue = False
         self._rm_work_dir = False
+        self._cached_work_dir = False
 
         self._ioc_process = None
         self._ioc_logfile = None
@@ -644,15 +662,22 @@ class VirtualAccelerator(object):
                 _LOGGER.debug("VirtualAccelerator: Cleanup: remove work directory")
                 shutil.rmtree(self.work_dir)
 
+            if self._cached_work_dir:
+                # pick up the cached working directory at next start
+                self.work_dir = None
+                self._cached_work_dir = False
+
             self._executer = None
             self._continue = False
             self._started = False
 
     def _execute(self):
         """Execute the virtual accelerator. This includes the following:
-            1. Creating a temporary working directory for execution of IMPACT.
+            1. Creating a temporary working directory for execution of IMPACT,
+               or reuse the cached one.
             2. Setup the working directory by symlinking from the data directory.
-            3. Writing the EPICS DB to the working directory (va.db).
+            3. Writing the EPICS DB to the working directory (va.db), unless
+               the cached one is reused.
             4. Starting the softIoc and channel initializing monitors.
             5. Add noise to the settings for all input (CSET) channels.
             6. Generate the IMPACT lattice file in working directory (test.in).
@@ -703,9 +728,21 @@ class VirtualAccelerator(object):
             ("PREC", 5)
         ])))
 
+        if os.path.isabs(self.data_dir):
+            abs_data_dir = self.data_dir
+        else:
+            abs_data_dir = os.path.abspath(self.data_dir)
+
+        self._cached_work_dir = self.work_dir is None and self._cache_dir is not None
+        reuse_epicsdb = False
         if self.work_dir is not None:
             os.makedirs(self.work_dir)
             self._rm_work_dir = False
+        elif self._cached_work_dir:
+            self.work_dir, reuse_epicsdb = prepare_cached_work_dir(
+                self._cache_dir, _CACHE_DIRECTORY_PREFIX, self._epicsdb,
+                abs_data_dir)
+            self._rm_work_dir = False
         else:
             self.work_dir = tempfile.mkdtemp(_TEMP_DIRECTORY_SUFFIX)
             self._rm_work_dir = True
@@ -713,7 +750,7 @@ class VirtualAccelerator(object):
         _LOGGER.info("VirtualAccelerator: Working directory: %s", self._work_dir)
 
         # input file paths
-        epicsdbpath = os.path.join(self.work_dir, "va.db")
+        epicsdbpath = os.path.join(self.work_dir, EPICSDB_FILENAME)
         latticepath = os.path.join(self.work_dir, "test.in")
         modelmappath = os.path.join(self.work_dir, "model.map")
 
@@ -723,25 +760,22 @@ class VirtualAccelerator(object):
         fort25path = os.path.join(self.work_dir, "fort.25")
         epicslogpath = os.path.join(self.work_dir, "softioc.log")
 
-        if os.path.isabs(self.data_dir):
-            abs_data_dir = self.data_dir
-        else:
-            abs_data_dir = os.path.abspath(self.data_dir)
+        link_data_files(abs_data_dir, self.work_dir)
 
-        for datafile in os.listdir(abs_data_dir):
-            srcpath = os.path.join(abs_data_dir, datafile)
-            destpath = os.path.join(self.work_dir, datafile)
-            if os.path.isfile(os.path.join(abs_data_dir, datafile)):
-                os.symlink(srcpath, destpath)
-                _LOGGER.debug("VirtualAccelerator: Link data file %s to %s", srcpath, destpath)
-
-        with open(epicsdbpath, "w") as outfile:
-            self._write_epicsdb(outfile)
+        if not self._cached_work_dir:
+            with open(epicsdbpath, "w") as outfile:
+                self._write_epicsdb(outfile)
 
         self._ioc_logfile = open(epicslogpath, "w")
-        self._ioc_process = _Cothread_Popen(["softIoc", "-d", "va.db"], cwd=self.work_dir,
+        self._ioc_process = _Cothread_Popen(["softIoc", "-d", EPICSDB_FILENAME], cwd=self.work_dir,
                                             stdout=self._ioc_logfile, stderr=subprocess.STDOUT)
 
+        if reuse_epicsdb:
+            # initial values of the cached database are out of date
+            csets = list(self._csetmap.keys())
+            catools.caput(csets, [self._settings[name][field] for name, field
+                                  in (self._fieldmap[c] for c in csets)])
+
         self._subscriptions = []
 
         self._subscriptions.append(catools.camonitor(channoise, self._handle_noise_monitor))
@@ -956,18 +990,7 @@ class VirtualAccelerator(object):
         return s
 
     def _write_epicsdb(self, buf):
-        for record in self._epicsdb:
-            buf.write("record({}, \"{}\") {{\r\n".format(record[0], record[1]))
-            for name, value in record[2].items():
-                if value is None:
-                    pass  # ignore fields with value None
-                elif isinstance(value, int):
-                    buf.write("    field(\"{}\", {})\r\n".format(name, value))
-                elif isinstance(value, float):
-                    buf.write("    field(\"{}\", {})\r\n".format(name, value))
-                else:
-                    buf.write("    field(\"{}\", \"{}\")\r\n".format(name, value))
-            buf.write("}\r\n\r\n")
+        write_epicsdb(self._epicsdb, buf)
 
 
 def _normalize_phase(phase):
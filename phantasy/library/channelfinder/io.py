@@ -8,11 +8,11 @@ import json
 import logging
 import os
 from collections import OrderedDict
-from fnmatch import fnmatch
 
 from phantasy.library.misc import expand_list_to_dict
 from phantasy.library.misc import flatten
 from phantasy.library.misc import pattern_filter
+from phantasy.library.misc import compile_pattern
 
 from .database import CFCDatabase
 from .table import CFCTable
@@ -196,30 +196,33 @@ def _get_data(raw_data, prop_list, tag_list, **kws):
     if tag_filter is not None:
         if isinstance(tag_filter, str):
             tag_filter = tag_filter,
-        tag_selected = flatten(
-            [pattern_filter(tag_list, tn_i)
-             for tn_i in tag_filter]
-        )
+        tag_selected = pattern_filter(tag_list, tag_filter)
         if tag_selected == []:
             _LOGGER.warning('Invalid tags defined, tag_filter will be inactived.')
+    tag_selected = set(tag_selected)
+
+    # compiled patterns for PV name and property values
+    name_match = compile_pattern(name_filter).match
+    prop_match = {k: compile_pattern(str(v)).match
+                  for k, v in prop_selected.items() if v is not None}
 
     retval = []
     for rec in raw_data:
         pv_name_tmp = rec.get('name')
-        if True in [fnmatch(pv_name_tmp, npi) for npi in name_filter]:
+        if name_match(pv_name_tmp):
             pv_name = pv_name_tmp
         else:
             continue
 
-        pv_tags = [t['name'] for t in rec.get('tags')]
-        if not set(tag_selected).issubset(pv_tags):
+        pv_tags = {t['name'] for t in rec.get('tags')}
+        if not tag_selected.issubset(pv_tags):
             continue
 
         pv_props_selected = []
         for p in rec.get('properties'):
             k, v = p['name'], p['value']
             if k in prop_selected:
-                if prop_selected[k] is not None and not fnmatch(str(v), prop_selected[k]):
+                if k in prop_match and not prop_match[k](str(v)):
                     pv_name = None
                     continue
                 else:
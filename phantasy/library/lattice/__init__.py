@@ -16,6 +16,8 @@ from .impact import LatticeField as ImpactLatticeField
 from .impact import build_lattice as build_impact_lattice
 from .impact import read_lattice as read_impact_lattice
 from .impact import run_lattice as run_impact_lattice
+from .impact import run_lattices as run_impact_lattices
+from .impact import RunPool as ImpactRunPool
 
 __all__ = [
     "BaseElement", "CaElement", "CaField", "Lattice",
@@ -23,6 +25,7 @@ __all__ = [
     "build_flame_lattice", "ImpactLatticeFactory",
     "ImpactLattice", "ImpactLatticeElement",
     "build_impact_lattice", "read_impact_lattice",
-    "run_impact_lattice", "limit_input",
+    "run_impact_lattice", "run_impact_lattices", "ImpactRunPool",
+    "limit_input",
     "build_element", "pass_arg",
 ]
@@ -10,6 +10,7 @@ import re
 import time
 
 from epics import PV, get_pv
+from epics import ca
 from phantasy.library.misc import flatten
 from phantasy.library.misc import convert_epoch
 from phantasy.library.misc import QCallback
@@ -17,9 +18,14 @@ from phantasy.library.pv import PV_POLICIES
 from phantasy.library.pv import unicorn_read
 from phantasy.library.pv import unicorn_write
 from phantasy.library.pv import ensure_put
+from phantasy.library.pv import ensure_put_many
+from phantasy.library.pv import caget_many
+from phantasy.library.pv.unicorn import _UnicornReadPolicy
+from phantasy.library.pv.unicorn import _UnicornWritePolicy
 from phantasy.library.settings import get_settings_from_element_list
 
 from functools import wraps
+from numbers import Real
 from functools import partial
 import numpy as np
 
@@ -44,6 +50,9 @@ VALID_CA_KEYS = ('field_eng', 'field_phy', 'handle', 'pv_policy')
 # diagnostic device types
 # DIAG_DTYPES = ('FC', 'EMS', 'PM', 'BPM', 'BCM', 'ND', 'HMR', 'IC', 'VD')
 DIAG_DTYPES = ('BPM', 'BCM')
+# phase fields, values are wrapped into [-180, 180).
+PHASE_FIELDS = ('PHA', 'PHA1', 'PHA2', 'PHA3',
+                'PHASE', 'PHASE1', 'PHASE2', 'PHASE3')
 
 
 class BaseElement(object):
@@ -318,6 +327,15 @@ class CaField(object):
         Field type, 'ENG' (default) or 'PHY'.
     auto_monitor : bool
         If set True, initialize all channels auto subscribe, default is False.
+    lazy : bool
+        If set True, PV objects are not created until the first access,
+        default is False.
+    array_mode : str
+        How array (waveform) values are returned, 'list' (default): a list
+        of Python floats, 'copy': a numpy array, 'view': a read-only numpy
+        array sharing the buffer of the channel, no copy; could be set for
+        all the fields when loading, e.g.
+        ``MachinePortal('FRIB', 'LINAC', array_mode='copy')``.
 
     Note
     ----
@@ -343,10 +361,16 @@ class CaField(object):
         self.readback = kws.get('readback', None)
         self.readset = kws.get('readset', None)
         self.setpoint = kws.get('setpoint', None)
-        self._rdbk_pv = []
-        self._rset_pv = []
-        self._cset_pv = []
-        self.init_pvs()
+        if kws.get('lazy', False):
+            # PV objects are created from PV names at the first access.
+            self._rdbk_pv = None
+            self._rset_pv = None
+            self._cset_pv = None
+        else:
+            self._rdbk_pv = []
+            self._rset_pv = []
+            self._cset_pv = []
+            self.init_pvs()
         pv_policy = kws.get('pv_policy', PV_POLICIES['DEFAULT'])
         self._polarity = kws.get('polarity', 1)
 
@@ -356,11 +380,16 @@ class CaField(object):
         self.write_policy = self._default_write_policy
 
         self.ftype = kws.get('ftype', 'ENG')
+        self.array_mode = kws.get('array_mode', None)
         # callbacks
         self._callbacks = {}
         self._args = {}
         # monitor cid dict: {name: cid_list, ...}
         self._monitor_cid_map = {}
+        # cid dict of the callbacks added by set_am(): {pvname: cid, ...}
+        self._am_cid_map = {}
+        # readback value cache, see enable_cache()
+        self._cache = None
 
     def validate_polarity(self, mode='read'):
         if mode == 'read':
@@ -436,6 +465,34 @@ class CaField(object):
         else:
             self._ensure_put = bool(b)
 
+    @property
+    def array_mode(self):
+        """str: How array (waveform) values are returned, 'list', 'copy' or
+        'view', default is 'list'."""
+        return self._array_mode
+
+    @array_mode.setter
+    def array_mode(self, s):
+        if s is None:
+            self._array_mode = 'list'
+        elif s in ('list', 'copy', 'view'):
+            self._array_mode = s
+        else:
+            _LOGGER.warning("Invalid array mode '{}', should be one of "
+                            "'list', 'copy' and 'view'.".format(s))
+
+    def _array_value(self, r):
+        # return read policy result r w.r.t. array mode.
+        if not isinstance(r, np.ndarray):
+            return r
+        if self._array_mode == 'list':
+            return r.tolist()
+        if self._array_mode == 'copy':
+            return r.copy()
+        r = r.view()
+        r.flags.writeable = False
+        return r
+
     @property
     def timeout(self):
         """float: Time out in second for put operation, default: 10 [sec]."""
@@ -524,12 +581,14 @@ class CaField(object):
     @property
     def readback_pv(self):
         """PV: Readback PV object."""
+        if self._rdbk_pv is None:
+            self._init_rdbk_pv(self._rdbk_pv_name)
         return self._rdbk_pv
 
     @readback_pv.setter
     def readback_pv(self, pvobj):
         if isinstance(pvobj, PV):
-            if pvobj not in self._rdbk_pv:
+            if pvobj not in self.readback_pv:
                 self._rdbk_pv.append(pvobj)
             else:
                 _LOGGER.debug("Readback PV object already exists.")
@@ -541,12 +600,14 @@ class CaField(object):
     @property
     def readset_pv(self):
         """PV: Readset PV object."""
+        if self._rset_pv is None:
+            self._init_rset_pv(self._rset_pv_name)
         return self._rset_pv
 
     @readset_pv.setter
     def readset_pv(self, pvobj):
         if isinstance(pvobj, PV):
-            if pvobj not in self._rset_pv:
+            if pvobj not in self.readset_pv:
                 self._rset_pv.append(pvobj)
             else:
                 _LOGGER.debug("Readset PV object already exists.")
@@ -558,12 +619,14 @@ class CaField(object):
     @property
     def setpoint_pv(self):
         """PV: Setpoint PV object."""
+        if self._cset_pv is None:
+            self._init_cset_pv(self._cset_pv_name)
         return self._cset_pv
 
     @setpoint_pv.setter
     def setpoint_pv(self, pvobj):
         if isinstance(pvobj, PV):
-            if pvobj not in self._cset_pv:
+            if pvobj not in self.setpoint_pv:
                 self._cset_pv.append(pvobj)
             else:
                 _LOGGER.debug("Setpoint PV object already exists.")
@@ -572,6 +635,21 @@ class CaField(object):
         else:
             _LOGGER.warning("Input PV should be PV object.")
 
+    def __getstate__(self):
+        # PV objects and callbacks are not serialized, PV objects are
+        # re-created from PV names at the first access.
+        state = self.__dict__.copy()
+        state.update(_rdbk_pv=None, _rset_pv=None, _cset_pv=None,
+                     _callbacks={}, _args={}, _monitor_cid_map={},
+                     _am_cid_map={}, _cache=None)
+        return state
+
+    def __setstate__(self, state):
+        # defaults for the attributes not in the state pickled by older
+        # versions.
+        self.__dict__.update(_cache=None, _array_mode='list', _am_cid_map={})
+        self.__dict__.update(state)
+
     def __eq__(self, other):
         return self.readback == other.readback and \
                self.setpoint == other.setpoint and \
@@ -635,10 +713,9 @@ class CaField(object):
         read policy as the final field value as a return."""
         if not self.connected():
             return None
-        r = self.read_policy(self.readback_pv)
-        if isinstance(r, np.ndarray):
-            return r.tolist()
-        return r
+        if self._cache is not None:
+            self._refresh_cache()
+        return self._array_value(self.read_policy(self.readback_pv))
 
     @value.setter
     def value(self, v):
@@ -648,7 +725,7 @@ class CaField(object):
             _LOGGER.warning("{} [{}] is read only.".format(self.ename, self.name))
             return
         # wrap phase value to -180, 180.
-        if self.name in ('PHA', 'PHA1', 'PHA2', 'PHA3', 'PHASE', 'PHASE1', 'PHASE2', 'PHASE3'):
+        if self.name in PHASE_FIELDS:
             v = wrap_phase(v)
         #
         self.write_policy(self.setpoint_pv, v, timeout=self.timeout,
@@ -663,6 +740,31 @@ class CaField(object):
         self._init_rset_pv(rset_pv_name, **kws)
         self._init_cset_pv(cset_pv_name, **kws)
 
+    def prewarm(self, handle=None):
+        """Create PV objects with *handle* if not created yet, which is useful
+        when field is lazily initialized, channels are connected in
+        background, see :meth:`MachinePortal.prewarm`.
+
+        Parameters
+        ----------
+        handle : str or list(str)
+            PV handle(s), 'readback', 'readset' or 'setpoint', all if not
+            defined.
+
+        Returns
+        -------
+        r : list
+            List of PV objects.
+        """
+        if handle is None:
+            handle = ('readback', 'readset', 'setpoint')
+        elif isinstance(handle, str):
+            handle = handle,
+        r = []
+        for h in handle:
+            r.extend(getattr(self, "{}_pv".format(h)))
+        return r
+
     def _init_rdbk_pv(self, pvs, **kws):
         self._rdbk_pv = [get_pv(i, auto_monitor=self._am) for i in pvs]
 
@@ -681,10 +783,14 @@ class CaField(object):
         setpoint : str
         readset : str
         """
-        for k in ('readback', 'readset', 'setpoint'):
+        for k, pv_attr in (('readback', '_rdbk_pv'), ('readset', '_rset_pv'),
+                           ('setpoint', '_cset_pv')):
             v = kws.get(k, None)
             if v is not None:
                 setattr(self, k, v)
+                # not created yet, will be created from the updated names.
+                if getattr(self, pv_attr) is None:
+                    continue
                 setattr(self, "{}_pv".format(k), get_pv(v, auto_monitor=self._am))
 
     def pvs(self):
@@ -772,11 +878,12 @@ class CaField(object):
 
         """
         if handle == 'readback':
-            pv = self._rdbk_pv
+            pv = self.readback_pv
         elif handle == 'readset':
-            pv = self._rset_pv
+            pv = self.readset_pv
         elif handle == 'setpoint':
-            pv = self._cset_pv
+            pv = self.setpoint_pv
+        am = self._cache is not None and handle == 'readback'
         self.set_auto_monitor(True, handle)
         if pv is not None:
             if with_timestamp:
@@ -788,7 +895,7 @@ class CaField(object):
                     else:
                         avg, std, ts, _ = self.__get(ipv, n_sample, ts_format=ts_format, timeout=timeout)
                         r.append((avg, std, ts, []))
-                self.set_auto_monitor(False, handle)
+                self.set_auto_monitor(am, handle)
                 return dict(zip(('mean', 'std', 'timestamp', 'data'), zip(*r)))
             else:
                 r = []
@@ -799,19 +906,23 @@ class CaField(object):
                     else:
                         avg, std, _, _ = self.__get(ipv, n_sample, ts_format="epoch", timeout=timeout)
                         r.append((avg, std, '', []))
-                self.set_auto_monitor(False, handle)
+                self.set_auto_monitor(am, handle)
                 return dict(zip(('mean', 'std', 'timestamp', 'data'), zip(*r)))
         else:
-            self.set_auto_monitor(False, handle)
+            self.set_auto_monitor(am, handle)
             return None
 
     def set_am(self):
         """Set am to all pvs.
         """
-        for i in self._rdbk_pv + self._cset_pv + self._rset_pv:
+        for i in self.readback_pv + self.setpoint_pv + self.readset_pv:
             i.auto_monitor = True
-            i.clear_callbacks()
-            i.add_callback(self.__on_updates)
+            # only replace the callback added by set_am(), keep the others,
+            # e.g. the ones of enable_cache().
+            cid = self._am_cid_map.get(i.pvname)
+            if cid is not None:
+                i.remove_callback(cid)
+            self._am_cid_map[i.pvname] = i.add_callback(self.__on_updates)
 
     def __on_updates(self, **kws):
         self._args['value'] = self.value
@@ -824,7 +935,7 @@ class CaField(object):
     def unset_am(self):
         """Unset am to all pvs.
         """
-        for i in self._rdbk_pv + self._cset_pv + self._rset_pv:
+        for i in self.readback_pv + self.setpoint_pv + self.readset_pv:
             i.auto_monitor = False
 
     def set(self, value, handle='setpoint', **kws):
@@ -854,11 +965,11 @@ class CaField(object):
         bypass field defined read/write policies.
         """
         if handle == 'readback':
-            pv = self._rdbk_pv
+            pv = self.readback_pv
         elif handle == 'readset':
-            pv = self._rset_pv
+            pv = self.readset_pv
         elif handle == 'setpoint':
-            pv = self._cset_pv
+            pv = self.setpoint_pv
         if not isinstance(value, (list, tuple)):
             value = value,
         if pv is not None:
@@ -924,10 +1035,7 @@ class CaField(object):
             _LOGGER.warning(
                 "{} [{}] is not connected".format(self.ename, self.name))
             return None
-        r = self.read_policy(self.setpoint_pv)
-        if isinstance(r, np.ndarray):
-            return r.tolist()
-        return r
+        return self._array_value(self.read_policy(self.setpoint_pv))
 
     def set_auto_monitor(self, auto_monitor=True, handle='readback'):
         """Set auto_monitor bit True or False for the given PV type.
@@ -957,6 +1065,71 @@ class CaField(object):
             raise RuntimeError(
                     "All {} PVs should have the same monitoring policy.".format(handle))
 
+    def enable_cache(self, max_age=None):
+        """Serve field value from the cache of readback PVs, which is kept
+        updated by persistent monitor subscriptions.
+
+        Parameters
+        ----------
+        max_age : float
+            Maximum age in second of the cached value, if the last update of
+            any readback PV is older than *max_age*, fetch from network and
+            count as a miss; if not defined, the monitored value is always
+            served.
+
+        See Also
+        --------
+        disable_cache, cache_info
+        """
+        if self._cache is None:
+            cids = []
+            for pv in self.readback_pv:
+                pv.auto_monitor = True
+                cids.append(pv.add_callback(self.__on_cache_update))
+            self._cache = {'max_age': max_age, 'cids': cids,
+                           'ts': {}, 'hits': 0, 'misses': 0}
+        else:
+            self._cache['max_age'] = max_age
+
+    def disable_cache(self):
+        """Stop serving field value from the cache, remove the monitor
+        subscriptions added by :meth:`enable_cache`.
+        """
+        if self._cache is None:
+            return
+        for pv, cid in zip(self.readback_pv, self._cache['cids']):
+            pv.remove_callback(cid)
+            if not pv.callbacks:
+                pv.auto_monitor = False
+        self._cache = None
+
+    def cache_info(self):
+        """Return a dict of cache statistics, keys: 'hits', 'misses',
+        'max_age', or None if cache is not enabled.
+        """
+        if self._cache is None:
+            return None
+        return {k: self._cache[k] for k in ('hits', 'misses', 'max_age')}
+
+    def __on_cache_update(self, pvname=None, **kws):
+        self._cache['ts'][pvname] = time.time()
+
+    def _refresh_cache(self):
+        # fetch the PVs not updated within max_age from network.
+        cache = self._cache
+        max_age, ts = cache['max_age'], cache['ts']
+        t = time.time()
+        stale = [pv for pv in self.readback_pv
+                 if pv.pvname not in ts or
+                 (max_age is not None and t - ts[pv.pvname] > max_age)]
+        if stale:
+            cache['misses'] += 1
+            for pv in stale:
+                pv.get(use_monitor=False)
+                ts[pv.pvname] = time.time()
+        else:
+            cache['hits'] += 1
+
     def run_callbacks(self):
         for i in self._callbacks:
             self.run_callback(i)
@@ -1045,6 +1218,9 @@ class CaElement(BaseElement):
         with dict of keys of: ``pv_name``, ``pv_props`` and ``pv_tags``.
     auto_monitor : bool
         If set True, initialize all channels auto subscribe, default is False.
+    lazy : bool
+        If set True, do not create PV objects until the first access, default
+        is False.
 
     Note
     ----
@@ -1073,11 +1249,12 @@ class CaElement(BaseElement):
 
         pv_data = kws.get('pv_data', None)
         am = kws.get('auto_monitor', False)
+        lazy = kws.get('lazy', False)
         if pv_data is not None:
             if isinstance(pv_data, list):
-                self.process_pv(*pv_data, auto_monitor=am)
+                self.process_pv(*pv_data, auto_monitor=am, lazy=lazy)
             elif isinstance(pv_data, dict):
-                self.process_pv(**pv_data, auto_monitor=am)
+                self.process_pv(**pv_data, auto_monitor=am, lazy=lazy)
 
     @property
     def last_settings(self):
@@ -1190,17 +1367,12 @@ class CaElement(BaseElement):
     def _update_ca_props(self, props, **kws):
         """CA"""
         am = kws.get('auto_monitor', False)
+        lazy = kws.get('lazy', False)
         def build_pv_policy_phy(fn_p, fn_n, pv_policy):
             # pv_policy is a dict
             f_read, f_write = pv_policy['read'], pv_policy['write']
-
-            @unicorn_read(fn_p)
-            def f_read_phy(x):
-                return f_read(x)
-
-            @unicorn_write(fn_n)
-            def f_write_phy(x, v, **kws):
-                f_write(x, v, **kws)
+            f_read_phy = unicorn_read(fn_p)(f_read)
+            f_write_phy = unicorn_write(fn_n)(f_write)
             return {'read': f_read_phy, 'write': f_write_phy}
 
         handle_name = props.get('handle', None)
@@ -1228,8 +1400,8 @@ class CaElement(BaseElement):
             pv_policy_phy = build_pv_policy_phy(f_e2p, f_p2e, pv_policy)
         else:
             pv_policy_phy = PV_POLICIES.get(pv_policy_str)
-            f_e2p = lambda x:x
-            f_p2e = lambda x:x
+            f_e2p = _no_scaling
+            f_p2e = _no_scaling
 
         pv = kws.get('pv', None)
         polarity = kws.get('polarity', 1)
@@ -1238,12 +1410,12 @@ class CaElement(BaseElement):
             self.__unicorn[k_e2p] = f_e2p
             self.set_field(field_name, pv, handle_name, ftype='ENG',
                            pv_policy=pv_policy, auto_monitor=am,
-                           polarity=polarity)
+                           polarity=polarity, lazy=lazy)
         if field_name_phy is not None:
             self.__unicorn[k_p2e] = f_p2e
             self.set_field(field_name_phy, pv, handle_name, ftype='PHY',
                            pv_policy=pv_policy_phy, auto_monitor=am,
-                           polarity=polarity)
+                           polarity=polarity, lazy=lazy)
 
     def set_field(self, field, pv, handle=None, **kws):
         """Set element field with CA support, i.e. dynamic field.
@@ -1267,6 +1439,9 @@ class CaElement(BaseElement):
             Field type, 'ENG' (default) or 'PHY'.
         auto_monitor : bool
             If set True, initialize all channels auto subscribe, default is False.
+        lazy : bool
+            If set True, do not create PV objects until the first access,
+            default is False.
         """
         if handle is None:
             handle = 'readback'
@@ -1277,6 +1452,7 @@ class CaElement(BaseElement):
                                 pv_policy=kws.get('pv_policy'),
                                 polarity=kws.get('polarity'),
                                 auto_monitor=kws.get('auto_monitor'),
+                                lazy=kws.get('lazy', False),
                                 **{handle: pv})
             self._design_settings.update({field: None})
             self._last_settings.update({field: None})
@@ -1356,6 +1532,9 @@ class CaElement(BaseElement):
         -----------------
         auto_monitor : bool
             If set True, initialize all channels auto subscribe, default is False.
+        lazy : bool
+            If set True, do not create PV objects until the first access,
+            default is False.
         """
         if not isinstance(pv_name, str):
             raise TypeError("{} is not a valid type".format(type(pv_name)))
@@ -1411,6 +1590,84 @@ class CaElement(BaseElement):
                 self.name, field, ', '.join(sorted(self.fields))))
             return None
 
+    def prewarm(self, field=None, handle=None):
+        """Create PV objects of *field* if not created yet.
+
+        Parameters
+        ----------
+        field : str or list(str)
+            (List of) field name(s), all fields if not defined.
+        handle : str or list(str)
+            PV handle(s), 'readback', 'readset' or 'setpoint', all if not
+            defined.
+
+        Returns
+        -------
+        r : list
+            List of PV objects.
+
+        See Also
+        --------
+        :meth:`CaField.prewarm`
+        """
+        if field is None:
+            field = self.fields
+        elif isinstance(field, str):
+            field = field,
+        r = []
+        for f in field:
+            if f in self._fields:
+                r.extend(self._fields[f].prewarm(handle))
+        return r
+
+    def enable_cache(self, field=None, max_age=None):
+        """Serve the value of *field* from monitored readback PVs.
+
+        Parameters
+        ----------
+        field : str or list(str)
+            (List of) field name(s), all fields if not defined.
+        max_age : float
+            Maximum age in second of the cached value.
+
+        See Also
+        --------
+        :meth:`CaField.enable_cache`
+        """
+        for fld in self._iter_fields(field):
+            fld.enable_cache(max_age)
+
+    def disable_cache(self, field=None):
+        """Disable the value cache of *field*, all fields if not defined.
+
+        See Also
+        --------
+        :meth:`CaField.disable_cache`
+        """
+        for fld in self._iter_fields(field):
+            fld.disable_cache()
+
+    def set_array_mode(self, mode, field=None):
+        """Set how the array values of *field* are returned, all fields if
+        not defined.
+
+        Parameters
+        ----------
+        mode : str
+            'list', 'copy' or 'view', see :attr:`CaField.array_mode`.
+        field : str or list(str)
+            (List of) field name(s).
+        """
+        for fld in self._iter_fields(field):
+            fld.array_mode = mode
+
+    def _iter_fields(self, field=None):
+        if field is None:
+            field = self.fields
+        elif isinstance(field, str):
+            field = field,
+        return [self._fields[f] for f in field if f in self._fields]
+
     def __getattr__(self, key):
         if key in self._fields:
             return self._fields[key].value
@@ -1425,7 +1682,7 @@ class CaElement(BaseElement):
             return
         if key in self._fields:
             fld = self._fields[key]
-            if key in ('PHA', 'PHA1', 'PHA2', 'PHA3', 'PHASE', 'PHASE1', 'PHASE2', 'PHASE3'):
+            if key in PHASE_FIELDS:
                 value = wrap_phase(value)
             if fld.ensure_put:
                 ensure_put(fld, value, fld.tolerance, fld.timeout)
@@ -1438,6 +1695,10 @@ class CaElement(BaseElement):
     def __dir__(self):
         return dir(CaElement) + list(self._fields.keys()) + list(self.__dict__.keys())
 
+    def __setstate__(self, state):
+        # bypass __setattr__/__getattr__ which depend on '_fields'.
+        self.__dict__.update(state)
+
     def __repr__(self):
         if self.virtual:
             return "%s [%s] (virtual)" % (self.name, self.family)
@@ -1809,6 +2070,236 @@ def build_element(sp_pv, rd_pv, ename=None, fname=None, **kws):
     return elem
 
 
+def read_fields(elements, fields, handle='readback', **kws):
+    """Read the values of *fields* of all *elements* at once, all the PVs
+    are read with one batched CA get, then the read policies and scaling
+    laws are applied on the whole array.
+
+    Parameters
+    ----------
+    elements : list
+        List of CaElement objects, None is allowed as an invalid element.
+    fields : str or list(str)
+        Field name, or list of field names.
+    handle : str
+        PV handle, 'readback' (default), 'readset' or 'setpoint'.
+
+    Keyword Arguments
+    -----------------
+    timeout : float
+        Timeout in second for connecting and reading all the PVs, default
+        is 1.0.
+
+    Returns
+    -------
+    r : tuple
+        Tuple of value and validity mask arrays, both are of the shape
+        (number of elements, number of fields), or (number of elements,) if
+        *fields* is a str; invalid values (element does not have the field,
+        PV is not connected, or value is not a scalar) are NaN.
+
+    See Also
+    --------
+    :meth:`~phantasy.library.lattice.Lattice.read_fields`
+    """
+    timeout = kws.get('timeout', 1.0)
+    is_single_field = isinstance(fields, str)
+    if is_single_field:
+        fields = fields,
+
+    # PV names of all cells of (element, field)
+    cells = []
+    pv_names = {}
+    for i, elem in enumerate(elements):
+        if elem is None:
+            continue
+        for j, f in enumerate(fields):
+            fld = elem._fields.get(f, None)
+            if fld is None:
+                continue
+            # PV names, not PV objects, which are not created in lazy mode
+            names = getattr(fld, handle)
+            if not names:
+                continue
+            cells.append((i, j, fld, names))
+            pv_names.update(dict.fromkeys(names))
+    names = list(pv_names)
+    pv_values = {}
+    if names:
+        pv_values = dict(zip(names, caget_many(names, timeout=timeout)))
+
+    # apply read policies, cells are grouped by scaling laws.
+    scaled = {}
+    for i, j, fld, names in cells:
+        vals = [pv_values[n] for n in names]
+        if None in vals:
+            continue
+        read_policy, fn = fld.read_policy, None
+        if isinstance(read_policy, _UnicornReadPolicy):
+            read_policy, fn = read_policy.read_policy, read_policy.fn
+        try:
+            v = float(read_policy([_PVValue(v) for v in vals]))
+        except (TypeError, ValueError):
+            continue
+        scaled.setdefault(id(fn), (fn, []))[1].append((i, j, v))
+
+    value = np.full((len(elements), len(fields)), np.nan)
+    for fn, items in scaled.values():
+        ii, jj, x = zip(*items)
+        value[ii, jj] = _apply_scaling(fn, np.asarray(x, dtype=float))
+    valid = ~np.isnan(value)
+
+    if is_single_field:
+        return value[:, 0], valid[:, 0]
+    return value, valid
+
+
+class _PVValue(object):
+    # PV-like object holding the value read already, for read policy.
+    auto_monitor = True
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self, **kws):
+        return self.value
+
+
+def _apply_scaling(fn, x):
+    # apply scaling law *fn* on array *x*, element-wise if *fn* does not
+    # support array input, NaN if fails.
+    if fn is None:
+        return x
+    try:
+        y = np.asarray(fn(x), dtype=float)
+        if y.shape == x.shape:
+            return y
+    except Exception:
+        pass
+    y = np.full(x.shape, np.nan)
+    for k, xk in enumerate(x):
+        try:
+            y[k] = fn(xk)
+        except Exception:
+            _LOGGER.debug("Failed to apply scaling law on {}.".format(xk))
+    return y
+
+
+def write_fields(items, **kws):
+    """Write values to fields of elements at once, physics values are
+    converted to engineering values in bulk, all CA puts are issued without
+    blocking, optionally wait for all the puts to complete.
+
+    Parameters
+    ----------
+    items : list
+        List of tuple of (CaElement, field name, value).
+
+    Keyword Arguments
+    -----------------
+    wait : bool
+        If True, wait for the completion of all the puts, default is False.
+    timeout : float
+        Timeout in second for connecting all the PVs, and for waiting all
+        the puts to complete if *wait* is True, default is 10.0.
+
+    Returns
+    -------
+    r : list
+        List of bool, if the value of each item is written.
+
+    Note
+    ----
+    Non-scalar values are set one by one as ``setattr(elem, field, value)``,
+    fields with *ensure_put* enabled are set after all the others, with
+    :func:`~phantasy.library.pv.ensure_put_many`.
+    """
+    wait = kws.get('wait', False)
+    timeout = kws.get('timeout', 10.0)
+    written = [False] * len(items)
+
+    cells, ensured = [], []
+    for k, (elem, field, value) in enumerate(items):
+        fld = elem._fields.get(field, None)
+        if fld is None or field in INVALID_CTRL_FIELDS:
+            _LOGGER.warning("{} [{}] is not a valid controllable field.".format(
+                elem.name, field))
+            continue
+        if not isinstance(value, Real):
+            setattr(elem, field, value)
+            written[k] = True
+            continue
+        if field in PHASE_FIELDS:
+            value = wrap_phase(value)
+        if fld.ensure_put:
+            ensured.append((k, elem, fld, value))
+            continue
+        cells.append((k, elem, fld, value))
+
+    # connect all setpoint PVs at once
+    t_end = time.time() + timeout
+    for _, _, fld, _ in cells:
+        for pv in fld.setpoint_pv:
+            pv.wait_for_connection(max(t_end - time.time(), 0))
+
+    # physics to engineering, grouped by scaling laws.
+    scaled = {}
+    for k, elem, fld, value in cells:
+        if not fld.write_access:
+            _LOGGER.warning("{} [{}] is not writable.".format(elem.name,
+                                                             fld.name))
+            continue
+        write_policy, fn = fld.write_policy, None
+        if isinstance(write_policy, _UnicornWritePolicy):
+            write_policy, fn = write_policy.write_policy, write_policy.fn
+        scaled.setdefault(id(fn), (fn, []))[1].append(
+            (k, elem, fld, write_policy, value))
+
+    puts = []
+    for fn, group in scaled.values():
+        x = np.asarray([c[-1] for c in group], dtype=float)
+        for (k, elem, fld, write_policy, value), v in zip(
+                group, _apply_scaling(fn, x)):
+            if np.isnan(v):
+                continue
+            write_policy([_PVPut(pv, puts) for pv in fld.setpoint_pv], float(v))
+            elem._last_settings.update([(fld.name, value)])
+            written[k] = True
+
+    for pv, v in puts:
+        pv.put(v, wait=False, use_complete=wait)
+    if wait:
+        t_end = time.time() + timeout
+        while not all(pv.put_complete for pv, _ in puts) and \
+                time.time() < t_end:
+            ca.poll()
+        if not all(pv.put_complete for pv, _ in puts):
+            _LOGGER.warning("Not all puts are completed in {} sec.".format(
+                timeout))
+
+    if ensured:
+        ensure_put_many([c[2] for c in ensured], [c[3] for c in ensured],
+                        tol=[c[2].tolerance for c in ensured],
+                        timeout=[c[2].timeout for c in ensured])
+        for k, elem, fld, value in ensured:
+            elem._last_settings.update([(fld.name, value)])
+            written[k] = True
+    return written
+
+
+class _PVPut(object):
+    # PV-like object records the value to put, for write policy.
+    def __init__(self, pv, puts):
+        self._pv = pv
+        self._puts = puts
+
+    def put(self, value, **kws):
+        self._puts.append((self._pv, value))
+
+    def __getattr__(self, key):
+        return getattr(self._pv, key)
+
+
 def _get_spos(pvname):
     """Extract s-position from PV name.
 
@@ -1862,6 +2353,11 @@ def _parse_pv_name(pvname):
     return element_name, field_name
 
 
+def _no_scaling(x):
+    # scaling law between the same engineering and physics units.
+    return x
+
+
 def wrap_phase(value):
     """Wrap phase input (*value*) into -180 to 180.
     """
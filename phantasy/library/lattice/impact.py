@@ -10,8 +10,9 @@ Library for generating IMPACT lattice file (test.in) from Accelerator Design Des
 .. moduleauthor:: Dylan Maxwell <maxwelld@frib.msu.edu>
 """
 
-import sys, os.path, logging, subprocess, shutil, tempfile, json, random
+import sys, os.path, logging, subprocess, shutil, tempfile, json, random, queue
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from collections import OrderedDict
 
@@ -1977,3 +1978,185 @@ class _LatticeRunner(object):
             _LOGGER.debug("LatticeRunner: Cleanup: remove work directory")
             shutil.rmtree(work_dir)
 
+
+
+# IMPACT output files removed before each run in the pool.
+_OUTPUT_FILES = ("fort.18", "fort.24", "fort.25", "fort.26", "impact_result.npz")
+
+
+def run_lattices(lattices, **kwargs):
+    """Convenience method to run IMPACT for many lattices concurrently.
+
+    :param lattices: list of IMPACT Lattice objects
+    :param config: machine configuration
+    :param data_dir: path of directory containing IMPACT data files
+    :param work_dir: path of directory for the working directories of pool
+    :param nworkers: number of IMPACT runs in parallel
+    :param nprocessors: number of MPI processes of each IMPACT run
+    :return: generator of (index of lattice, Result) as the runs complete
+    """
+    with RunPool(**kwargs) as pool:
+        for r in pool.imap_unordered(lattices):
+            yield r
+
+
+class RunPool(object):
+    """Run IMPACT for many lattices concurrently with a pool of warm
+    working directories, each directory is populated with the data files
+    once and reused by the following runs.
+
+    The results are parsed into :class:`~phantasy.library.model.impact.Result`
+    as soon as a run is complete, before its working directory is reused.
+
+    Examples
+    --------
+    >>> with RunPool(config=config, nworkers=8) as pool:
+    >>>     for idx, result in pool.imap_unordered(lattices):
+    >>>         print(idx, result.getEnergy()[-1])
+    """
+
+    def __init__(self, **kwargs):
+        """Create the working directories.
+
+        :param config: machine configuration
+        :param data_dir: path of directory containing IMPACT data files
+        :param work_dir: path of directory for the working directories,
+                         a temporary directory is created if not given
+        :param nworkers: number of IMPACT runs in parallel, by default the
+                         number of CPUs divided by *nprocessors*
+        :param nprocessors: number of MPI processes of each IMPACT run,
+                            for the default *nworkers* only, from the
+                            configuration or 1 by default
+        :param impact: IMPACT-Z version, "FRIB" by default
+        """
+        self.config = kwargs.get("config")
+        self.impact = kwargs.get("impact", "FRIB")
+
+        data_dir = kwargs.get("data_dir", None)
+        if (data_dir is None) and self.config.has_default(CONFIG_IMPACT_DATA_DIR):
+            data_dir = self.config.getabspath_default(CONFIG_IMPACT_DATA_DIR)
+        if data_dir is None:
+            raise RuntimeError("RunPool: No data directory provided, check the configuration")
+        if not os.path.isdir(data_dir):
+            raise RuntimeError("RunPool: Data directory not found: {}".format(data_dir))
+        self._data_dir = os.path.abspath(data_dir)
+
+        if self.config.has_default(CONFIG_IMPACT_EXE_FILE):
+            self._impact_exe = self.config.get_default(CONFIG_IMPACT_EXE_FILE)
+        else:
+            self._impact_exe = _DEFAULT_IMPACT_EXE
+
+        nprocessors = kwargs.get("nprocessors", None)
+        if nprocessors is None:
+            if self.config.has_default(CONFIG_IMPACT_NPROCESSORS):
+                nprocessors = self.config.getint_default(CONFIG_IMPACT_NPROCESSORS)
+            else:
+                nprocessors = _DEFAULT_NPROCESSORS
+        nworkers = kwargs.get("nworkers", None)
+        if nworkers is None:
+            # each run takes nprocessors CPUs, do not oversubscribe
+            nworkers = (os.cpu_count() or 1) // max(1, int(nprocessors))
+        self.nworkers = max(1, int(nworkers))
+
+        work_dir = kwargs.get("work_dir", None)
+        if work_dir is not None:
+            if os.path.isfile(work_dir):
+                raise RuntimeError("RunPool: Working directory must be a directory: {}".format(work_dir))
+            os.makedirs(work_dir, exist_ok=True)
+            self._rm_work_dir = False
+        else:
+            work_dir = tempfile.mkdtemp(_TEMP_DIRECTORY_SUFFIX)
+            self._rm_work_dir = True
+        self.work_dir = work_dir
+
+        self._free_dirs = queue.Queue()
+        for i in range(self.nworkers):
+            run_dir = os.path.join(work_dir, "run_{}".format(i))
+            os.makedirs(run_dir, exist_ok=True)
+            self._link_data_files(run_dir)
+            self._free_dirs.put(run_dir)
+        _LOGGER.info("RunPool: %d working directories in %s", self.nworkers, work_dir)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.nworkers)
+
+    @property
+    def config(self):
+        return self._config
+
+    @config.setter
+    def config(self, config):
+        if not isinstance(config, Configuration):
+            raise TypeError("RunPool: 'config' property must be type Configuration")
+        self._config = config
+
+    def _link_data_files(self, run_dir):
+        for datafile in os.listdir(self._data_dir):
+            srcpath = os.path.join(self._data_dir, datafile)
+            destpath = os.path.join(run_dir, datafile)
+            if os.path.isfile(srcpath) and not os.path.exists(destpath):
+                os.symlink(srcpath, destpath)
+
+    def _run(self, lattice):
+        """Run IMPACT for *lattice* in a free working directory, return the
+        Result object.
+        """
+        from phantasy.library.model.impact import Result
+
+        run_dir = self._free_dirs.get()
+        try:
+            for f in _OUTPUT_FILES:
+                path = os.path.join(run_dir, f)
+                if os.path.isfile(path):
+                    os.remove(path)
+            with open(os.path.join(run_dir, "test.in"), "w") as fp:
+                with open(os.path.join(run_dir, "model.map"), "w") as mapfp:
+                    lattice.write(fp, mapstream=mapfp)
+            proc = subprocess.run(["mpirun", "-np", str(lattice.nprocessors), self._impact_exe],
+                                  cwd=run_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            if proc.returncode != 0:
+                raise RuntimeError("RunPool: IMPACT exited with status {}: {}".format(
+                                   proc.returncode, proc.stdout.decode(errors='replace')))
+            result = Result(self.impact, run_dir)
+            result.updateResult()
+            return result
+        finally:
+            self._free_dirs.put(run_dir)
+
+    def submit(self, lattice):
+        """Submit an IMPACT run of *lattice*.
+
+        :param lattice: IMPACT Lattice object
+        :return: Future object of the Result
+        """
+        if not isinstance(lattice, Lattice):
+            raise TypeError("RunPool: 'lattice' must be type Lattice")
+        return self._executor.submit(self._run, lattice)
+
+    def imap_unordered(self, lattices):
+        """Run IMPACT for all *lattices*, yield (index of lattice, Result)
+        in the order of completion, raise the error of the first failed run.
+        """
+        futures = {self.submit(lat): i for i, lat in enumerate(lattices)}
+        for fut in as_completed(futures):
+            yield futures[fut], fut.result()
+
+    def map(self, lattices):
+        """Run IMPACT for all *lattices*, return the list of Result in the
+        order of *lattices*.
+        """
+        return [fut.result() for fut in [self.submit(lat) for lat in lattices]]
+
+    def close(self):
+        """Wait for the submitted runs and remove the working directories
+        created by the pool.
+        """
+        self._executor.shutdown(wait=True)
+        if self._rm_work_dir:
+            _LOGGER.debug("RunPool: Cleanup: remove work directory")
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Lookup tables for fast element queries of high-level lattice.
+"""
+import logging
+import numpy as np
+
+from bisect import bisect_left
+from bisect import bisect_right
+
+from phantasy.library.misc import compile_pattern
+
+_LOGGER = logging.getLogger(__name__)
+
+# characters start a wildcard in Unix shell style pattern
+_WILDCARD_CHARS = '*?['
+
+
+class LatticeIndex(object):
+    """Index of lattice elements, keeps elements sorted by s-position and
+    element names sorted alphabetically, so that the query by position range
+    or by name pattern with literal prefix costs O(log n + k).
+
+    The index is maintained incrementally by
+    :class:`~phantasy.library.lattice.Lattice` when elements are added or
+    removed, if element list is reordered, the index is marked as stale and
+    rebuilt at the next query.
+
+    Parameters
+    ----------
+    elements : list
+        List of elements to build index from.
+    """
+
+    def __init__(self, elements=None):
+        self.rebuild([] if elements is None else elements)
+
+    @property
+    def stale(self):
+        """bool: If index needs to be rebuilt."""
+        return self._stale
+
+    def invalidate(self):
+        """Mark index as stale, rebuild it with :meth:`rebuild`."""
+        self._stale = True
+
+    def rebuild(self, elements):
+        """Rebuild index from the list of *elements*.
+        """
+        # stable sort, keep the order of elements at the same position
+        self._spos_elems = sorted((e for e in elements
+                                   if not getattr(e, 'virtual', False)),
+                                  key=lambda e: e.sb)
+        self._spos = [e.sb for e in self._spos_elems]
+        self._spos_array = None
+        self._names = sorted({e.name for e in elements})
+        self._stale = False
+
+    def add(self, elem, before_ties=True):
+        """Add *elem* into index.
+
+        Parameters
+        ----------
+        elem :
+            CaElement object.
+        before_ties : bool
+            If True, *elem* is placed before the elements of the same
+            s-position, otherwise after them.
+        """
+        if self._stale:
+            return
+        if not getattr(elem, 'virtual', False):
+            if before_ties:
+                i = bisect_left(self._spos, elem.sb)
+            else:
+                i = bisect_right(self._spos, elem.sb)
+            self._spos.insert(i, elem.sb)
+            self._spos_elems.insert(i, elem)
+            self._spos_array = None
+        i = bisect_left(self._names, elem.name)
+        if i == len(self._names) or self._names[i] != elem.name:
+            self._names.insert(i, elem.name)
+
+    def discard(self, elem):
+        """Remove *elem* from index if present.
+        """
+        if self._stale:
+            return
+        i = self._locate(elem)
+        if i is not None:
+            self._spos.pop(i)
+            self._spos_elems.pop(i)
+            self._spos_array = None
+        i = bisect_left(self._names, elem.name)
+        if i < len(self._names) and self._names[i] == elem.name:
+            self._names.pop(i)
+
+    def _locate(self, elem):
+        # index of *elem* in the position-sorted list, or None.
+        i0 = bisect_left(self._spos, elem.sb)
+        i1 = bisect_right(self._spos, elem.sb)
+        for i in range(i0, i1):
+            if self._spos_elems[i] is elem:
+                return i
+        return None
+
+    @property
+    def positions(self):
+        """Array: Sorted s-positions of all non-virtual elements."""
+        if self._spos_array is None:
+            self._spos_array = np.asarray(self._spos, dtype=float)
+        return self._spos_array
+
+    @property
+    def elements(self):
+        """list: Non-virtual elements, ascendingly sorted by s-position."""
+        return self._spos_elems
+
+    def find_srange(self, pos_start, pos_end):
+        """Return list of elements with s-position in (*pos_start*, *pos_end*].
+        """
+        i0 = bisect_right(self._spos, pos_start)
+        i1 = bisect_right(self._spos, pos_end)
+        return self._spos_elems[i0:i1]
+
+    def find_position(self, pos):
+        """Return the index of the first element at s-position *pos* in
+        :attr:`elements`, raise ValueError if not found.
+        """
+        i = bisect_left(self._spos, pos)
+        if i == len(self._spos) or self._spos[i] != pos:
+            raise ValueError("No element at s-position {}.".format(pos))
+        return i
+
+    def find_names(self, pattern):
+        """Return list of element names that matched with Unix shell style
+        *pattern*, ascendingly sorted.
+        """
+        prefix = _literal_prefix(pattern)
+        if prefix == '':
+            names = self._names
+        else:
+            i0 = bisect_left(self._names, prefix)
+            i1 = bisect_left(self._names, _prefix_upper_bound(prefix))
+            names = self._names[i0:i1]
+        if prefix == pattern:
+            return [n for n in names if n == pattern]
+        return list(filter(compile_pattern(pattern).match, names))
+
+
+def _literal_prefix(pattern):
+    """Return the leading part of *pattern* which is free of wildcards.
+    """
+    for i, c in enumerate(pattern):
+        if c in _WILDCARD_CHARS:
+            return pattern[:i]
+    return pattern
+
+
+def _prefix_upper_bound(prefix):
+    """Return the smallest string that is larger than all strings starting
+    with *prefix*.
+    """
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
@@ -21,7 +21,7 @@ from math import log10
 
 from phantasy.library.layout import Layout
 from phantasy.library.layout import build_layout
-from phantasy.library.misc import bisect_index
+from phantasy.library.misc import compile_pattern
 from phantasy.library.misc import flatten
 from phantasy.library.misc import get_intersection
 from phantasy.library.misc import parse_dt
@@ -36,10 +36,14 @@ from phantasy.library.parser import Configuration
 from phantasy.library.settings import Settings
 from phantasy.library.settings import build_flame_settings
 from phantasy.library.physics import get_orbit
-from phantasy.library.physics import inverse_matrix
+from phantasy.library.physics import OrbitResponse
+from phantasy.library.physics import wait_settle
 from .element import BaseElement
 from .element import CaElement
+from .element import read_fields
+from .element import write_fields
 from .flame import FlameLatticeFactory
+from .index import LatticeIndex
 from .impact import LatticeFactory as ImpactLatticeFactory
 from .impact import run_lattice as run_impact_lattice
 
@@ -137,6 +141,9 @@ class Lattice(object):
         # name:element, assume no duplicated element.
         self._name_element_map = {}
 
+        # s-position and name index for element queries.
+        self._index = LatticeIndex()
+
         # clean up the following parameters
         self.isring = bool(self.mtype)
         self.latticemodelmap = None
@@ -496,6 +503,93 @@ class Lattice(object):
 
         return 0
 
+    def set_many(self, settings, **kws):
+        """Set the values of multiple element fields at once.
+
+        Parameters
+        ----------
+        settings : dict
+            Key-value pairs of (element, field) and value, element could be
+            CaElement object or element name.
+
+        Keyword Arguments
+        -----------------
+        source : str
+            Three options available: 'all', 'control' and 'model', by default
+            'all', i.e. update both 'control' and 'model' environment.
+        wait : bool
+            If True, wait for all the puts to complete, default is False.
+        timeout : float
+            Timeout in second for connecting and put completion, default is
+            10.0.
+
+        Returns
+        -------
+        ret : dict
+            Key-value pairs of (element name, field) and if the value is set
+            to 'control' environment, empty if *source* is 'model'.
+
+        Note
+        ----
+        All the puts to 'control' environment are issued without blocking,
+        physics to engineering conversions are applied in bulk. All the
+        traced entries share the same timestamp and *group* id, which could
+        be rolled back together by :meth:`roll_back`.
+
+        Examples
+        --------
+        >>> s = {(e.name, f): v for e, f, v in ...}
+        >>> lat.set_many(s, source='control', wait=True)
+        """
+        source = kws.get('source', 'all')
+        if source not in ('all', 'control', 'model'):
+            raise RuntimeError("Invalid source.")
+
+        items = []
+        for (elem, field), value in settings.items():
+            _elem = self._find_exact_element(elem) if isinstance(elem, str) \
+                else elem
+            if _elem is None or field not in _elem.fields:
+                _LOGGER.warning(
+                    f"Invalid element field to set: {elem} [{field}].")
+                continue
+            items.append((_elem, field, value))
+
+        ts = time.time()
+        retval = {}
+        if source in ('all', 'control'):
+            ctrl_items = [(elem, field, _normalize_phase(value))
+                          if elem.family == "CAV" and field in {'PHA', 'PHASE'}
+                          else (elem, field, value)
+                          for elem, field, value in items]
+            value0 = [elem.last_settings.get(field)
+                      for elem, field, _ in ctrl_items]
+            # read current values at once for fields never set before
+            i_none = [i for i, v in enumerate(value0) if v is None]
+            if self._trace == 'on' and i_none:
+                elems = [ctrl_items[i][0] for i in i_none]
+                fields = sorted({ctrl_items[i][1] for i in i_none})
+                col = {f: j for j, f in enumerate(fields)}
+                v_rd, valid = read_fields(elems, fields)
+                for n, i in enumerate(i_none):
+                    j = col[ctrl_items[i][1]]
+                    if valid[n, j]:
+                        value0[i] = float(v_rd[n, j])
+            written = write_fields(ctrl_items, wait=kws.get('wait', False),
+                                   timeout=kws.get('timeout', 10.0))
+            for (elem, field, value), v0, ok in zip(ctrl_items, value0,
+                                                    written):
+                retval[(elem.name, field)] = ok
+                if ok:
+                    self._log_trace('control', element=elem.name,
+                                    field=field, value0=v0, value=value,
+                                    timestamp=ts, group=ts)
+        if source in ('all', 'model'):
+            for elem, field, value in items:
+                self._set_model_field(elem, field, value,
+                                      timestamp=ts, group=ts)
+        return retval
+
     def _set_control_field(self, elem, field, value):
         """Set value to element field onto 'control' environment.
         """
@@ -508,8 +602,9 @@ class Lattice(object):
         self._log_trace('control', element=elem.name,
                         field=field, value0=value0, value=value)
 
-    def _set_model_field(self, elem, field, value):
-        """Set *value* to *elem* *field* in 'model' environment.
+    def _set_model_field(self, elem, field, value, **kws):
+        """Set *value* to *elem* *field* in 'model' environment, keyword
+        arguments are passed to :meth:`_log_trace`.
         """
         if isinstance(elem, CaElement):
             elem_name = elem.name
@@ -528,8 +623,8 @@ class Lattice(object):
             _LOGGER.debug(
                 "Updated field: {0:s} of element: {1:s} with value: {2:f}.".format(
                     field, elem_name, value))
-        self._log_trace('model', element=elem_name, field=field,
-                        value=value, value0=value0)
+            self._log_trace('model', element=elem_name, field=field,
+                            value=value, value0=value0, **kws)
 
     def _log_trace(self, type, **kws):
         """Add set log entry into trace history.
@@ -543,6 +638,8 @@ class Lattice(object):
         field
         value
         value0
+        group
+            Id of the group of entries set together, see :meth:`set_many`.
         """
         if self._trace == 'on':
             name = kws.get('element')
@@ -550,13 +647,16 @@ class Lattice(object):
             value = kws.get('value')
             value0 = kws.get('value0')
             log_entry = OrderedDict((
-                ('timestamp', time.time()),
+                ('timestamp', kws.get('timestamp', time.time())),
                 ('type', type),
                 ('element', name),
                 ('field', field),
                 ('value0', value0),
                 ('value', value),
             ))
+            group = kws.get('group', None)
+            if group is not None:
+                log_entry['group'] = group
             self._trace_history.append(log_entry)
         else:
             pass
@@ -619,6 +719,42 @@ class Lattice(object):
 
         return retval
 
+    def read_fields(self, elements, fields, handle='readback', **kws):
+        """Read the values of *fields* of all *elements* with one batched CA
+        get, read policies and scaling laws are applied on the whole array.
+
+        Parameters
+        ----------
+        elements : list
+            List of CaElement objects or element names.
+        fields : str or list(str)
+            Field name, or list of field names.
+        handle : str
+            PV handle, 'readback' (default), 'readset' or 'setpoint'.
+
+        Keyword Arguments
+        -----------------
+        timeout : float
+            Timeout in second for connecting and reading all the PVs,
+            default is 1.0.
+
+        Returns
+        -------
+        r : tuple
+            Tuple of value and validity mask arrays, both are of the shape
+            (number of elements, number of fields), or (number of elements,)
+            if *fields* is a str; invalid values are NaN.
+
+        Examples
+        --------
+        >>> bpms = lat.get_elements(type='BPM')
+        >>> value, valid = lat.read_fields(bpms, ['X', 'Y'])
+        >>> x, y = value[valid.all(axis=1)].T
+        """
+        elems = [self._find_exact_element(e) if isinstance(e, str) else e
+                 for e in elements]
+        return read_fields(elems, fields, handle, **kws)
+
     def _get_model_field(self, elem, field, **kws):
         """Get field value(s) from elment.
 
@@ -803,6 +939,11 @@ class Lattice(object):
         if setting is None:
             if _history != []:
                 setting = _history[-1]
+                # entries set together by set_many()
+                group = setting.get('group', None)
+                if group is not None:
+                    setting = [e for e in _history
+                               if e.get('group', None) == group]
 
         if retroaction is not None:
             setting = _get_retroactive_trace_history(_history, retroaction)
@@ -810,12 +951,22 @@ class Lattice(object):
         if not isinstance(setting, (list, tuple)):
             setting = setting,
 
+        # entries set by set_many() are rolled back together, the others
+        # one by one as they were set.
+        groups = {}
         for entry in setting:
             _elem_name = entry.get('element')
             _entry_type = entry.get('type')
             _field_name = entry.get('field')
             _value = entry.get('value0')
-            self.set(_elem_name, _value, _field_name, source=_entry_type)
+            _group = entry.get('group', None)
+            if _group is None:
+                self.set(_elem_name, _value, _field_name, source=_entry_type)
+            else:
+                groups.setdefault((_group, _entry_type), {})[
+                    (_elem_name, _field_name)] = _value
+        for (_, _entry_type), s in groups.items():
+            self.set_many(s, source=_entry_type, wait=True)
 
     def update_model_settings(self, model_lattice, **kws):
         """Update model lattice settings with external lattice file, prefer
@@ -876,17 +1027,26 @@ class Lattice(object):
         if data_source == 'control':
             _LOGGER.info("Sync settings from 'control' to 'model'.")
             model_settings = self.settings
+            elems = [elem for elem in self._get_element_list('*')
+                     if elem.name in model_settings and
+                     not self._skip_elements(elem.name)]
+            all_fields = sorted({f for elem in elems for f in elem.fields})
+            col = {f: j for j, f in enumerate(all_fields)}
+            # read all fields at once, fall back to field value for the
+            # invalid ones, e.g. waveform or not connected.
+            values, valid = self.read_fields(elems, all_fields)
+            for i, elem in enumerate(elems):
+                for field in elem.fields:
+                    j = col[field]
+                    value = float(values[i, j]) if valid[i, j] \
+                        else getattr(elem, field)
+                    if field in model_settings[elem.name]:
+                        self._set_model_field(elem, field, value)
+                    else:
+                        _LOGGER.debug(
+                            f'Model settings does not have field: {elem.name}:{field}.')
             for elem in self._get_element_list('*'):
-                if elem.name in model_settings:
-                    if not self._skip_elements(elem.name):
-                        for field, value in self.get(elem=elem,
-                                                     source='control').items():
-                            if field in model_settings[elem.name]:
-                                self._set_model_field(elem, field, value)
-                            else:
-                                _LOGGER.debug(
-                                    f'Model settings does not have field: {elem.name}:{field}.')
-                else:
+                if elem.name not in model_settings:
                     _LOGGER.debug(
                         f'Model settings does not have element: {elem.name}.')
         elif data_source == 'model':
@@ -1029,6 +1189,26 @@ class Lattice(object):
             name = name.name
         return self._name_element_map.get(name, None)
 
+    def _get_index(self):
+        """Return element index, rebuild if it is stale.
+        """
+        if self._index.stale:
+            self._index.rebuild(self._elements)
+        return self._index
+
+    def _lookup_elements(self, name):
+        """Return list of elements by exact element name, group name or
+        element name pattern, by the order of priority, elements are
+        looked up through the lattice index.
+        """
+        elem = self._find_exact_element(name)
+        if elem is not None:
+            return [elem]
+        if name in self._group:
+            return self._group[name]
+        return [self._name_element_map[n]
+                for n in self._get_index().find_names(name)]
+
     def get_elements(self, name=None, type=None, srange=None, **kws):
         """Get element(s) with defined filter rules.
 
@@ -1128,38 +1308,38 @@ class Lattice(object):
         :class:`~phantasy.library.lattice.element.CaElement`
             Element class.
         """
-        valid_types = self.get_all_types(virtual=False)
-
         # name
         if isinstance(name, str):
-            ele_names = self._get_element_list(name)
-        elif isinstance(name, (list, tuple)):
-            ele_names = flatten(self._get_element_list(n) for n in name)
-        else:
-            ele_names = []
+            name = name,
+        ele_names = set()
+        if isinstance(name, (list, tuple)):
+            for n in name:
+                ele_names.update(self._lookup_elements(n))
 
         # group
+        ele_types = set()
         if type is not None:
             if isinstance(type, str):
                 type = type,
-            _type_list = flatten(pattern_filter(valid_types, p) for p in type)
-            ele_types = flatten(self._get_element_list(t) for t in _type_list)
-        else:
-            ele_types = []
+            valid_types = self.get_all_types(virtual=False)
+            for p in type:
+                for t in pattern_filter(valid_types, p):
+                    ele_types.update(self._lookup_elements(t))
 
         # srange
         if isinstance(srange, (list, tuple)):
-            pos_start, pos_end = srange[0], srange[1]
-            # by default elems is sorted, if not, sort it before using.
-            elems = self._get_element_list('*', virtual=False)
-            s = [e.sb for e in elems]
-            index0 = bisect_index(s, pos_start)
-            index1 = bisect_index(s, pos_end)
-            ele_srange = elems[index0:index1]
+            ele_srange = self._get_index().find_srange(srange[0], srange[1])
         else:
             ele_srange = []
 
-        ret_elems = get_intersection(ele_names, ele_types, ele_srange)
+        # intersection of non-empty results
+        ret_elems = set()
+        for i, elems in enumerate(
+                [v for v in (ele_names, ele_types, ele_srange) if v]):
+            if i == 0:
+                ret_elems.update(elems)
+            else:
+                ret_elems.intersection_update(elems)
 
         sk = kws.get('sort_key', 'sb')
         if sk == 'pos':
@@ -1290,10 +1470,9 @@ class Lattice(object):
 
         etype = kws.get('type', None)
 
-        elem_sorted = sorted([e for e in self._elements if e.virtual == 0],
-                             key=lambda e: e.sb)
-        spos_list = [e.sb for e in elem_sorted]
-        ref_idx = spos_list.index(ref_elem.sb)
+        index = self._get_index()
+        elem_sorted = index.elements
+        ref_idx = index.find_position(ref_elem.sb)
         if count_is_positive:
             eslice0 = slice(ref_idx + 1, ref_idx + count + 1, 1)
         else:
@@ -1411,11 +1590,13 @@ class Lattice(object):
 
         if i is not None:
             self._elements.insert(i, elem)
+            self._index.invalidate()
         else:
             if len(self._elements) == 0:
                 self._elements.append(elem)
             else:
                 _inplace_order_insert(elem, self._elements)
+            self._index.add(elem, before_ties=True)
 
         self.update_name_element_map(elem)
 
@@ -1442,6 +1623,7 @@ class Lattice(object):
         """
         if not self.has_element(elem.name):
             self._elements.append(elem)
+            self._index.add(elem, before_ties=False)
             self.update_name_element_map(elem)
             return True
         else:
@@ -1501,6 +1683,7 @@ class Lattice(object):
         if kws.get('inplace', False):
             if elements is None:
                 self._elements = sorted_elemlist
+                self._index.invalidate()
             else:
                 _LOGGER.warning(
                     "'inplace' sort is only valid when 'elements=None'."
@@ -1528,6 +1711,9 @@ class Lattice(object):
         for i, e in enumerate(self._elements):
             if e.name != name:
                 continue
+            self._index.discard(e)
+            if self._name_element_map.get(name) is e:
+                self._name_element_map.pop(name)
             return self._elements.pop(i)
         return None
 
@@ -1685,16 +1871,17 @@ class Lattice(object):
         ret : list
             List of group names.
         """
+        match = compile_pattern(name).match
         if element is None:
             if kws.get('empty', True):
-                g = [k for k, v in self._group.items() if fnmatch(k, name)]
+                g = [k for k in self._group if match(k)]
             else:
-                g = [k for k, v in self._group.items() if fnmatch(k, name)
+                g = [k for k, v in self._group.items() if match(k)
                      and v != []]
             return g
         else:
             return [k for k, v in self._group.items()
-                    if fnmatch(k, name) and element in [el.name for el in v]]
+                    if match(k) and element in {el.name for el in v}]
 
     def get_group_members(self, group, **kws):
         """Return element members by applying proper filtering operation on
@@ -1719,9 +1906,7 @@ class Lattice(object):
         op = kws.get('op', 'and')
         if isinstance(group, str):
             group = group,
-        group_list = flatten(
-            [[g for g in self._group if fnmatch(g, gi)] for gi in group]
-        )
+        group_list = pattern_filter(self._group, group)
         elem_dict = {g: self._group[g] for g in group_list}
 
         if op == 'and':
@@ -1731,18 +1916,57 @@ class Lattice(object):
 
     @property
     def orm(self):
-        """Array: Orbit response matrix.
+        """Array: Orbit response matrix, could be set with an array or
+        :class:`~phantasy.library.physics.orm.OrbitResponse`, read-only
+        since the inverse matrices are cached, set a new one to change.
 
         See Also
         --------
         :func:`~phantasy.library.physics.orm.get_orm`
             Calculator orbit response matrix.
         """
-        return self._orm
+        if self._orm is None:
+            return None
+        return self._orm.matrix
 
     @orm.setter
     def orm(self, m):
-        self._orm = m
+        if m is None or isinstance(m, OrbitResponse):
+            self._orm = m
+        else:
+            self._orm = OrbitResponse(m)
+
+    @property
+    def orbit_response(self):
+        """OrbitResponse: Orbit response matrix with the names of correctors
+        and BPMs, the inverse matrices are cached.
+        """
+        return self._orm
+
+    def load_orm(self, filepath):
+        """Load ORM from *filepath* saved by :meth:`save_orm`.
+        """
+        self._orm = OrbitResponse.load(filepath)
+
+    def save_orm(self, filepath):
+        """Save ORM to *filepath*, compressed *.npz* or HDF5 (*.h5*).
+        """
+        if self._orm is None:
+            _LOGGER.warning("ORM is not available.")
+            return
+        self._orm.save(filepath)
+
+    def _get_orm_inverse(self, correctors, bpms, **kws):
+        # inverse of the sub ORM if ORM is indexed, or the whole one.
+        if self._orm is None:
+            _LOGGER.error("correct_orbit: ORM is not available, set ORM first.")
+            raise RuntimeError("INVALID ORM data.")
+        orm = self._orm
+        xoy = kws.get('xoy', 'xy')
+        if orm.contains(correctors, bpms, xoy):
+            orm = orm.select(correctors, bpms, xoy)
+        return orm.pinv(nsv=kws.get('nsv', None), rcond=kws.get('rcond', None),
+                        alpha=kws.get('alpha', 0.0))
 
     def correct_orbit(self, correctors, bpms, **kws):
         """Correct orbit by using ORM.
@@ -1769,7 +1993,14 @@ class Lattice(object):
         iteration : int
             Iteration numbers of correction, default is 1.
         wait : float
-            Wait time after set value, in *sec*, 1.0 by default.
+            Maximum wait time after set value, in *sec*, 1.0 by default, see
+            :func:`~phantasy.library.physics.orm.wait_settle` for settle
+            detection.
+        settle : bool
+            If False, always wait *wait* seconds after set value, default is
+            True.
+        settle_times : list
+            If defined, append (corrector name(s), settle time) for each step.
         echo : bool
             Print out message or not, default is True.
         msg_queue : Queue
@@ -1780,6 +2011,13 @@ class Lattice(object):
             Lower limit for corrector settings.
         cor_max : float
             Upper limit for corrector settings.
+        nsv : int
+            Number of singular values of ORM to keep, all by default.
+        rcond : float
+            Drop singular values smaller than *rcond* times the largest one.
+        alpha : float
+            Tikhonov regularization factor relative to the largest singular
+            value, 0 by default.
 
         Returns
         -------
@@ -1796,18 +2034,13 @@ class Lattice(object):
         itern = kws.get('iteration', 1)
         cor_field = kws.get('cor_field', 'ANG')
         damp_fac = kws.get('damping_factor', 0.05)
-        wait = kws.get('wait', 1.0)
         echo = kws.get('echo', True)
         q_msg = kws.get('msg_queue', None)
         mode = kws.get('mode', 'interactive')
         upper_limit_cor = kws.get('cor_max', 5.0)   # A
         lower_limit_cor = kws.get('cor_min', -5.0)  # A
 
-        if self._orm is None:
-            _LOGGER.error("correct_orbit: ORM is not available, set ORM first.")
-            raise RuntimeError("INVALID ORM data.")
-        m = self._orm
-        m_inv = inverse_matrix(m)
+        m_inv = self._get_orm_inverse(correctors, bpms, **kws)
 
         n_cor = len(correctors)
         for i in range(1, itern + 1):
@@ -1818,10 +2051,11 @@ class Lattice(object):
                 v_to_set = limit_input(v0 + v,
                         lower_limit_cor, upper_limit_cor)
                 setattr(e, cor_field, v_to_set)
-                time.sleep(wait)
-                msg = "[{0}] #[{1}]/[{2}] Set [{3:02d}] {4} [{5}]: {6:>10.6g}.".format(
+                dt = wait_settle(e, cor_field, v_to_set, bpms,
+                                 **dict(kws, origins=v0))
+                msg = "[{0}] #[{1}]/[{2}] Set [{3:02d}] {4} [{5}]: {6:>10.6g} [settled in {7:.3f}s].".format(
                        epoch2human(time.time(), fmt=TS_FMT),
-                       i, itern, ic + 1, e.name, cor_field, v_to_set)
+                       i, itern, ic + 1, e.name, cor_field, v_to_set, dt)
                 if q_msg is not None:
                     q_msg.put((((ic + (i - 1) * n_cor))* 100.0 / n_cor / itern, msg))
                 if echo:
@@ -1854,7 +2088,16 @@ class Lattice(object):
         iteration : int
             Iteration numbers of correction, default is 1.
         wait : float
-            Wait time after set value, in *sec*, 1.0 by default.
+            Maximum wait time after set value, in *sec*, 1.0 by default, see
+            :func:`~phantasy.library.physics.orm.wait_settle` for settle
+            detection.
+        settle : bool
+            If False, always wait *wait* seconds after set value, default is
+            True.
+        settle_times : list
+            If defined, append (corrector name(s), settle time) for each step.
+        bpms : list
+            List of BPM elements to watch for settle detection.
         echo : bool
             Print out message or not, default is True.
         msg_queue : Queue
@@ -1865,6 +2108,10 @@ class Lattice(object):
             Lower limit for corrector settings.
         cor_max : float
             Upper limit for corrector settings.
+        bulk : bool
+            If True, set all correctors at once by :meth:`set_many` for each
+            iteration, then wait until all of them are settled (bounded by
+            *wait*), default is False.
 
         See Also
         --------
@@ -1874,7 +2121,8 @@ class Lattice(object):
             correction.
         """
         itern = kws.get('iteration', 1)
-        wait = kws.get('wait', 1.0)
+        bulk = kws.get('bulk', False)
+        bpms = kws.get('bpms', None)
         echo = kws.get('echo', True)
         q_msg = kws.get('msg_queue', None)
         mode = kws.get('mode', 'interactive')
@@ -1883,18 +2131,33 @@ class Lattice(object):
 
         n_cor = len(settings)
         for i in range(1, itern + 1):
-            for ic, (cor, cor_field, v, v_limited) in enumerate(settings):
-                #v_to_set = limit_input(v, lower_limit_cor, upper_limit_cor)
-                v_to_set = v_limited
-                setattr(cor, cor_field, v_to_set)
-                time.sleep(wait)
-                msg = "[{0}] #[{1}]/[{2}] Set [{3:02d}] {4} [{5}]: {6:>10.6g}.".format(
-                       epoch2human(time.time(), fmt=TS_FMT),
-                       i, itern, ic + 1, cor.name, cor_field, v_to_set)
+            if bulk:
+                self.set_many({(cor, cor_field): v_limited
+                               for cor, cor_field, v, v_limited in settings},
+                              source='control')
+                dt = wait_settle([cor for cor, _, _, _ in settings],
+                                 settings[0][1] if settings else None,
+                                 [v_limited for _, _, _, v_limited in settings],
+                                 bpms, **kws)
+                msg = "[{0}] #[{1}]/[{2}] Set {3} correctors [settled in {4:.3f}s].".format(
+                       epoch2human(time.time(), fmt=TS_FMT), i, itern, n_cor, dt)
                 if q_msg is not None:
-                    q_msg.put((((ic + (i - 1) * n_cor))* 100.0 / n_cor / itern, msg))
+                    q_msg.put((i * 100.0 / itern, msg))
                 if echo:
                     print(msg)
+            else:
+                for ic, (cor, cor_field, v, v_limited) in enumerate(settings):
+                    #v_to_set = limit_input(v, lower_limit_cor, upper_limit_cor)
+                    v_to_set = v_limited
+                    setattr(cor, cor_field, v_to_set)
+                    dt = wait_settle(cor, cor_field, v_to_set, bpms, **kws)
+                    msg = "[{0}] #[{1}]/[{2}] Set [{3:02d}] {4} [{5}]: {6:>10.6g} [settled in {7:.3f}s].".format(
+                           epoch2human(time.time(), fmt=TS_FMT),
+                           i, itern, ic + 1, cor.name, cor_field, v_to_set, dt)
+                    if q_msg is not None:
+                        q_msg.put((((ic + (i - 1) * n_cor))* 100.0 / n_cor / itern, msg))
+                    if echo:
+                        print(msg)
             if i+1 > itern:
                 break
             if mode != 'interactive':
@@ -1922,7 +2185,16 @@ class Lattice(object):
         Keyword Arguments
         -----------------
         wait : float
-            Wait time after set value, in *sec*, 1.0 by default.
+            Maximum wait time after set value, in *sec*, 1.0 by default, see
+            :func:`~phantasy.library.physics.orm.wait_settle` for settle
+            detection.
+        settle : bool
+            If False, always wait *wait* seconds after set value, default is
+            True.
+        settle_times : list
+            If defined, append (corrector name(s), settle time) for each step.
+        bpms : list
+            List of BPM elements to watch for settle detection.
         msg_queue : Queue
             A queue that keeps log messages.
         idx : int
@@ -1932,20 +2204,20 @@ class Lattice(object):
         ndigits : int
             Number of effective digits to keep for a float number.
         """
-        wait = kws.get('wait', 1.0)
         idx = kws.get('idx', 0.0)  # index of correctors
         n = kws.get('ncor', 1)     # total number of correctors
         q_msg = kws.get('msg_queue', None)
         n_trun = kws.get('ndigits', 6)
+        bpms = kws.get('bpms', None)
 
         cor, cor_field, v, v_limited = setting
         v_truncated = truncate_number(v_limited, n_trun)
         setattr(cor, cor_field, v_truncated)
-        time.sleep(wait)
+        dt = wait_settle(cor, cor_field, v_truncated, bpms, **kws)
 
-        msg = "[{0}] Set [{1:02d}] {2} [{3}]: {4:>10.6f} (RD: {5:>10.6f})".format(
+        msg = "[{0}] Set [{1:02d}] {2} [{3}]: {4:>10.6f} (RD: {5:>10.6f}) [settled in {6:.3f}s]".format(
                 epoch2human(time.time(), fmt=TS_FMT), idx + 1, cor.name,
-                cor_field, v_truncated, getattr(cor, cor_field))
+                cor_field, v_truncated, getattr(cor, cor_field), dt)
         if q_msg is not None:
             q_msg.put((idx * 100.0 / n, msg))
         print(msg)
@@ -1974,6 +2246,13 @@ class Lattice(object):
             Lower limit for corrector settings.
         cor_max : float
             Upper limit for corrector settings.
+        nsv : int
+            Number of singular values of ORM to keep, all by default.
+        rcond : float
+            Drop singular values smaller than *rcond* times the largest one.
+        alpha : float
+            Tikhonov regularization factor relative to the largest singular
+            value, 0 by default.
         sf : float
             Scaling factor multipied on settings, default is 1.0.
 
@@ -1995,11 +2274,7 @@ class Lattice(object):
         lower_limit_cor = kws.get('cor_min', -5.0)  # A
         sf = kws.get('sf', 1.0)
 
-        if self._orm is None:
-            _LOGGER.error("correct_orbit: ORM is not available, set ORM first.")
-            raise RuntimeError("INVALID ORM data.")
-        m = self._orm
-        m_inv = inverse_matrix(m)
+        m_inv = self._get_orm_inverse(correctors, bpms, **kws)
 
         settings = []
         n_cor = len(correctors)
@@ -2107,15 +2382,16 @@ class Lattice(object):
 
         if isinstance(group, str):
             # do pattern match on element name
-            ret, names = [], []
+            match = compile_pattern(group).match
+            ret, names = [], set()
             for e in self._elements:
                 if e.name in names:
                     continue
                 if not virtual and e.virtual:
                     continue
-                if fnmatch(e.name, group):
+                if match(e.name):
                     ret.append(e)
-                    names.append(e.name)
+                    names.add(e.name)
             return ret
         elif isinstance(group, list):
             # exact one-by-one match, None if not found
@@ -2293,6 +2569,7 @@ class Lattice(object):
         """
         self._elements = []
         self._name_element_map = {}
+        self._index.rebuild(self._elements)
         _LOGGER.info("Reset elements and mapping.")
 
 
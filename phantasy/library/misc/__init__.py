@@ -5,6 +5,7 @@ from .miscutils import get_intersection
 from .miscutils import machine_setter
 from .miscutils import bisect_index
 from .miscutils import pattern_filter
+from .miscutils import compile_pattern
 from .miscutils import expand_list_to_dict
 from .miscutils import simplify_data
 from .miscutils import complicate_data
@@ -24,8 +25,8 @@ from .random_word import get_random_name
 
 __all__ = [
     'flatten', 'get_intersection', 'machine_setter', 'bisect_index',
-    'pattern_filter', 'expand_list_to_dict', 'simplify_data',
-    'complicate_data', 'SpecialDict', 'parse_dt', 'epoch2human',
+    'pattern_filter', 'compile_pattern', 'expand_list_to_dict',
+    'simplify_data', 'complicate_data', 'SpecialDict', 'parse_dt', 'epoch2human',
     'cofetch', 'disable_warnings', 'set_loglevel', 'QCallback',
     'convert_epoch', 'truncate_number',
     'create_tempfile', 'create_tempdir',
@@ -5,10 +5,12 @@
 """
 import logging
 from bisect import bisect
-from fnmatch import fnmatch
+from fnmatch import translate
+from functools import lru_cache
 import getpass
 from datetime import datetime
 import os
+import re
 import tempfile
 import sys
 
@@ -28,6 +30,9 @@ __contact__ = "Tong Zhang <zhangt@frib.msu.edu>"
 
 _LOGGER = logging.getLogger(__name__)
 
+# max number of compiled Unix shell style patterns to keep.
+PATTERN_CACHE_SIZE = 1024
+
 
 def _flatten(nnn):
     """ flatten recursively defined list or tuple
@@ -161,6 +166,41 @@ def bisect_index(x, val):
     return bisect(x, val)
 
 
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _compile_pattern(pattern):
+    if isinstance(pattern, str):
+        return re.compile(translate(pattern))
+    return re.compile('|'.join(translate(p) for p in pattern))
+
+
+def compile_pattern(pattern):
+    """Compile Unix shell style pattern(s) into a regular expression object,
+    the compiled objects are cached (least recently used ones are discarded
+    first), see ``PATTERN_CACHE_SIZE``.
+
+    Parameters
+    ----------
+    pattern : str or list[str]
+        Unix shell style pattern, or a list of patterns, the compiled one
+        matches the string that matches any of the patterns.
+
+    Returns
+    -------
+    ret :
+        Compiled regular expression object, use ``match`` method to test
+        a string.
+
+    Examples
+    --------
+    >>> m = compile_pattern(['BP*', '*COR']).match
+    >>> [bool(m(i)) for i in ('BPM', 'PM', 'HCOR')]
+    [True, False, True]
+    """
+    if not isinstance(pattern, str):
+        pattern = tuple(pattern)
+    return _compile_pattern(pattern)
+
+
 def pattern_filter(x, pattern):
     """Get sub sequence from sequence by applying filter.
 
@@ -168,13 +208,14 @@ def pattern_filter(x, pattern):
     ----------
     x : sequence
         List or tuple to be filtered.
-    pattern : str
-        Unix shell style pattern to be as filter.
+    pattern : str or list[str]
+        Unix shell style pattern to be as filter, if a list of patterns is
+        defined, the item matched any of the patterns is kept.
 
     Returns
     -------
     ret : List
-        List filtered out.
+        List filtered out, keep the order of *x*.
 
     Examples
     --------
@@ -185,8 +226,10 @@ def pattern_filter(x, pattern):
     ['BPM', 'PM']
     >>> pattern_filter(a, '*COR')
     ['VCOR', 'HCOR']
+    >>> pattern_filter(a, ['*COR', 'B*'])
+    ['BPM', 'BEND', 'VCOR', 'HCOR']
     """
-    return [i for i in x if fnmatch(i, pattern)]
+    return list(filter(compile_pattern(pattern).match, x))
 
 
 def expand_list_to_dict(x, keys):
@@ -219,7 +262,7 @@ def expand_list_to_dict(x, keys):
     ret = []
     for i in x:
         if not isinstance(i, tuple):
-            ret.extend([(k, None) for k in keys if fnmatch(k, i)])
+            ret.extend([(k, None) for k in pattern_filter(keys, i)])
         else:
             if i[0] in keys:
                 ret.append(i)
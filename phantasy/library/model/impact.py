@@ -17,6 +17,9 @@ from phantasy.library.exception import DataError
 
 _LOGGER = logging.getLogger(__name__)
 
+# cache file of the parsed results in working directory
+RESULT_CACHE_FILENAME = "impact_result.npz"
+
 
 def build_result(impact="FRIB", directory=None, keep=True, **kwargs):
     """Convenience method to build IMPACT model result.
@@ -26,6 +29,54 @@ def build_result(impact="FRIB", directory=None, keep=True, **kwargs):
     return model
 
 
+def read_columns(src, usecols):
+    """Read the columns *usecols* of the whitespace separated numeric
+    table from file path or file-like object *src*, as a 2D array.
+
+    The table is parsed with the C parser of pandas, which is much faster
+    than np.loadtxt of numpy < 1.23, fall back to np.loadtxt if the table
+    cannot be parsed.
+    """
+    try:
+        import pandas as pd
+        df = pd.read_csv(src, sep=r"\s+", header=None, engine="c",
+                         dtype=float)
+        data = df.to_numpy()
+    except Exception:
+        if not isinstance(src, str):
+            src.seek(0)
+        return np.loadtxt(src, usecols=usecols, ndmin=2)
+    return np.ascontiguousarray(data[:, list(usecols)])
+
+
+def read_modelmap(src):
+    """Read the element map file of IMPACT model from file path or
+    file-like object *src*, return a tuple of the list of element names
+    and the list of orders, one for each data row.
+    """
+    if isinstance(src, str):
+        with open(src, "r") as fp:
+            text = fp.read()
+    else:
+        text = src.read()
+    names, orders = [], []
+    for line in text.splitlines():
+        row = line.split()
+        if not row:
+            continue
+        names.append(row[0])
+        orders.append(int(row[1]))
+    return names, orders
+
+
+def _is_cache_valid(cachepath, sources):
+    """Test if the cache file is newer than all the source files."""
+    if not os.path.isfile(cachepath):
+        return False
+    mtime = os.path.getmtime(cachepath)
+    return all(os.path.getmtime(i) <= mtime for i in sources if i is not None)
+
+
 class Result(object):
 
     def __init__(self, impact="FRIB", directory=None):
@@ -50,6 +101,10 @@ class Result(object):
         :param fort26:   impact longitudinal file name, numpy N x 7 array, or N x 6 for LBL version (no TWISS beta)
         :param modelmap: element map file for impact model data
         :param keep:     keep simulation results, True by default.
+        :param cache:    load the results from the cache file in working
+                         directory if it is newer than all the output files,
+                         otherwise parse the output files and save the cache
+                         file, False by default.
         :return: None
         """
 
@@ -64,6 +119,7 @@ class Result(object):
         _fort26 = kwargs.get("fort26", "fort.26")
         _modelmap = kwargs.get("modelmap", "model.map")
         _keep = kwargs.get("keep", True)
+        _cache = kwargs.get("cache", False)
 
 
         # Check if data file path is specified with a string,
@@ -118,41 +174,54 @@ class Result(object):
         else:
             modelmappath = _modelmap
 
-        # read data in if all data files are in place
         if self.impact == "FRIB":
             # z, phase (rad), energy (MeV), gamma, beta
-            self._fort18 = np.loadtxt(fort18path, usecols=(0, 1, 3, 2, 4))
             # X0, X0', Xrms, X'rms, Ex, Alpha x, Beta x
-            self._fort24 = np.loadtxt(fort24path, usecols=(1, 3, 2, 4, 7, 5, 6))
             # Y0, Y0', Yrms, Y'rms, Ey, Alpha y, Beta y
-            self._fort25 = np.loadtxt(fort25path, usecols=(1, 3, 2, 4, 7, 5, 6))
             # Z0, Z0', Zrms, Z'rms, Ez, Alpha Z, Beta z
-            self._fort26 = np.loadtxt(fort26path, usecols=(1, 3, 2, 4, 7, 5, 6))
+            usecols = (0, 1, 3, 2, 4), (1, 3, 2, 4, 7, 5, 6)
         elif self.impact in ["LBL", "LBNL"]:
-            # z, phase (rad), energy (MeV), gamma, beta
-            self._fort18 = np.loadtxt(fort18path, usecols=(0, 1, 3, 2, 4))
-            # X0, X0', Xrms, X'rms, Ex, Alpha x, Beta x
-            self._fort24 = np.loadtxt(fort24path, usecols=(1, 3, 2, 4, 6, 5))
-            # Y0, Y0', Yrms, Y'rms, Ey, Alpha y, Beta y
-            self._fort25 = np.loadtxt(fort25path, usecols=(1, 3, 2, 4, 6, 5))
-            # Z0, Z0', Zrms, Z'rms, Ez, Alpha Z, Beta z
-            self._fort26 = np.loadtxt(fort26path, usecols=(1, 3, 2, 4, 6, 5))
+            # no Twiss beta
+            usecols = (0, 1, 3, 2, 4), (1, 3, 2, 4, 6, 5)
         else:
             raise RuntimeError("Unknown IMPACT version. Cannot parse results.")
 
-        # read the model map file if provided
+        sources = [fort18path, fort24path, fort25path, fort26path, modelmappath]
+        cachepath = None
+        if _cache and all(isinstance(i, str) or i is None for i in sources):
+            cachepath = os.path.join(wkdir, RESULT_CACHE_FILENAME)
+
+        if cachepath is not None and _is_cache_valid(cachepath, sources):
+            _LOGGER.debug("Result: Load IMPACT results from %s", cachepath)
+            with np.load(cachepath) as data:
+                self._fort18, self._fort24, self._fort25, self._fort26 = \
+                    data['fort18'], data['fort24'], data['fort25'], data['fort26']
+                names, orders = data['names'].tolist(), data['orders'].tolist()
+        else:
+            # read data in if all data files are in place
+            self._fort18 = read_columns(fort18path, usecols[0])
+            self._fort24 = read_columns(fort24path, usecols[1])
+            self._fort25 = read_columns(fort25path, usecols[1])
+            self._fort26 = read_columns(fort26path, usecols[1])
+            # read the model map file if provided
+            names, orders = read_modelmap(modelmappath) if modelmappath else ([], [])
+            if cachepath is not None and _keep:
+                _LOGGER.debug("Result: Save IMPACT results to %s", cachepath)
+                np.savez(cachepath, fort18=self._fort18, fort24=self._fort24,
+                         fort25=self._fort25, fort26=self._fort26,
+                         names=np.array(names, dtype=str),
+                         orders=np.array(orders, dtype=int))
+
+        # {name: {order: [data index]}}, and the last data index of
+        # each name and (name, order).
         self._modelmap = {}
-        if modelmappath:
-            mapping = np.loadtxt(modelmappath, dtype=str)
-            for idx, mp in enumerate(mapping):
-                name, order = mp[0].strip(), int(mp[1])
-                if name == "NONE":
-                    continue
-                if name not in self._modelmap:
-                    self._modelmap[name] = {}
-                if order not in self._modelmap[name]:
-                    self._modelmap[name][order] = []
-                self._modelmap[name][order].append(idx)
+        self._lastindex = {}
+        for idx, (name, order) in enumerate(zip(names, orders)):
+            if name == "NONE":
+                continue
+            self._modelmap.setdefault(name, {}).setdefault(order, []).append(idx)
+            self._lastindex[name] = idx
+            self._lastindex[(name, order)] = idx
 
         if not _keep:
             shutil.rmtree(wkdir)
@@ -173,19 +242,11 @@ class Result(object):
         :return: array of data indexes
         """
         def lastIndex(name):
-            lastidx = -1
             if isinstance(name, (int, float)):
-                lastidx = int(name)
+                return int(name)
             elif isinstance(name, (list, tuple)):
-                for idx in self._modelmap[name[0]][name[1]]:
-                    if idx > lastidx:
-                        lastidx = idx
-            else:
-                for indexes in self._modelmap[name].values():
-                    for idx in indexes:
-                        if idx > lastidx:
-                            lastidx = idx
-            return lastidx
+                return self._lastindex[tuple(name)]
+            return self._lastindex[name]
 
         if isinstance(elems, (list, tuple)):
             elemIndex = []
@@ -213,19 +274,7 @@ class Result(object):
         :return: s position or list
         :raise: RuntimeError
         """
-        
-        if elems is None:
-            return self._fort18[:, 0]
-        else:
-            elemIdx = self.getElemIndex(elems)
-            if isinstance(elemIdx, (list, tuple)):
-                res = []
-                for idx, val in enumerate(self._fort18[:, 0]):
-                    if idx in elemIdx:
-                        res.append(val)
-                return np.array(res)
-            else:
-                return self._fort18[:, 0][elemIdx]
+        return self._select(self._fort18[:, 0], elems)
 
     def getAbsPhase(self, elems=None):
         """Get accumulated beam phase in radian at the end if elems is given, 
@@ -236,19 +285,7 @@ class Result(object):
         :return: accumulated beam phase or list
         :raise: RuntimeError
         """
-        
-        if elems is None:
-            return self._fort18[:, 1]
-        else:
-            elemIdx = self.getElemIndex(elems)
-            if isinstance(elemIdx, (list, tuple)):
-                res = []
-                for idx, val in enumerate(self._fort18[:, 1]):
-                    if idx in elemIdx:
-                        res.append(val)
-                return np.array(res)
-            else:
-                return self._fort18[:, 1][elemIdx]
+        return self._select(self._fort18[:, 1], elems)
 
     def getEnergy(self, elems=None):
         """Get beam energy in MeV/u at the end if elems is given, 
@@ -259,20 +296,8 @@ class Result(object):
         :return: beam energy or list
         :raise: RuntimeError
         """
-        
-        if elems is None:
-            return self._fort18[:, 2]
-        else:
-            elemIdx = self.getElemIndex(elems)
-            if isinstance(elemIdx, (list, tuple)):
-                res = []
-                for idx, val in enumerate(self._fort18[:, 2]):
-                    if idx in elemIdx:
-                        res.append(val)
-                return np.array(res)
-            else:
-                return self._fort18[:, 2][elemIdx]
-    
+        return self._select(self._fort18[:, 2], elems)
+
     def getBeta(self, elems=None):
         """Get beam beta (v/c) at the end if elems is given, or a list for all elements
         
@@ -281,20 +306,8 @@ class Result(object):
         :return: beta or list
         :raise: RuntimeError
         """
-        
-        if elems is None:
-            return self._fort18[:, 4]
-        else:
-            elemIdx = self.getElemIndex(elems)
-            if isinstance(elemIdx, (list, tuple)):
-                res = []
-                for idx, val in enumerate(self._fort18[:, 4]):
-                    if idx in elemIdx:
-                        res.append(val)
-                return np.array(res)
-            else:
-                return self._fort18[:, 4][elemIdx]
-    
+        return self._select(self._fort18[:, 4], elems)
+
     def getGamma(self, elems=None):
         """Get beam gamma at the end if elems is given, or a list for all elements
         
@@ -303,20 +316,21 @@ class Result(object):
         :return: beta*gamma or list
         :raise: RuntimeError
         """
-        
+        return self._select(self._fort18[:, 3], elems)
+
+    def _select(self, column, elems=None):
+        """Return the data of *column* at the end of *elems*, or of all
+        totalelements, the data of a list of elements is ordered by data
+        index, see getElemIndex().
+        """
         if elems is None:
-            return self._fort18[:, 3]
-        else:
-            elemIdx = self.getElemIndex(elems)
-            if isinstance(elemIdx, (list, tuple)):
-                res = []
-                for idx, val in enumerate(self._fort18[:, 3]):
-                    if idx in elemIdx:
-                        res.append(val)
-                return np.array(res)
-            else:
-                return self._fort18[:, 3][elemIdx]
-    
+            return column
+        elemIdx = self.getElemIndex(elems)
+        if isinstance(elemIdx, list):
+            idx = np.unique(np.asarray(elemIdx, dtype=int))
+            return column[idx[(idx >= 0) & (idx < column.shape[0])]]
+        return column[elemIdx]
+
     def __getData(self, data, data2=None, elems=None, col=0):
         """Common interface to get simulation data.
         
@@ -329,35 +343,12 @@ class Result(object):
         
         :raise: RuntimeError  
         """
-        result = None
-        if elems is None:
-            if data2 is None:
-                result = data[:, col]
-            else:
-                result = np.empty((data.shape[0], 2))
-                result[:, 0] = data[:, col]
-                result[:, 1] = data2[:, col]
-        else:
-            elemIdx = self.getElemIndex(elems)
-            if isinstance(elemIdx, (list, tuple)):
-                res = []
-                for idx, val in enumerate(data):
-                    if idx in elemIdx:
-                        res.append(val[col])
-                res2=[]
-                if data2 is not None:
-                    for idx, val in enumerate(data2):
-                        if idx in elemIdx:
-                            res2.append(val[col])
-                    return [np.array(res), np.array(res2)]
-
-                return np.array(res)
-            else:
-                if data2 is None:
-                    result = data[:, col][elemIdx]
-                else:
-                    result = [data[:, col][elemIdx], data2[:, col][elemIdx]]
-        return result
+        if elems is None and data2 is not None:
+            return np.column_stack((data[:, col], data2[:, col]))
+        result = self._select(data[:, col], elems)
+        if data2 is None:
+            return result
+        return [result, self._select(data2[:, col], elems)]
 
 
     def getOrbit(self, plane="X", elems=None):
@@ -12,6 +12,7 @@ other potential usages should also be defined here.
 import logging
 import os
 import sys
+import time
 from functools import reduce
 
 from numpy import intersect1d
@@ -48,7 +49,9 @@ class MachinePortal(object):
         ``segments: LINAC LS1`` defines two segments ``LINAC`` and ``LS1``,
         the ``default_segment`` field in that file is used to define the
         default segment to use. If *segment* parameter is not defined, use
-        the one defined by ``default_segment``.
+        the one defined by ``default_segment``. Could be Unix shell pattern
+        or list of segment names, e.g. ``'*'`` to load all the segments,
+        which are loaded concurrently.
 
     Keyword Arguments
     -----------------
@@ -63,6 +66,29 @@ class MachinePortal(object):
         If set nonzero, print out verbose message.
     auto_monitor : bool
         If set True, initialize all channels auto subscribe, default is False.
+    use_cache : bool
+        If set True, load lattice from the cache file if available (and
+        up-to-date), otherwise load from data source and save into cache
+        file, default is False.
+    save_cache : bool
+        If set True, save the loaded lattice into cache file, default is
+        False.
+    cache_dir : str
+        Directory of lattice cache files.
+    max_workers : int
+        Maximum number of threads to load multiple segments, default is the
+        number of segments, 1 to load one by one.
+    lazy : bool
+        If set True, PV objects are not created until the first access (e.g.
+        get/set field value, or monitor), default is False, which could save
+        the time of loading and CA connection traffic of large segments, see
+        also :meth:`prewarm`.
+    array_mode : str
+        How array (waveform) field values are returned, 'list' (default): a
+        list of Python floats, 'copy': a numpy array, 'view': a read-only
+        numpy array sharing the buffer of the channel, 'copy' or 'view' is
+        recommended for large waveforms, which saves the conversion, see
+        also :meth:`~phantasy.library.lattice.CaElement.set_array_mode`.
 
     Note
     ----
@@ -299,8 +325,9 @@ class MachinePortal(object):
             self._work_lattice_name = lat_name
             self._work_lattice_conf = lat_conf
 
-            if lat_name is not None and lat_name not in self._lattice_names:
-                self._lattice_names.append(lat_name)
+            for n in [lat_name] + list(lat_all):
+                if n is not None and n not in self._lattice_names:
+                    self._lattice_names.append(n)
 
             if mach_name is not None and mach_name not in self._machine_names:
                 self._machine_names.append(mach_name)
@@ -931,6 +958,60 @@ class MachinePortal(object):
         pv_values = get_readback(pv_names)
         return pv_values
 
+    @staticmethod
+    def prewarm(elem, field=None, **kws):
+        """Create PV objects for defined elements, which are not created
+        yet if lattice is loaded with ``lazy=True``, and wait for all the
+        connections.
+
+        Parameters
+        ----------
+        elem :
+            (List of) CaElement objects.
+        field : str or List(str)
+            (List of) Field name(s), all fields of each element if not
+            defined.
+
+        Keyword Arguments
+        -----------------
+        handle : str or list(str)
+            PV handle(s), 'readback', 'readset' or 'setpoint', all if not
+            defined.
+        timeout : float
+            Total time in second to wait for connections, default is 5.0,
+            do not wait if set 0.
+
+        Returns
+        -------
+        ret : list
+            List of PV objects.
+
+        Examples
+        --------
+        >>> mp = MachinePortal('FRIB', 'LINAC', lazy=True)
+        >>> elem = mp.get_elements(type='BPM')
+        >>> mp.prewarm(elem, ['X', 'Y'], handle='readback')
+        """
+        if isinstance(elem, CaElement):
+            elem = elem,
+        handle = kws.get('handle', None)
+        timeout = kws.get('timeout', 5.0)
+
+        # create all PV objects first, connect in parallel.
+        pvs = []
+        for e in elem:
+            pvs.extend(e.prewarm(field, handle))
+
+        t_end = time.time() + timeout
+        n_not_connected = 0
+        for pv in pvs:
+            if not pv.wait_for_connection(max(t_end - time.time(), 0)):
+                n_not_connected += 1
+        if n_not_connected > 0:
+            _LOGGER.warning("{} of {} PVs are not connected.".format(
+                n_not_connected, len(pvs)))
+        return pvs
+
     def sync_settings(self, ):
         pass
 
@@ -6,13 +6,18 @@
     2. creating lattice
 """
 
+import hashlib
 import logging
 import os
+import pickle
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from fnmatch import fnmatch
 
 from phantasy.facility.frib import INI_DICT
+from phantasy.library.channelfinder.io import _get_data
 from phantasy.library.lattice import CaElement
 from phantasy.library.lattice import Lattice
 from phantasy.library.misc import simplify_data
@@ -35,6 +40,13 @@ __contact__ = "Tong Zhang <zhangt@frib.msu.edu>"
 _LOGGER = logging.getLogger(__name__)
 
 DEFAULT_MODEL_DATA_DIR = 'model_data'
+# subdirectory of root data directory for lattice cache files.
+DEFAULT_CACHE_DIR_NAME = 'lattice_cache'
+# options of segment section whose values are file paths, the cached
+# lattice is invalidated if any of these files is changed.
+CACHE_FILE_OPTIONS = ('config_file', 'layout_file', 'settings_file',
+                      'unicorn_file', 'polarity_file', 'alignment_file',
+                      INI_DICT['KEYNAME_CF_SVR_URL'])
 
 
 def load_lattice(machine, segment=None, **kws):
@@ -44,16 +56,21 @@ def load_lattice(machine, segment=None, **kws):
     ----------
     machine : str
         The exact name of machine.
-    segment : str
-        Unix shell pattern to define segment of machine, if not defined,
+    segment : str or list(str)
+        Unix shell pattern(s) to define segment(s) of machine, if not defined,
         will use default segment defined in configuration file.
 
     Keyword Arguments
     -----------------
     use_cache : bool
-        Use cache or not, ``False`` by default.
+        Load lattice(s) from cache file if available, ``False`` by default,
+        if cache is not available or outdated, lattice(s) will be loaded
+        from data source and saved into cache file.
     save_cache : bool
-        Save cache or not, ``False`` by default.
+        Save loaded lattice(s) into cache file or not, ``False`` by default.
+    cache_dir : str
+        Directory of cache files, default is 'lattice_cache' under the root
+        data directory defined in phantasy.ini.
     verbose : int
         If not 0, show output, 0 by default.
     sort : True or False
@@ -67,6 +84,18 @@ def load_lattice(machine, segment=None, **kws):
         of configuration file.
     auto_monitor : bool
         If set True, initialize all channels auto subscribe, default is False.
+    lazy : bool
+        If set True, PV objects are not created until the first access (e.g.
+        get/set field value, or monitor), default is False, see also
+        :meth:`~phantasy.MachinePortal.prewarm`.
+    max_workers : int
+        Maximum number of threads to load multiple segments concurrently,
+        default is the number of segments to load, 1 to load one by one.
+    array_mode : str
+        How array (waveform) field values are returned, 'list' (default): a
+        list of Python floats, 'copy': a numpy array, 'view': a read-only
+        numpy array without copy, see
+        :attr:`~phantasy.library.lattice.CaField.array_mode`.
 
     Returns
     -------
@@ -81,6 +110,19 @@ def load_lattice(machine, segment=None, **kws):
     Note
     ----
     *machine* can be a path to config dir.
+
+    The cache file is keyed by the machine configuration file, PV data
+    source, scaling law, polarity and alignment data files, as well as the
+    loading options, so the outdated cache is ignored. Lattice loaded from
+    cache does not create PV objects until they are accessed, except when
+    *auto_monitor* is set (and *lazy* is not), then the PV objects are
+    created and subscribed at loading, as the lattice loaded from data source.
+    If PV data source is channel finder service, re-save cache when the
+    service is updated.
+
+    When *segment* matches more than one segment, the segments are loaded
+    concurrently, configuration, scaling law, polarity, alignment and PV
+    data source files shared by segments are only read once.
     """
     lat_dict = {}
 
@@ -90,17 +132,9 @@ def load_lattice(machine, segment=None, **kws):
     sort_flag = kws.get('sort', False)
     pv_prefix = kws.get('prefix', None)
     auto_monitor = kws.get('auto_monitor', False)
-
-    # if use_cache:
-    #    try:
-    #        loadCache(machine)
-    #    except:
-    #        _LOGGER.error('Lattice initialization using cache failed. ' +
-    #              'Will attempt initialization with other method(s).')
-    #        save_cache = True
-    #    else:
-    #        # Loading from cache was successful.
-    #        return
+    lazy = kws.get('lazy', False)
+    max_workers = kws.get('max_workers', None)
+    array_mode = kws.get('array_mode', None)
 
     mconfig, mdir, mname = find_machine_config(machine, verbose=verbose,
                                                filename=INI_DICT['INI_NAME'])
@@ -125,176 +159,65 @@ def load_lattice(machine, segment=None, **kws):
 
     _LOGGER.info("Loading segment: '{}'".format(segment))
 
-    # filter out valid segment(s) from 'segment' string or pattern.
+    # filter out valid segment(s) from 'segment' string or pattern(s).
+    if isinstance(segment, str):
+        segment = segment,
     msects = [s for s in re.findall(r'\w+', all_segments)
-              if fnmatch(s, segment)]
-
-    for msect in msects:
-        d_msect = dict(mconfig.items(msect))
-
-        # scan server
-        scan_svr_url = d_msect.get(INI_DICT['KEYNAME_SCAN_SVR_URL'],
-                                   INI_DICT['DEFAULT_SCAN_SVR_URL'])
-
-        # model: code
-        simulation_code = d_msect.get(INI_DICT['KEYNAME_SIMULATION_CODE'],
-                                      INI_DICT['DEFAULT_SIMULATION_CODE'])
-        if simulation_code is not None:
-            simulation_code = simulation_code.upper()
-
-        # model: data
-        model_data_dir = d_msect.get(INI_DICT['KEYNAME_MODEL_DATA_DIR'],
-                                     DEFAULT_MODEL_DATA_DIR)
-        if model_data_dir is not None:
-            model_data_dir = os.path.expanduser(
-                os.path.join(work_dir, model_data_dir))
-
-        # config file
-        config_file = d_msect.get(INI_DICT['KEYNAME_CONFIG_FILE'],
-                                  INI_DICT['DEFAULT_CONFIG_FILE'])
-        if config_file is not None:
-            if not os.path.isabs(config_file):
-                config_file = os.path.join(mdir, config_file)
-            config = Configuration(config_file)
-        else:
-            raise RuntimeError("Lattice configuration for '%s' not specified" %
-                               (msect,))
-
-        # # layout file
-        # layout_file = d_msect.get(INI_DICT['KEYNAME_LAYOUT_FILE'],
-        #                          INI_DICT['DEFAULT_LAYOUT_FILE'])
-        # if layout_file is not None:
-        #    if not os.path.isabs(layout_file):
-        #        layout_file = os.path.join(mdir, layout_file)
-        #    layout = build_layout(layoutPath=layout_file)
-        # else:
-        #    raise RuntimeError("Layout for '%s' not specified" % (msect,))
-
-        # # settings file
-        # settings_file = d_msect.get(INI_DICT['KEYNAME_SETTINGS_FILE'],
-        #                             INI_DICT['DEFAULT_SETTINGS_FILE'])
-        # if settings_file is not None:
-        #     if not os.path.isabs(settings_file):
-        #         settings_file = os.path.join(mdir, settings_file)
-        #     settings = Settings(settingsPath=settings_file)
-        # else:
-        #     raise RuntimeError("Settings for '%s' not specified" % (msect,))
-
-        # unicorn_file
-        udata_file = d_msect.get('unicorn_file', None)
-        if udata_file is not None:
-            if not os.path.isabs(udata_file):
-                udata_file = os.path.join(mdir, udata_file)
-            udata = {}
-            for f in UnicornData(udata_file).functions:
-                _d = udata.setdefault(f.ename, {})
-                _d[(f.from_field, f.to_field)] = f.code
-            _LOGGER.info("UNICORN policy will be loaded from {}.".format(
-                os.path.abspath(udata_file)))
-        else:
-            udata = None  # no unicorn data provided
-            _LOGGER.warning("Default UNICORN policy will be applied.")
-
-        # misalignment_file
-        alignment_data_file = d_msect.get('alignment_file', None)
-        if alignment_data_file is not None:
-            if not os.path.isabs(alignment_data_file):
-                alignment_data_file = os.path.join(mdir, alignment_data_file)
-            alignment_data = read_alignment_data(alignment_data_file)
-            _LOGGER.info("Read alignment data from {}.".format(
-                os.path.abspath(alignment_data_file)))
-        else:
-            alignment_data = None
-            _LOGGER.warning("No aligment data is read.")
-
-        # polarity_file
-        pdata_file = d_msect.get('polarity_file', None)
-        if pdata_file is not None:
-            if not os.path.isabs(pdata_file):
-                pdata_file = os.path.join(mdir, pdata_file)
-            pdata = read_polarity(pdata_file)
-            _LOGGER.info("Device polarity data is loaded from {}.".format(
-                os.path.abspath(pdata_file)))
+              if any(fnmatch(s, p) for p in segment)]
+
+    if use_cache or save_cache:
+        cache_dir = kws.get('cache_dir', None)
+        if cache_dir is None:
+            cache_dir = os.path.expanduser(
+                os.path.join(root_data_dir, DEFAULT_CACHE_DIR_NAME))
+        cache_file = get_lattice_cache_path(
+            cache_dir, mconfig, mdir, msects, prefix=pv_prefix,
+            sort=sort_flag, auto_monitor=auto_monitor)
+
+    if use_cache:
+        try:
+            lat_dict = load_lattice_cache(cache_file)
+        except FileNotFoundError:
+            _LOGGER.info("Lattice cache is not available, will save one.")
+            save_cache = True
+        except Exception as err:
+            _LOGGER.error("Lattice initialization using cache failed: "
+                          "{}, will load from data source.".format(err))
+            save_cache = True
         else:
-            pdata = None
-            _LOGGER.warning("Default device polarity will be applied.")
-
-        # machine type, linear (non-loop) or ring (loop)
-        mtype = int(d_msect.get(INI_DICT['KEYNAME_MTYPE'],
-                                INI_DICT['DEFAULT_MTYPE']))
+            _LOGGER.info("Loaded lattice from cache: {}".format(cache_file))
+            save_cache = False
+            for msect, lat in lat_dict.items():
+                lat.mconf = mconfig
+                lat.data_dir = _create_model_data_dir(
+                    dict(mconfig.items(msect)), work_dir)
+                if auto_monitor and not lazy:
+                    _init_lattice_pvs(lat)
+
+    # load segment(s) not available from cache, concurrently if more than one
+    msects_to_load = [s for s in msects if s not in lat_dict]
+    shared = _SharedLoadData()
+    load_args = (mconfig, mdir, mname, work_dir, shared)
+    load_kws = {'prefix': pv_prefix, 'sort': sort_flag,
+                'auto_monitor': auto_monitor, 'lazy': lazy}
+    if max_workers is None:
+        max_workers = len(msects_to_load)
+    if len(msects_to_load) > 1 and max_workers > 1:
+        _LOGGER.info("Loading {} segments with {} workers.".format(
+            len(msects_to_load), max_workers))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_load_segment, msect, *load_args,
+                                   **load_kws)
+                       for msect in msects_to_load]
+            for msect, f in zip(msects_to_load, futures):
+                lat_dict[msect] = f.result()
+    else:
+        for msect in msects_to_load:
+            lat_dict[msect] = _load_segment(msect, *load_args, **load_kws)
+    udata_all = shared.get_all('udata')
 
-        # channel finder service: address
-        cf_svr_url = d_msect.get(INI_DICT['KEYNAME_CF_SVR_URL'],
-                                 INI_DICT['DEFAULT_CF_SVR_URL'])
-        if cf_svr_url is None:
-            raise RuntimeError(
-                "No accelerator data source (cfs_url) available")
-        ds_sql_path = os.path.join(mdir, cf_svr_url)
-
-        # channel finder service: tag, and property names
-        cf_svr_tag0 = d_msect.get(INI_DICT['KEYNAME_CF_SVR_TAG'],
-                                  INI_DICT['DEFAULT_CF_SVR_TAG'](msect))
-        cf_svr_prop0 = d_msect.get(INI_DICT['KEYNAME_CF_SVR_PROP'],
-                                  INI_DICT['DEFAULT_CF_SVR_PROP'])
-        cf_svr_tag = [s.strip() for s in cf_svr_tag0.split(',')]
-        cf_svr_prop = [s.strip() for s in cf_svr_prop0.split(',')]
-
-        if re.match(r"https?://.*", cf_svr_url, re.I):
-            # pv data source is cfs
-            _LOGGER.info("Loading PV data from CFS: '%s' for '%s'" %
-                         (cf_svr_url, msect))
-            ds = DataSource(source=cf_svr_url)
-        elif os.path.isfile(ds_sql_path):
-            # pv data source is sqlite/csv file
-            _LOGGER.info("Loading PV data from CSV/SQLite: {}".format(
-                os.path.abspath(ds_sql_path)))
-            ds = DataSource(source=ds_sql_path)
-        else:
-            _LOGGER.warning("Invalid PV data source is defined.")
-            raise RuntimeError("Unknown PV data source '%s'" %
-                               cf_svr_url)
-
-        ds.get_data(tag_filter=cf_svr_tag, prop_filter=cf_svr_prop)
-        ds.map_property_name(INI_DICT['CF_NAMEMAP'])
-
-        # model data temp directory
-        if not os.path.exists(model_data_dir):
-            os.makedirs(model_data_dir)
-        data_dir = create_tempdir(prefix="data_", dir=model_data_dir)
-        _LOGGER.info("Model data directory: {}".format(data_dir))
-
-        # build lattice from PV data
-        latname = msect
-        pv_data = simplify_data(ds.pvdata)
-        tag = cf_svr_tag
-        src = ds.source
-        lat = create_lattice(latname,
-                             pv_data,
-                             tag,
-                             source=src,
-                             mtype=mtype,
-                             mname=mname,
-                             mpath=mdir,
-                             mconf=mconfig,
-                             model=simulation_code,
-                             #layout=layout,
-                             config=config,
-                             #settings=settings,
-                             udata=udata,
-                             pdata=pdata,
-                             alignment_data=alignment_data,
-                             data_dir=data_dir,
-                             sort=sort_flag,
-                             prefix=pv_prefix,
-                             auto_monitor=auto_monitor)
-
-        #         if IMPACT_ELEMENT_MAP is not None:
-        #             lat.createLatticeModelMap(IMPACT_ELEMENT_MAP)
-
-        lat.loop = bool(d_msect.get(INI_DICT['KEYNAME_MTYPE'],
-                                    INI_DICT['DEFAULT_MTYPE']))
-
-        lat_dict[msect] = lat
+    for msect in msects:
+        lat = lat_dict[msect]
         # if show more informaion
         if verbose:
             n_elems = len(
@@ -315,6 +238,20 @@ def load_lattice(machine, segment=None, **kws):
                    len(lat._get_element_list('SOL')),
                    len(lat._get_element_list('CAV'))))
 
+    if save_cache:
+        try:
+            save_lattice_cache(cache_file, lat_dict, udata_all)
+        except Exception as err:
+            _LOGGER.error("Failed to save lattice cache: {}".format(err))
+        else:
+            _LOGGER.info("Saved lattice cache: {}".format(cache_file))
+
+    # applied after saving cache, which is shared by all array modes.
+    if array_mode is not None:
+        for lat in lat_dict.values():
+            for elem in lat:
+                elem.set_array_mode(array_mode)
+
     if default_segment in lat_dict:
         lat0name = default_segment
     else:
@@ -327,6 +264,203 @@ def load_lattice(machine, segment=None, **kws):
             'machconf': mconfig}
 
 
+def _load_segment(msect, mconfig, mdir, mname, work_dir, shared, **kws):
+    """Create lattice of segment *msect*, the data files shared by segments
+    are read through *shared*, see :func:`load_lattice`.
+    """
+    d_msect = dict(mconfig.items(msect))
+
+    # model: code
+    simulation_code = d_msect.get(INI_DICT['KEYNAME_SIMULATION_CODE'],
+                                  INI_DICT['DEFAULT_SIMULATION_CODE'])
+    if simulation_code is not None:
+        simulation_code = simulation_code.upper()
+
+    # config file
+    config_file = d_msect.get(INI_DICT['KEYNAME_CONFIG_FILE'],
+                              INI_DICT['DEFAULT_CONFIG_FILE'])
+    if config_file is not None:
+        if not os.path.isabs(config_file):
+            config_file = os.path.join(mdir, config_file)
+        config = shared.get('config', config_file, Configuration)
+    else:
+        raise RuntimeError("Lattice configuration for '%s' not specified" %
+                           (msect,))
+
+    # unicorn_file
+    udata_file = d_msect.get('unicorn_file', None)
+    if udata_file is not None:
+        if not os.path.isabs(udata_file):
+            udata_file = os.path.join(mdir, udata_file)
+        udata = shared.get('udata', udata_file, read_unicorn_data)
+        _LOGGER.info("UNICORN policy will be loaded from {}.".format(
+            os.path.abspath(udata_file)))
+    else:
+        udata = None  # no unicorn data provided
+        _LOGGER.warning("Default UNICORN policy will be applied.")
+
+    # misalignment_file
+    alignment_data_file = d_msect.get('alignment_file', None)
+    if alignment_data_file is not None:
+        if not os.path.isabs(alignment_data_file):
+            alignment_data_file = os.path.join(mdir, alignment_data_file)
+        alignment_data = shared.get('alignment', alignment_data_file,
+                                    read_alignment_data)
+        _LOGGER.info("Read alignment data from {}.".format(
+            os.path.abspath(alignment_data_file)))
+    else:
+        alignment_data = None
+        _LOGGER.warning("No aligment data is read.")
+
+    # polarity_file
+    pdata_file = d_msect.get('polarity_file', None)
+    if pdata_file is not None:
+        if not os.path.isabs(pdata_file):
+            pdata_file = os.path.join(mdir, pdata_file)
+        pdata = shared.get('polarity', pdata_file, read_polarity)
+        _LOGGER.info("Device polarity data is loaded from {}.".format(
+            os.path.abspath(pdata_file)))
+    else:
+        pdata = None
+        _LOGGER.warning("Default device polarity will be applied.")
+
+    # machine type, linear (non-loop) or ring (loop)
+    mtype = int(d_msect.get(INI_DICT['KEYNAME_MTYPE'],
+                            INI_DICT['DEFAULT_MTYPE']))
+
+    # channel finder service: address
+    cf_svr_url = d_msect.get(INI_DICT['KEYNAME_CF_SVR_URL'],
+                             INI_DICT['DEFAULT_CF_SVR_URL'])
+    if cf_svr_url is None:
+        raise RuntimeError(
+            "No accelerator data source (cfs_url) available")
+    ds_sql_path = os.path.join(mdir, cf_svr_url)
+
+    # channel finder service: tag, and property names
+    cf_svr_tag0 = d_msect.get(INI_DICT['KEYNAME_CF_SVR_TAG'],
+                              INI_DICT['DEFAULT_CF_SVR_TAG'](msect))
+    cf_svr_prop0 = d_msect.get(INI_DICT['KEYNAME_CF_SVR_PROP'],
+                              INI_DICT['DEFAULT_CF_SVR_PROP'])
+    cf_svr_tag = [s.strip() for s in cf_svr_tag0.split(',')]
+    cf_svr_prop = [s.strip() for s in cf_svr_prop0.split(',')]
+
+    if re.match(r"https?://.*", cf_svr_url, re.I):
+        # pv data source is cfs
+        _LOGGER.info("Loading PV data from CFS: '%s' for '%s'" %
+                     (cf_svr_url, msect))
+        src = cf_svr_url
+    elif os.path.isfile(ds_sql_path):
+        # pv data source is sqlite/csv file
+        _LOGGER.info("Loading PV data from CSV/SQLite: {}".format(
+            os.path.abspath(ds_sql_path)))
+        src = ds_sql_path
+    else:
+        _LOGGER.warning("Invalid PV data source is defined.")
+        raise RuntimeError("Unknown PV data source '%s'" %
+                           cf_svr_url)
+    pv_data = shared.get_pv_data(src, cf_svr_tag, cf_svr_prop)
+
+    # model data temp directory
+    data_dir = _create_model_data_dir(d_msect, work_dir)
+
+    # build lattice from PV data
+    lat = create_lattice(msect,
+                         pv_data,
+                         cf_svr_tag,
+                         source=src,
+                         mtype=mtype,
+                         mname=mname,
+                         mpath=mdir,
+                         mconf=mconfig,
+                         model=simulation_code,
+                         config=config,
+                         udata=udata,
+                         pdata=pdata,
+                         alignment_data=alignment_data,
+                         data_dir=data_dir,
+                         sort=kws.get('sort', False),
+                         prefix=kws.get('prefix', None),
+                         auto_monitor=kws.get('auto_monitor', False),
+                         lazy=kws.get('lazy', False))
+
+    lat.loop = bool(d_msect.get(INI_DICT['KEYNAME_MTYPE'],
+                                INI_DICT['DEFAULT_MTYPE']))
+    return lat
+
+
+class _SharedLoadData(object):
+    """Data read from files or PV data source, shared by all the segments
+    loaded by one :func:`load_lattice` call, each item is only read once,
+    even when segments are loaded in multiple threads.
+    """
+    def __init__(self):
+        self._data = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _get_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, kind, name, func):
+        """Return the data of *kind* identified by *name* (e.g. file path),
+        read by ``func(name)`` for the first time.
+        """
+        key = (kind, name)
+        with self._get_lock(key):
+            if key not in self._data:
+                self._data[key] = func(name)
+            return self._data[key]
+
+    def get_all(self, kind):
+        """Return dict of all the data of *kind*, keys are names.
+        """
+        with self._lock:
+            return {k[1]: v for k, v in self._data.items() if k[0] == kind}
+
+    def get_pv_data(self, source, tag, prop):
+        """Return simplified PV data from *source*, filtered by *tag* and
+        *prop*, all PV records of *source* are only fetched once.
+        """
+        raw_data, prop_list, tag_list = self.get('source', source,
+                                                 _read_data_source)
+        # filter copies of the shared records, nothing shared is modified,
+        # so segments are filtered concurrently.
+        pv_data = _get_data([_copy_pv_record(r) for r in raw_data],
+                            prop_list, tag_list,
+                            tag_filter=tag, prop_filter=prop)
+        _map_property_name(pv_data, INI_DICT['CF_NAMEMAP'])
+        return simplify_data(pv_data)
+
+
+def _read_data_source(source):
+    # return all PV records of *source*, and the property and tag names.
+    ds = DataSource(source=source)
+    if ds.pvdata is None:
+        ds.get_data()
+    raw_data = ds.pvdata
+    prop_list, tag_list = ds.prop_list, ds.tag_list
+    if prop_list is None:
+        prop_list = sorted({p['name'] for r in raw_data
+                            for p in r['properties']})
+    if tag_list is None:
+        tag_list = sorted({t['name'] for r in raw_data for t in r['tags']})
+    return raw_data, prop_list, tag_list
+
+
+def _copy_pv_record(r):
+    r = dict(r)
+    r['properties'] = [dict(p) for p in r['properties']]
+    return r
+
+
+def _map_property_name(pv_data, name_map):
+    # rename properties of *pv_data* in place, see DataSource.map_property_name
+    for r in pv_data:
+        for p in r['properties']:
+            p['name'] = name_map.get(p['name'], p['name'])
+
+
 def create_lattice(latname, pv_data, tag, **kws):
     """Create high-level lattice object from PV data source.
 
@@ -379,6 +513,9 @@ def create_lattice(latname, pv_data, tag, **kws):
         of configuration file.
     auto_monitor : bool
         If set True, initialize all channels auto subscribe, default is False.
+    lazy : bool
+        If set True, do not create PV objects until the first access, default
+        is False.
 
     Returns
     ---------
@@ -404,6 +541,7 @@ def create_lattice(latname, pv_data, tag, **kws):
     data_source = kws.get('source', None)
     prefix = kws.get('prefix', None)
     auto_monitor = kws.get('auto_monitor', False)
+    lazy = kws.get('lazy', False)
 
     config = kws.get('config', None)
     if config is not None:
@@ -448,7 +586,8 @@ def create_lattice(latname, pv_data, tag, **kws):
         elem = lat._find_exact_element(name=name)
         if elem is None:
             try:
-                elem = CaElement(**pv_props, auto_monitor=auto_monitor)
+                elem = CaElement(**pv_props, auto_monitor=auto_monitor,
+                                 lazy=lazy)
             except:
                 _LOGGER.error(
                     "Error: creating element '{0}' with '{1}'.".format(
@@ -481,7 +620,7 @@ def create_lattice(latname, pv_data, tag, **kws):
             elem.process_pv(pv_name_prefixed, pv_props, pv_tags,
                             u_policy=u_policy, polarity=polarity,
                             alignment_series=alignment_series,
-                            auto_monitor=auto_monitor)
+                            auto_monitor=auto_monitor, lazy=lazy)
 
     # update group
     lat.update_groups()
@@ -503,6 +642,180 @@ def create_lattice(latname, pv_data, tag, **kws):
     return lat
 
 
+def _create_model_data_dir(d_msect, work_dir):
+    """Create a new directory for model data of segment, *d_msect* is the
+    dict of segment section of phantasy.ini.
+    """
+    model_data_dir = d_msect.get(INI_DICT['KEYNAME_MODEL_DATA_DIR'],
+                                 DEFAULT_MODEL_DATA_DIR)
+    model_data_dir = os.path.expanduser(
+        os.path.join(work_dir, model_data_dir))
+    if not os.path.exists(model_data_dir):
+        os.makedirs(model_data_dir)
+    data_dir = create_tempdir(prefix="data_", dir=model_data_dir)
+    _LOGGER.info("Model data directory: {}".format(data_dir))
+    return data_dir
+
+
+def read_unicorn_data(udata_file):
+    """Read scaling law functions from UNICORN data file.
+
+    Parameters
+    ----------
+    udata_file : str
+        Path of UNICORN data file.
+
+    Returns
+    -------
+    r : dict
+        Scaling law functions, ename as the keys (1st level),
+        (from_field, to_field) as 2nd level keys, function object as the
+        values, i.e. {ename: {(f1, f2): fn1, ...}, ...}
+    """
+    udata = {}
+    for f in UnicornData(udata_file).functions:
+        _d = udata.setdefault(f.ename, {})
+        _d[(f.from_field, f.to_field)] = f.code
+    return udata
+
+
+def get_lattice_cache_path(cache_dir, mconfig, mdir, segments, **kws):
+    """Return the path of cache file for the lattice(s) of *segments*, the
+    file name is the hash of all the input files and loading options.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory of cache files.
+    mconfig :
+        Machine configuration object, loaded from phantasy.ini.
+    mdir : str
+        Path of machine configuration directory.
+    segments : list
+        List of segment names.
+
+    Keyword Arguments
+    -----------------
+    All keyword arguments are treated as loading options.
+
+    Returns
+    -------
+    r : str
+        Path of lattice cache file.
+    """
+    from phantasy import __version__
+    key = [__version__, _file_stamp(mconfig.config_path),
+           sorted(kws.items())]
+    for msect in segments:
+        d_msect = dict(mconfig.items(msect))
+        key.append(msect)
+        for opt in CACHE_FILE_OPTIONS:
+            v = d_msect.get(opt, None)
+            if v is None:
+                continue
+            path = v if os.path.isabs(v) else os.path.join(mdir, v)
+            key.append((opt, v, _file_stamp(path)))
+    h = hashlib.sha1(repr(key).encode()).hexdigest()
+    return os.path.join(cache_dir, "lattice_{}.pkl".format(h))
+
+
+def _init_lattice_pvs(lat):
+    # create the PV objects of all the fields of *lat*, which are not saved
+    # in the cache file.
+    for elem in lat:
+        for f in elem.fields:
+            elem.get_field(f).init_pvs()
+
+
+def _file_stamp(path):
+    # modification time and size of file, None if not a file (e.g. URL)
+    if path is None or not os.path.isfile(path):
+        return None
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class _LatticePickler(pickle.Pickler):
+    """Pickler for lattice cache, scaling law functions from UNICORN data
+    are saved as references to the data file, since they are generated at
+    runtime and cannot be pickled.
+
+    Parameters
+    ----------
+    file :
+        File object to write.
+    udata : dict
+        UNICORN data the lattices are created with, keys are data file paths,
+        values are returned from :func:`read_unicorn_data`.
+    """
+    def __init__(self, file, udata, **kws):
+        super(_LatticePickler, self).__init__(file, **kws)
+        self._refs = {}
+        for udata_file, udata_i in udata.items():
+            for ename, fns in udata_i.items():
+                for k, fn in fns.items():
+                    self._refs[id(fn)] = (udata_file, ename) + k
+
+    def persistent_id(self, obj):
+        return self._refs.get(id(obj), None)
+
+
+class _LatticeUnpickler(pickle.Unpickler):
+    """Unpickler for lattice cache, see :class:`_LatticePickler`.
+    """
+    def __init__(self, file, **kws):
+        super(_LatticeUnpickler, self).__init__(file, **kws)
+        self._udata = {}
+
+    def persistent_load(self, pid):
+        udata_file, ename, from_field, to_field = pid
+        if udata_file not in self._udata:
+            self._udata[udata_file] = read_unicorn_data(udata_file)
+        return self._udata[udata_file][ename][(from_field, to_field)]
+
+
+def save_lattice_cache(cache_file, lattices, udata=None):
+    """Save *lattices* into *cache_file*, PV objects are not saved.
+
+    Parameters
+    ----------
+    cache_file : str
+        Path of cache file, see :func:`get_lattice_cache_path`.
+    lattices : dict
+        Dict of lattices, keys are segment names.
+    udata : dict
+        UNICORN data the lattices are created with, keys are data file paths,
+        values are returned from :func:`read_unicorn_data`.
+    """
+    cache_dir = os.path.dirname(cache_file)
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+    if udata is None:
+        udata = {}
+    # write to temp file first, avoid partial file read by other processes.
+    tmp_file = "{}.{}.tmp".format(cache_file, os.getpid())
+    try:
+        with open(tmp_file, 'wb') as fp:
+            _LatticePickler(fp, udata,
+                            protocol=pickle.HIGHEST_PROTOCOL).dump(lattices)
+        os.replace(tmp_file, cache_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def load_lattice_cache(cache_file):
+    """Load lattices from *cache_file*, saved by :func:`save_lattice_cache`.
+
+    Returns
+    -------
+    r : dict
+        Dict of lattices, keys are segment names.
+    """
+    with open(cache_file, 'rb') as fp:
+        return _LatticeUnpickler(fp).load()
+
+
 def prefix_pv(pv, prefix):
     """Prefix *pv* with *prefix:* if *prefix* is not empty and None.
     """
@@ -9,13 +9,25 @@ from .geometry import Line
 from .particles import Distribution
 from .orm import get_orm
 from .orm import get_orm_for_one_corrector
+from .orm import get_orm_from_model
+from .orm import get_transfer_matrices
+from .orm import get_orm_simultaneous
+from .orm import get_excitation_pattern
+from .orm import solve_regularized
+from .orm import fit_slopes
 from .orm import get_orbit
 from .orm import inverse_matrix
 from .orm import get_correctors_settings
 from .orm import get_index_grid
+from .orm import OrbitResponse
+from .orm import wait_settle
 
 __all__ = ['Point', 'Line', 'Distribution',
            'get_orm', 'get_orbit', 'inverse_matrix',
            'get_correctors_settings',
            'get_index_grid',
-           'get_orm_for_one_corrector',]
+           'get_orm_for_one_corrector',
+           'get_orm_from_model', 'get_transfer_matrices',
+           'get_orm_simultaneous', 'get_excitation_pattern',
+           'solve_regularized', 'fit_slopes',
+           'OrbitResponse', 'wait_settle',]
@@ -1,6 +1,12 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait
 from datetime import datetime
 from .device_processors import pm_processor
 from .device_processors import vd_processor
@@ -13,12 +19,130 @@ device_processors = {
     'VD': vd_processor,
 }
 
+_LOGGER = logging.getLogger(__name__)
+
+# device name and future of the processing not finished yet, across calls
+_IN_FLIGHT = {}
+_IN_FLIGHT_LOCK = threading.RLock()
+
 
 def process_devices(elems, **kws):
-    for elem in elems:
-        if elem.family in SLOW_MONI_TYPES:
+    """Process the slow devices (e.g. PM, VD) of *elems* concurrently, the
+    total time is determined by the slowest device, other than the sum of
+    all devices.
+
+    Parameters
+    ----------
+    elems : list
+        List of CaElement, only the ones of *SLOW_MONI_TYPES* are processed.
+
+    Keyword Arguments
+    -----------------
+    device_timeout : float
+        Maximum time for processing each device, in *sec*, no limit by
+        default, the processing is not waited after timeout.
+    max_workers : int
+        Maximum number of devices processed at the same time, all by default.
+    msg_queue : Queue
+        A queue that keeps log messages.
+
+    Returns
+    -------
+    r : dict
+        Dict of element name and result, which is one of "Processed",
+        "Timeout", "Error", "Busy" (the processing started by a previous call
+        is not finished yet, not started again) and "Cancelled" (not started
+        since all the workers are occupied by timed out devices).
+    """
+    q_msg = kws.get('msg_queue', None)
+    timeout = kws.get('device_timeout', None)
+    slow_elems = [elem for elem in elems if elem.family in SLOW_MONI_TYPES]
+    if not slow_elems:
+        return {}
+
+    n = len(slow_elems)
+    ret = {}
+    with _IN_FLIGHT_LOCK:
+        for elem in slow_elems:
+            if elem.name in _IN_FLIGHT:
+                ret[elem.name] = "Busy"
+                _put_msg(q_msg, "[{}] - Device {} is still being processed, skipped.".format(
+                                time_now(), elem.name))
+        todo = [elem for elem in slow_elems if elem.name not in ret]
+        if not todo:
+            return ret
+        max_workers = kws.get('max_workers', None) or len(todo)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        t_start = {}  # start time of each device
+
+        def _process(elem):
+            t_start[elem.name] = time.time()
             process_device(elem, elem.family, **kws)
 
+        pending = {}
+        for elem in todo:
+            f = executor.submit(_process, elem)
+            pending[f] = elem
+            _IN_FLIGHT[elem.name] = f
+            f.add_done_callback(lambda f, name=elem.name: _done(name, f))
+
+    n_ok = 0
+    while pending:
+        t_left = None
+        if timeout is not None:
+            t_now = time.time()
+            t_left = max(min(t_start.get(elem.name, t_now) + timeout
+                             for elem in pending.values()) - t_now, 0)
+        done, _ = wait(pending, timeout=t_left, return_when=FIRST_COMPLETED)
+        for f in done:
+            elem = pending.pop(f)
+            if f.exception() is not None:
+                ret[elem.name] = "Error"
+                _LOGGER.error("Failed to process {}: {}".format(
+                              elem.name, f.exception()))
+                _put_msg(q_msg, "[{}] - Failed to process device {}: {}".format(
+                                time_now(), elem.name, f.exception()))
+            else:
+                ret[elem.name] = "Processed"
+                n_ok += 1
+                _put_msg(q_msg, "[{}] - Processed {}/{} devices.".format(
+                                time_now(), n_ok, n))
+        if timeout is None:
+            continue
+        t_now = time.time()
+        for f, elem in list(pending.items()):
+            if elem.name in t_start and t_now - t_start[elem.name] >= timeout:
+                # not waited anymore, still in flight until it finishes
+                pending.pop(f)
+                ret[elem.name] = "Timeout"
+                _put_msg(q_msg, "[{}] - Device {} is not processed in {} sec.".format(
+                                time_now(), elem.name, timeout))
+        n_stuck = sum(1 for v in ret.values() if v == "Timeout")
+        if pending and n_stuck >= max_workers and \
+                not any(elem.name in t_start for elem in pending.values()):
+            # no worker left for the devices not started
+            for f, elem in list(pending.items()):
+                f.cancel()
+                pending.pop(f)
+                ret[elem.name] = "Cancelled"
+                _put_msg(q_msg, "[{}] - Device {} is not processed, no worker available.".format(
+                                time_now(), elem.name))
+    executor.shutdown(wait=False, cancel_futures=True)
+    return ret
+
+
+def _done(name, f):
+    # remove the finished processing of device *name* from in-flight ones.
+    with _IN_FLIGHT_LOCK:
+        if _IN_FLIGHT.get(name) is f:
+            _IN_FLIGHT.pop(name)
+
+
+def _put_msg(q_msg, msg):
+    print(msg)
+    if q_msg is not None:
+        q_msg.put((-1, msg))
+
 
 def process_device(elem, dtype, **kws):
     q_msg = kws.get('msg_queue', None)
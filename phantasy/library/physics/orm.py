@@ -4,6 +4,7 @@
 """Module for orbit response matrix calculation.
 """
 
+import logging
 import time
 from functools import reduce
 
@@ -17,6 +18,8 @@ from .devices import process_devices
 
 TS_FMT = "%Y-%m-%d %H:%M:%S"
 
+_LOGGER = logging.getLogger(__name__)
+
 
 def get_orm(correctors, monitors, **kws):
     """Calculate orbit response matrix (ORM) with defined input parameters.
@@ -53,34 +56,51 @@ def get_orm(correctors, monitors, **kws):
         Field names for monitors to retrieve orbit data, ``('X', 'Y')`` for
         *x* and *y* directions by default.
     wait : float
-        Wait time after set value, in *sec*, 1.0 by default.
+        Maximum wait time after set value, in *sec*, 1.0 by default, see
+        :func:`wait_settle` for settle detection.
     reset_wait : float
-        Wait time after set value to original value, in *sec*, 1.0 by default.
+        Maximum wait time after set value to original value, in *sec*, 1.0
+        by default.
+    settle : bool
+        If False, always wait *wait* seconds after set value, default is True.
     xoy : str
         'x'('y') for monitoring 'x'('y') direction,'xy' for both (default).
     lattice : Lattice
-        High-level lattice object.
+        High-level lattice object, required if *source* is ``model``.
     msg_queue : Queue
         A queue that keeps log messages.
+    pattern : str
+        If defined, excite several correctors simultaneously with
+        ``orthogonal`` or ``random`` pattern, see
+        :func:`get_orm_simultaneous`, by default correctors are scanned one
+        by one.
 
     Returns
     -------
     ret : array
         ORM with shape ``(m, n)``.
 
-    Todo
-    ----
-    case of ``source == 'model'``, require kws 'lattice'.
+    See Also
+    --------
+    get_orm_from_model : Calculate ORM from FLAME model.
+    get_orm_simultaneous : Measure ORM with multi-corrector excitation.
     """
     lattice = kws.get('lattice', None)
     source = kws.get('source', 'control')
     scan = kws.get('scan', np.linspace(-0.003, 0.003, 5))
     cor_field = kws.get('cor_field', 'ANG')
     xoy = kws.get('xoy', 'xy')
-    wait = kws.get('wait', 1.0)
     reset_wait = kws.get('reset_wait', 1.0)
     q_msg = kws.get('msg_queue', None)
 
+    if source == 'model':
+        if lattice is None:
+            raise RuntimeError("Lattice is required to calculate ORM from model.")
+        return get_orm_from_model(correctors, monitors, lattice, xoy=xoy)
+
+    if kws.get('pattern', None) is not None:
+        return get_orm_simultaneous(correctors, monitors, **kws)
+
     m = len(monitors) * len(xoy)
     n = len(correctors)
     mat_mn = np.zeros([m, n])
@@ -89,35 +109,398 @@ def get_orm(correctors, monitors, **kws):
     # B[i] = \Sigma_j=0^{n-1} R[i,j] C[j]
     # ---> iff C[j] != 0 ==> B[i] = R[i,j] C[j]
     # ==> R[i,j] = B[i]/C[j]
-    # ==> or: R[i,j] = polyfit(C[i], B[i], 1)[0]
+    # ==> or: R[i,j] = polyfit(C[i], B[i], 1)[0], for all i at once
     #
     ns = len(scan)
     for i, cor in enumerate(correctors):
         orbit_arr = np.zeros([len(scan), m])
         cor_val0 = cor.current_setting(cor_field)
+        val_prev = cor_val0
         for iscan, val in enumerate(scan):
             setattr(cor, cor_field, val)
-            time.sleep(wait)
+            dt = wait_settle(cor, cor_field, val, monitors,
+                             **dict(kws, origins=val_prev))
+            val_prev = val
             v_rd = getattr(cor, cor_field)
-            msg = "[{0}] Set [{1:02d}] {2} [{3}]: {4:>10.6f} (RD: {5:>10.6f})".format(
+            msg = "[{0}] Set [{1:02d}] {2} [{3}]: {4:>10.6f} (RD: {5:>10.6f}) [settled in {6:.3f}s]".format(
                     epoch2human(time.time(), fmt=TS_FMT), i + 1, cor.name,
-                    cor_field, val, v_rd)
+                    cor_field, val, v_rd, dt)
             if q_msg is not None:
                 q_msg.put(((i * ns + iscan) * 100.0 / n / ns, msg))
             print(msg)
             orbit_arr[iscan] = get_orbit(monitors, **kws)
 
-        ## get mat_mn(k,i)
-        #for k in range(m):
-        #    mat_mn[k, i] = np.polyfit(scan, orbit_arr[:, k], 1)[0]
-        mat_mn[:, i] = [np.polyfit(scan, orbit_arr[:, k], 1)[0] for k in range(m)]
+        mat_mn[:, i] = fit_slopes(scan, orbit_arr)
 
         # reset cor and process next col
         setattr(cor, cor_field, cor_val0)
-        time.sleep(reset_wait)
+        wait_settle(cor, cor_field, cor_val0, monitors,
+                    **dict(kws, wait=reset_wait, origins=val_prev))
     return mat_mn
 
 
+def get_orm_simultaneous(correctors, monitors, **kws):
+    """Measure orbit response matrix (ORM) by exciting several correctors
+    simultaneously.
+
+    For each step, the correctors are set to the original settings plus
+    *amplitude* times the excitation pattern (see
+    :func:`get_excitation_pattern`), the orbit difference to the original
+    one is measured, ORM is then recovered from all the steps by one
+    regularized least-squares solve (see :func:`solve_regularized`).
+
+    Parameters
+    ----------
+    correctors : List[CaElement]
+        List of correctors from *lattice*.
+    monitors : List[CaElement]
+        List of monitors, usually BPMs, to measure the beam orbit.
+
+    Keyword Arguments
+    -----------------
+    pattern : str
+        Excitation pattern, ``orthogonal`` (default) or ``random``.
+    nbump : int
+        Maximum number of correctors excited at each step, 3 by default,
+        which needs ``4n/3`` steps for ``orthogonal`` pattern, the orbit
+        excursion grows with *nbump*, keep it small to not lose beam.
+    nstep : int
+        Total number of steps for ``random`` pattern, default is ``2n``.
+    seed : int
+        Random seed for ``random`` pattern.
+    amplitude : float
+        Excitation amplitude relative to the original settings, unit: *rad*,
+        0.0015 by default.
+    alpha : float
+        Regularization factor, relative to the largest singular value of the
+        excitation matrix, 1e-6 by default.
+    cor_field : str
+        Field name for correctors, ``'ANG'`` by default.
+    orb_field : tuple[str]
+        Field names for monitors to retrieve orbit data, ``('X', 'Y')`` for
+        *x* and *y* directions by default.
+    wait : float
+        Maximum wait time after set value, in *sec*, 1.0 by default, see
+        :func:`wait_settle` for settle detection.
+    reset_wait : float
+        Maximum wait time after set value to original value, in *sec*, 1.0
+        by default.
+    settle : bool
+        If False, always wait *wait* seconds after set value, default is True.
+    xoy : str
+        'x'('y') for monitoring 'x'('y') direction,'xy' for both (default).
+    msg_queue : Queue
+        A queue that keeps log messages.
+
+    Returns
+    -------
+    ret : array
+        ORM with shape ``(m, n)``.
+
+    See Also
+    --------
+    get_orm : Measure orbit response matrix.
+    """
+    cor_field = kws.get('cor_field', 'ANG')
+    reset_wait = kws.get('reset_wait', 1.0)
+    q_msg = kws.get('msg_queue', None)
+    amp = kws.get('amplitude', 0.0015)
+    alpha = kws.get('alpha', 1e-6)
+
+    n = len(correctors)
+    pattern = get_excitation_pattern(n, pattern=kws.get('pattern', 'orthogonal'),
+                                     nbump=kws.get('nbump', 3),
+                                     nstep=kws.get('nstep', None),
+                                     seed=kws.get('seed', None))
+    delta = pattern * amp
+    nstep = len(delta)
+
+    cor_val0 = np.asarray([cor.current_setting(cor_field) for cor in correctors])
+    orbit0 = get_orbit(monitors, **kws)
+    orbit_arr = np.zeros([nstep, len(orbit0)])
+    cor_val = cor_val0.copy()
+    for istep, d in enumerate(delta):
+        new_val = cor_val0 + d
+        # only put the changed ones
+        changed = np.flatnonzero(new_val != cor_val)
+        for j in changed:
+            setattr(correctors[j], cor_field, new_val[j])
+        dt = wait_settle([correctors[j] for j in changed], cor_field,
+                         new_val[changed], monitors,
+                         **dict(kws, origins=cor_val[changed]))
+        cor_val = new_val
+        msg = "[{0}] Step [{1:02d}/{2:02d}]: excite {3} correctors [settled in {4:.3f}s]".format(
+                epoch2human(time.time(), fmt=TS_FMT), istep + 1, nstep,
+                np.count_nonzero(d), dt)
+        if q_msg is not None:
+            q_msg.put((istep * 100.0 / nstep, msg))
+        print(msg)
+        orbit_arr[istep] = get_orbit(monitors, **kws) - orbit0
+
+    # reset correctors
+    changed = np.flatnonzero(cor_val != cor_val0)
+    for j in changed:
+        setattr(correctors[j], cor_field, cor_val0[j])
+    wait_settle([correctors[j] for j in changed], cor_field, cor_val0[changed],
+                monitors, **dict(kws, wait=reset_wait, origins=cor_val[changed]))
+
+    # delta (nstep, n) x ORM.T (n, m) = orbit_arr (nstep, m)
+    return solve_regularized(delta, orbit_arr, alpha).T
+
+
+def get_excitation_pattern(n, pattern='orthogonal', nbump=3, nstep=None,
+                           seed=None):
+    """Return the excitation pattern for *n* correctors with 1, -1 and 0,
+    each row is for one step.
+
+    Parameters
+    ----------
+    n : int
+        Total number of correctors.
+    pattern : str
+        ``orthogonal``: correctors are grouped by *nbump*, each group is
+        excited by the columns (except the first one) of the Hadamard matrix
+        with the order of the least power of 2 larger than the group size,
+        then all the columns of the pattern are orthogonal;
+        ``random``: *nbump* correctors are randomly selected and excited
+        with random signs at each step.
+    nbump : int
+        Maximum number of correctors excited at each step, default is 3,
+        *n* if None.
+    nstep : int
+        Total number of steps for ``random`` pattern, default is ``2n``.
+    seed : int
+        Random seed for ``random`` pattern.
+
+    Returns
+    -------
+    ret : array
+        Excitation pattern with shape of ``(nstep, n)``.
+    """
+    if nbump is None:
+        nbump = n
+    nbump = max(1, min(nbump, n))
+    if pattern == 'orthogonal':
+        blocks = []
+        for i0 in range(0, n, nbump):
+            k = min(nbump, n - i0)
+            h = _hadamard(k + 1)
+            blk = np.zeros([len(h), n])
+            blk[:, i0:i0 + k] = h[:, 1:k + 1]
+            blocks.append(blk)
+        return np.vstack(blocks)
+    elif pattern == 'random':
+        if nstep is None:
+            nstep = 2 * n
+        rng = np.random.default_rng(seed)
+        ret = np.zeros([nstep, n])
+        for row in ret:
+            idx = rng.choice(n, nbump, replace=False)
+            row[idx] = rng.choice([-1.0, 1.0], nbump)
+        return ret
+    else:
+        raise ValueError("Invalid excitation pattern: '{}'.".format(pattern))
+
+
+def _hadamard(n):
+    # Sylvester's Hadamard matrix with the order of 2**k >= n
+    h = np.ones([1, 1])
+    while len(h) < n:
+        h = np.block([[h, h], [h, -h]])
+    return h
+
+
+def solve_regularized(a, b, alpha=0.0):
+    """Solve least-squares problem ``a x = b`` with Tikhonov regularization,
+    i.e. minimize ``|a x - b|^2 + (alpha s0)^2 |x|^2``, *s0* is the largest
+    singular value of *a*.
+
+    Parameters
+    ----------
+    a : array
+        Coefficient matrix with shape of ``(k, n)``.
+    b : array
+        Right-hand side with shape of ``(k,)`` or ``(k, m)``.
+    alpha : float
+        Regularization factor relative to *s0*, 0 for plain least-squares.
+
+    Returns
+    -------
+    ret : array
+        Solution with shape of ``(n,)`` or ``(n, m)``.
+    """
+    U, s, Vt = linalg.svd(a, full_matrices=False)
+    lam = (alpha * s[0]) ** 2 if len(s) else 0.0
+    d = np.zeros_like(s)
+    nz = s > 0
+    d[nz] = s[nz] / (s[nz] ** 2 + lam)
+    return np.dot(Vt.T * d, np.dot(U.T, b))
+
+
+def fit_slopes(x, y):
+    """Linear fitting of all the columns of *y* against *x* by one
+    least-squares solve.
+
+    Parameters
+    ----------
+    x : array
+        Array of ``k`` points, e.g. corrector settings.
+    y : array
+        Array with shape of ``(k, m)``, e.g. ``k`` orbits of ``m`` readings.
+
+    Returns
+    -------
+    ret : array
+        Slopes with the size of ``m``, same as
+        ``[np.polyfit(x, y[:, i], 1)[0] for i in range(m)]``.
+    """
+    x = np.asarray(x, dtype=float)
+    a = np.vstack([x, np.ones_like(x)]).T
+    return linalg.lstsq(a, np.asarray(y, dtype=float), rcond=None)[0][0]
+
+
+def get_orm_from_model(correctors, monitors, lattice, xoy='xy', **kws):
+    """Calculate orbit response matrix (ORM) from the FLAME model of
+    *lattice*, with the transfer matrices of all elements gathered in one
+    propagation.
+
+    The response of monitor *i* to corrector *j* is the element of the
+    transfer matrix from corrector *j* to monitor *i*, which is zero if
+    the monitor is upstream of the corrector. For multiple charge states,
+    the transfer matrices of all the charge states are averaged with the
+    weights of ``NCharge``, as the beam centroid; at the element where the
+    charge states change, e.g. stripper, the new charge states start from
+    the centroid of the incoming ones.
+
+    Parameters
+    ----------
+    correctors : List[CaElement]
+        List of correctors from *lattice*, 'HCOR' kicks in *x* and 'VCOR'
+        kicks in *y* direction.
+    monitors : List[CaElement]
+        List of monitors, usually BPMs.
+    lattice : Lattice
+        High-level lattice object, the model is built from its current
+        model settings.
+    xoy : str
+        'x'('y') for monitoring 'x'('y') direction,'xy' for both (default).
+
+    Keyword Arguments
+    -----------------
+    machine :
+        FLAME machine, if not defined, run *lattice* to get the model.
+
+    Returns
+    -------
+    ret : array
+        ORM with shape ``(m, n)``, unit: *m/rad*, same as :func:`get_orm`.
+
+    See Also
+    --------
+    get_orm : Measure orbit response matrix.
+    """
+    machine = kws.get('machine', None)
+    if machine is None:
+        _, fm = lattice.run()
+        if fm is None:
+            raise RuntimeError("ORM from model only supports FLAME.")
+        machine = fm.machine
+
+    tm, w = get_transfer_matrices(machine)
+    # centroid matrices, and sections of the same charge states
+    tm_avg = np.einsum('ik,ikab->iab', w, tm)
+    sec = np.concatenate([[0], np.cumsum(np.any(w[1:] != w[:-1], axis=1))])
+    sec_end = np.flatnonzero(np.diff(sec))  # last element of each section
+
+    def _index(elem):
+        idx = machine.find(name=elem.name)
+        if not idx:
+            raise RuntimeError("Element '{}' not found in model.".format(elem.name))
+        return idx[-1]
+
+    # rows: x, x', y, y' of transfer matrix
+    row_map = {'x': 0, 'y': 2}
+    rows = [(_index(elem), row_map[p]) for p in xoy for elem in monitors]
+    m, n = len(rows), len(correctors)
+    mon_idx = np.array([i for i, _ in rows], dtype=int)
+    mon_row = np.array([r for _, r in rows], dtype=int)
+    mon_sec = sec[mon_idx]
+    mat_mn = np.zeros([m, n])
+    for j, cor in enumerate(correctors):
+        cor_idx = _index(cor)
+        col = 3 if cor.family == 'VCOR' else 1
+        # transfer matrices from corrector to monitors, per charge state
+        # in the section of corrector, then through the centroid
+        t = np.zeros([m, 7, 7])
+        tinv = linalg.inv(tm[cor_idx])
+        sel = mon_sec == sec[cor_idx]
+        t[sel] = np.einsum('ik,ikab,kbc->iac', w[mon_idx[sel]],
+                           tm[mon_idx[sel]], tinv)
+        for k in range(sec[cor_idx] + 1, sec[-1] + 1):
+            # tc: from corrector to the entrance of section k
+            e = sec_end[k - 1]
+            if k == sec[cor_idx] + 1:
+                tc = np.einsum('k,kab,kbc->ac', w[e], tm[e], tinv)
+            else:
+                tc = np.dot(tm_avg[e],
+                            np.dot(linalg.inv(tm_avg[sec_end[k - 2]]), tc))
+            sel = mon_sec == k
+            t[sel] = np.matmul(tm_avg[mon_idx[sel]],
+                               np.dot(linalg.inv(tm_avg[e]), tc))
+        # mm/rad to m/rad
+        r = t[np.arange(m), mon_row, col] * 1.0e-3
+        r[mon_idx <= cor_idx] = 0.0
+        mat_mn[:, j] = r
+    return mat_mn
+
+
+def get_transfer_matrices(machine):
+    """Return the transfer matrices from the beginning to the end of each
+    element of FLAME *machine* for each charge state, gathered in one
+    propagation.
+
+    At the element where the charge states change, e.g. stripper, the
+    matrices of the new charge states are chained after the average of the
+    previous ones, weighted by ``NCharge``.
+
+    Parameters
+    ----------
+    machine :
+        FLAME machine.
+
+    Returns
+    -------
+    ret : tuple
+        Tuple of transfer matrices and weights, the former is an array of
+        shape ``(N, q, 7, 7)``, *N* is the number of elements, *q* is the
+        maximum number of charge states, unit of transverse coordinates:
+        *mm* and *rad*; the latter is an array of shape ``(N, q)``, the
+        normalized ``NCharge`` of the charge states at each element, zero
+        for the padded ones, of which the matrices are identity.
+    """
+    s = machine.allocState({})
+    r = machine.propagate(s, 0, len(machine), observe=range(len(machine)))
+    mats, weights = [], []
+    p, q0 = np.eye(7)[np.newaxis], None
+    for i, si in r:
+        q = np.asarray(si.IonQ, dtype=float).reshape(-1)
+        q = q / q.sum()
+        if q0 is not None and (q.shape != q0.shape or np.any(q != q0)):
+            # new charge states, from the centroid
+            p = np.einsum('k,kab->ab', q0, p)[np.newaxis]
+        p = np.matmul(np.moveaxis(si.transmat, 2, 0), p)
+        mats.append(p)
+        weights.append(q)
+        q0 = q
+    nq = max(len(q) for q in weights)
+    tm = np.tile(np.eye(7), (len(mats), nq, 1, 1))
+    w = np.zeros((len(mats), nq))
+    for i, (p, q) in enumerate(zip(mats, weights)):
+        tm[i, :len(q)] = p
+        w[i, :len(q)] = q
+    return tm, w
+
+
 def get_orm_for_one_corrector(corrector, monitors, **kws):
     """Get column-wise ORM data for one corrector.
 
@@ -222,7 +605,7 @@ def get_orm_for_one_corrector(corrector, monitors, **kws):
         q_msg.put((-1, msg))
     print(msg)
 
-    r = np.asarray([np.polyfit(scan_rdbk, orbit_arr[:, k], 1)[0] for k in range(m)])
+    r = fit_slopes(scan_rdbk, orbit_arr)
 
     if kws.get('keep_all', False):
         return r, np.asarray(orbit_arr)
@@ -230,6 +613,157 @@ def get_orm_for_one_corrector(corrector, monitors, **kws):
         return r, None
 
 
+def wait_settle(elements, field, goals, monitors=None, **kws):
+    """Wait until the readbacks of *elements* reach *goals* and the readings
+    of downstream *monitors* are settled, *wait* is the upper bound.
+
+    The readback of each element reaches the goal if the discrepancy is less
+    than the tolerance, which is the ``tolerance`` of the field, but no
+    larger than *settle_rtol* of the step size. After all the readbacks
+    reach the goals, the monitor readings are settled if any of them has
+    been updated since the beginning, and the peak-to-peak variation of all
+    of them over *settle_window* seconds is less than *settle_bpm_tol*.
+    Thus if none of the readings changes, e.g. the monitors updated before
+    the first reading and the source is noiseless, *wait* seconds are
+    always waited.
+
+    Parameters
+    ----------
+    elements : CaElement or List[CaElement]
+        Element(s) just set, e.g. correctors.
+    field : str
+        Field name of *elements*, e.g. ``'ANG'``.
+    goals : float or list
+        Set value(s) of *elements*.
+    monitors : List[CaElement]
+        List of monitors, usually BPMs, only the ones downstream of
+        *elements* are watched.
+
+    Keyword Arguments
+    -----------------
+    wait : float
+        Maximum wait time, in *sec*, 1.0 by default.
+    settle : bool
+        If False, sleep *wait* seconds without settle detection, default is
+        True.
+    origins : float or list
+        Value(s) of *elements* before set, to get the step size, default is
+        the readback(s) at the beginning.
+    tol : float
+        Absolute tolerance between setpoint and readback, overrides the
+        tolerance from field and step size.
+    settle_rtol : float
+        Tolerance relative to the step size, 0.05 by default.
+    settle_dt : float
+        Time interval of checking readings, in *sec*, 0.05 by default.
+    settle_window : float
+        Time window of monitor readings to be flat, in *sec*, 0.2 by default,
+        should be longer than the update period of monitors.
+    settle_bpm_tol : float
+        Tolerance of peak-to-peak variation of monitor readings, 0.01 by
+        default.
+    orb_field : tuple[str]
+        Field names for monitors to retrieve orbit data, ``('X', 'Y')`` for
+        *x* and *y* directions by default.
+    xoy : str
+        'x'('y') for monitoring 'x'('y') direction,'xy' for both (default).
+    settle_times : list
+        If defined, append the tuple of (element name(s), settle time).
+
+    Returns
+    -------
+    ret : float
+        Settle time in *sec*, equals to *wait* if not settled.
+    """
+    from phantasy.library.lattice.element import read_fields
+
+    wait = kws.get('wait', 1.0)
+    settle_times = kws.get('settle_times', None)
+    origins = kws.get('origins', None)
+    if isinstance(elements, (list, tuple)):
+        goals = list(goals)
+    else:
+        elements, goals = [elements], [goals]
+        if origins is not None:
+            origins = [origins]
+    names = ','.join(e.name for e in elements)
+
+    if not kws.get('settle', True):
+        time.sleep(wait)
+        if settle_times is not None:
+            settle_times.append((names, wait))
+        return wait
+
+    tol = kws.get('tol', None)
+    rtol = kws.get('settle_rtol', 0.05)
+    dt = kws.get('settle_dt', 0.05)
+    window = kws.get('settle_window', 0.2)
+    bpm_tol = kws.get('settle_bpm_tol', 0.01)
+    orb_field = kws.get('orb_field', ('X', 'Y'))
+    xoy = kws.get('xoy', 'xy')
+
+    goals = np.asarray(goals, dtype=float)
+    t0 = time.time()
+    readbacks, _ = read_fields(elements, field)
+    if tol is not None:
+        tols = np.full(len(elements), tol)
+    else:
+        steps = np.abs(goals - (readbacks if origins is None
+                                else np.asarray(origins, dtype=float)))
+        tols = np.array([_field_tolerance(e, field) for e in elements])
+        tols = np.where(steps > 0, np.minimum(tols, rtol * steps), tols)
+
+    sb0 = min((getattr(e, 'sb', None) or 0.0 for e in elements), default=0.0)
+    if monitors:
+        monitors = [m for m in monitors if (getattr(m, 'sb', None) or 0.0) >= sb0]
+    flds = [fld for _, fld in zip(xoy, orb_field)]
+
+    def _read_orbit():
+        # one batched read of all monitors, invalid readings as 0
+        return np.nan_to_num(read_fields(monitors, flds)[0].flatten())
+
+    t_reached = None
+    if monitors:
+        orbit0 = _read_orbit()
+        updated = False
+        history = []  # (t, orbit)
+    while True:
+        t = time.time() - t0
+        if t_reached is None:
+            readbacks, _ = read_fields(elements, field)
+            if np.all(np.abs(readbacks - goals) < tols):
+                t_reached = t
+        settled = t_reached is not None
+        if monitors:
+            orbit = _read_orbit()
+            updated = updated or not np.array_equal(orbit, orbit0)
+            if t_reached is not None:
+                # flat since all readbacks reached goals
+                history.append((t, orbit))
+                while len(history) > 1 and history[1][0] <= t - window:
+                    history.pop(0)
+            settled = settled and updated and history[0][0] <= t - window and \
+                np.ptp([o for _, o in history], axis=0).max(initial=0) < bpm_tol
+        if settled:
+            break
+        if t >= wait:
+            _LOGGER.debug("{} not settled in {} sec.".format(names, wait))
+            t = wait
+            break
+        time.sleep(min(dt, wait - t))
+    if settle_times is not None:
+        settle_times.append((names, t))
+    return t
+
+
+def _field_tolerance(elem, field):
+    # setpoint-readback tolerance of the field of element, 0.01 if not found
+    try:
+        return elem.get_field(field).tolerance
+    except AttributeError:
+        return 0.01
+
+
 def inverse_matrix(m):
     """Get inverse matrix of *m* based on SVD approach, *m* should be general
     rectangle shaped.
@@ -278,6 +812,14 @@ def get_orbit(monitors, **kws):
     slow_mode_on : bool
         If set, apply processor for slow device, e.g. PM, default is True,
         set False might be useful for orbit evaluation of ORM correction.
+    device_timeout : float
+        Maximum time for processing each slow device, in *sec*, no limit by
+        default.
+    max_workers : int
+        Maximum number of slow devices processed at the same time, all by
+        default.
+    msg_queue : Queue
+        A queue that keeps log messages.
 
     Returns
     -------
@@ -298,7 +840,11 @@ def get_orbit(monitors, **kws):
     arr = np.zeros((nshot, len(xoy) * len(monitors)))
     #
     if slow_mode_on:
-        process_devices(monitors, **kws)
+        # slow devices are processed concurrently
+        r = process_devices(monitors, **kws)
+        failed = [k for k, v in r.items() if v != "Processed"]
+        if failed:
+            _LOGGER.warning("Devices not processed: {}".format(', '.join(failed)))
     #
     for i in range(nshot):
         a = [[getattr(elem, fld) for elem in monitors] for _, fld in xyfld]
@@ -363,16 +909,241 @@ def get_index_grid(lattice, correctors, monitors, xoy='xy'):
     all_cors = lattice.get_elements(type='HCOR') +  \
                lattice.get_elements(type='VCOR')
     all_bpms = lattice.get_elements(type='BPM')
-    # selected correctors columns
-    col_idx = [all_cors.index(i) for i in correctors]
-    # selected BPM rows, x,x,x....y,y,y...
-    bpm_idx = [all_bpms.index(i) for i in monitors]
-    if xoy == 'xy':
-        bpm_cnt = len(all_bpms)
-        row_idx = bpm_idx + [i+bpm_cnt for i in bpm_idx]
-    elif xoy == 'x':
-        row_idx = bpm_idx
-    elif xoy == 'y':
-        bpm_cnt = len(all_bpms)
-        row_idx = [i+bpm_cnt for i in bpm_idx]
+    return _index_grid(_index_map(all_cors), _index_map(all_bpms),
+                       correctors, monitors, xoy, 'xy')
+
+
+def _index_map(elems):
+    # element name to index, elements could be given by names.
+    return {getattr(e, 'name', e): i for i, e in enumerate(elems)}
+
+
+def _index_grid(cor_map, bpm_map, correctors, monitors, xoy, orm_xoy):
+    # index grid of sub ORM, rows of ORM: x,x,x....y,y,y...
+    col_idx = [cor_map[getattr(e, 'name', e)] for e in correctors]
+    bpm_idx = [bpm_map[getattr(e, 'name', e)] for e in monitors]
+    bpm_cnt = len(bpm_map)
+    row_idx = []
+    for p in xoy:
+        offset = orm_xoy.index(p) * bpm_cnt
+        row_idx.extend(i + offset for i in bpm_idx)
     return np.ix_(row_idx, col_idx)
+
+
+class OrbitResponse(object):
+    """Orbit response matrix (ORM) with the names of correctors and monitors,
+    the factors of singular value decomposition (SVD) and pseudo-inverse
+    matrices are cached, so the matrix is copied and read-only, create a new
+    one to change ORM.
+
+    Parameters
+    ----------
+    matrix : array
+        ORM with shape ``(m, n)``, the rows are all 'x' readings of
+        *monitors* first, then all 'y's, regarding to *xoy*.
+    correctors : list
+        List of corrector elements or names, *n* in total.
+    monitors : list
+        List of monitor elements or names.
+    xoy : str
+        'x'('y') for monitoring 'x'('y') direction,'xy' for both (default).
+    timestamp : float
+        Time of measurement in seconds since the epoch, default is now.
+
+    Examples
+    --------
+    >>> orm = OrbitResponse(get_orm(cors, bpms), cors, bpms)
+    >>> orm.save('orm.npz')
+    >>> orm = OrbitResponse.load('orm.npz')
+    >>> m_inv = orm.select(cors[:4], bpms[:6]).pinv(alpha=0.01)
+
+    See Also
+    --------
+    get_orm : Measure orbit response matrix.
+    """
+    def __init__(self, matrix, correctors=None, monitors=None, xoy='xy',
+                 timestamp=None):
+        # read-only, the cached SVD and inverse matrices are derived from it
+        self._matrix = np.array(matrix, dtype=float)
+        self._matrix.setflags(write=False)
+        self._correctors = None if correctors is None else \
+            [getattr(e, 'name', e) for e in correctors]
+        self._monitors = None if monitors is None else \
+            [getattr(e, 'name', e) for e in monitors]
+        self._xoy = xoy
+        self._timestamp = time.time() if timestamp is None else timestamp
+        m, n = self._matrix.shape
+        if self._correctors is not None and len(self._correctors) != n:
+            raise ValueError("Mismatched number of correctors and ORM columns.")
+        if self._monitors is not None and len(self._monitors) * len(xoy) != m:
+            raise ValueError("Mismatched number of monitors and ORM rows.")
+        self._cor_map = None if self._correctors is None else \
+            _index_map(self._correctors)
+        self._bpm_map = None if self._monitors is None else \
+            _index_map(self._monitors)
+        self._svd = None
+        self._pinv = {}
+        self._sub = {}
+
+    @property
+    def matrix(self):
+        """Array: Orbit response matrix, read-only."""
+        return self._matrix
+
+    @property
+    def correctors(self):
+        """list: Names of correctors."""
+        return self._correctors
+
+    @property
+    def monitors(self):
+        """list: Names of monitors."""
+        return self._monitors
+
+    @property
+    def xoy(self):
+        """str: Monitoring direction(s)."""
+        return self._xoy
+
+    @property
+    def timestamp(self):
+        """float: Time of measurement."""
+        return self._timestamp
+
+    @property
+    def shape(self):
+        """tuple: Shape of ORM."""
+        return self._matrix.shape
+
+    def svd(self):
+        """Return the cached SVD factors of ORM, ``(U, s, Vt)``."""
+        if self._svd is None:
+            self._svd = linalg.svd(self._matrix, full_matrices=False)
+            for a in self._svd:
+                a.setflags(write=False)
+        return self._svd
+
+    def pinv(self, nsv=None, rcond=None, alpha=0.0):
+        """Return the pseudo-inverse matrix of ORM, calculated from the cached
+        SVD factors, the result is cached (read-only) for each set of
+        parameters.
+
+        Parameters
+        ----------
+        nsv : int
+            Number of singular values to keep, all by default.
+        rcond : float
+            Singular values smaller than *rcond* times the largest one are
+            dropped.
+        alpha : float
+            Tikhonov regularization factor, relative to the largest singular
+            value, 0 by default.
+
+        Returns
+        -------
+        ret : array
+            Inverse matrix with shape ``(n, m)``.
+        """
+        key = (nsv, rcond, alpha)
+        if key not in self._pinv:
+            U, s, Vt = self.svd()
+            keep = s > 0
+            if nsv is not None:
+                keep[nsv:] = False
+            if rcond is not None and len(s):
+                keep &= s > rcond * s[0]
+            lam = (alpha * s[0]) ** 2 if len(s) else 0.0
+            d = np.zeros_like(s)
+            d[keep] = s[keep] / (s[keep] ** 2 + lam)
+            self._pinv[key] = np.dot(Vt.T * d, U.T)
+            self._pinv[key].setflags(write=False)
+        return self._pinv[key]
+
+    def index_grid(self, correctors, monitors, xoy='xy'):
+        """Return the index grid of sub ORM for selected *correctors* and
+        *monitors* (elements or names) w/ *xoy*.
+        """
+        if self._cor_map is None or self._bpm_map is None:
+            raise RuntimeError("ORM is not indexed by element names.")
+        return _index_grid(self._cor_map, self._bpm_map,
+                           correctors, monitors, xoy, self._xoy)
+
+    def contains(self, correctors, monitors, xoy='xy'):
+        """Test if the sub ORM of *correctors* and *monitors* is available."""
+        if self._cor_map is None or self._bpm_map is None:
+            return False
+        return all(p in self._xoy for p in xoy) and \
+            all(getattr(e, 'name', e) in self._cor_map for e in correctors) and \
+            all(getattr(e, 'name', e) in self._bpm_map for e in monitors)
+
+    def select(self, correctors, monitors, xoy='xy'):
+        """Return the sub ORM as :class:`OrbitResponse` for selected
+        *correctors* and *monitors* w/ *xoy*, the sub ORMs are cached, and
+        itself is returned if the selection is the same.
+        """
+        cor_names = tuple(getattr(e, 'name', e) for e in correctors)
+        bpm_names = tuple(getattr(e, 'name', e) for e in monitors)
+        if self._correctors is not None and self._monitors is not None and \
+                list(cor_names) == self._correctors and \
+                list(bpm_names) == self._monitors and xoy == self._xoy:
+            return self
+        key = (cor_names, bpm_names, xoy)
+        if key not in self._sub:
+            grid = self.index_grid(cor_names, bpm_names, xoy)
+            self._sub[key] = OrbitResponse(self._matrix[grid], cor_names,
+                                           bpm_names, xoy, self._timestamp)
+        return self._sub[key]
+
+    def save(self, filepath):
+        """Save ORM to a compressed *.npz* file, or HDF5 file if the
+        extension is *.h5* or *.hdf5* (requires h5py), *.npz* is appended
+        to *filepath* for other extensions, return the path of saved file.
+        """
+        filepath = _orm_filepath(filepath)
+        data = {'matrix': self._matrix,
+                'correctors': np.asarray(self._correctors or [], dtype=str),
+                'monitors': np.asarray(self._monitors or [], dtype=str),
+                'xoy': np.asarray(self._xoy),
+                'timestamp': np.asarray(self._timestamp)}
+        if filepath.endswith(('.h5', '.hdf5')):
+            import h5py
+            with h5py.File(filepath, 'w') as fp:
+                for k, v in data.items():
+                    if v.dtype.kind == 'U':
+                        v = v.astype(h5py.string_dtype())
+                    fp.create_dataset(k, data=v)
+        else:
+            np.savez_compressed(filepath, **data)
+        return filepath
+
+    @classmethod
+    def load(cls, filepath):
+        """Load ORM from the file saved by :meth:`save`."""
+        filepath = _orm_filepath(filepath)
+        if filepath.endswith(('.h5', '.hdf5')):
+            import h5py
+            data = {}
+            with h5py.File(filepath, 'r') as fp:
+                for k, ds in fp.items():
+                    if h5py.check_string_dtype(ds.dtype):
+                        ds = ds.asstr()
+                    data[k] = ds[()]
+        else:
+            with np.load(filepath) as fp:
+                data = {k: fp[k] for k in fp.files}
+        xoy = str(data['xoy'])
+        cors = [str(i) for i in data['correctors']] or None
+        bpms = [str(i) for i in data['monitors']] or None
+        return cls(data['matrix'], cors, bpms, xoy, float(data['timestamp']))
+
+    def __repr__(self):
+        return "OrbitResponse: shape {}, xoy '{}', measured at {}".format(
+                self.shape, self._xoy, epoch2human(self._timestamp, fmt=TS_FMT))
+
+
+def _orm_filepath(filepath):
+    # np.savez_compressed() appends .npz to the other extensions.
+    filepath = str(filepath)
+    if not filepath.endswith(('.h5', '.hdf5', '.npz')):
+        filepath += '.npz'
+    return filepath
@@ -11,9 +11,11 @@ from .epics_tools import caget
 from .epics_tools import cainfo
 from .epics_tools import camonitor
 from .epics_tools import ensure_put
+from .epics_tools import ensure_put_many
 from .epics_tools import ensure_get
 from .epics_tools import caget_many
 from .epics_tools import fetch_data
+from .epics_tools import stream_data
 from .epics_tools import establish_pvs
 from .epics_tools import establish_elems
 from .epics_tools import DataFetcher
@@ -35,8 +37,8 @@ __all__ = [
     'DataSource', 'dump_data',
     'PV_POLICIES',
     'unicorn_read', 'unicorn_write',
-    'ensure_put', 'ensure_set', 'ensure_get',
+    'ensure_put', 'ensure_put_many', 'ensure_set', 'ensure_get',
     'PVElement', 'PVElementReadonly',
-    'fetch_data', 'establish_pvs', 'establish_elems',
+    'fetch_data', 'stream_data', 'establish_pvs', 'establish_elems',
     'DataFetcher'
 ]
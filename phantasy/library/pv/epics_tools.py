@@ -17,13 +17,13 @@ from functools import partial
 from queue import Queue, Empty
 from typing import List
 import click
-from threading import Thread, Event
+import numpy as np
+from threading import Thread, Event, Lock
 import pandas as pd
 
 from phantasy.library.exception import TimeoutError
 from phantasy.library.exception import GetFinishedException
 from phantasy.library.exception import PutFinishedException
-from phantasy.library.exception import FetchDataFinishedException
 from phantasy.library.exception import AllFieldsConnectedException
 from phantasy.library.misc import epoch2human
 
@@ -214,6 +214,142 @@ def ensure_put(field, goal, tol=None, timeout=None, verbose=False):
     return ret
 
 
+def ensure_put_many(fields, goals, tol=None, timeout=None, verbose=False,
+                    callback=None):
+    """Put operation to a list of *fields* concurrently, ensure each one to
+    reach the value of *goals* within the discrepancy tolerance defined by
+    *tol*, within the time period defined by *timeout*.
+
+    All the setpoints are put at once, then the readbacks of all the fields
+    are watched in one loop, the total elapsed time is determined by the
+    slowest field, other than the sum of all fields as calling
+    :func:`ensure_put` one by one.
+
+    Parameters
+    ----------
+    fields : list
+        List of CaField or PVElement objects.
+    goals : list
+        List of the final values that each field would like to reach.
+    tol : float or list
+        Tolerance for discrepancy between current readback value and the set
+        goal, could be defined for each field, default is 0.01.
+    timeout : float or list
+        Maximum wait time, could be defined for each field, default is
+        10.0 sec.
+    verbose : bool
+        If True, print out the readback updates, default is False.
+    callback : callable
+        Callable with the arguments of (index, field, ret, elapsed), called as
+        soon as the field of *index* is finished.
+
+    Returns
+    -------
+    r : list
+        List of tuple of (ret, elapsed) for each field, *ret* is one of
+        "Timeout" and "PutFinished", *elapsed* is the time in seconds the put
+        took to finish.
+
+    Examples
+    --------
+    >>> flds = [e.get_field('I') for e in mp.get_elements(type='QUAD')]
+    >>> ensure_put_many(flds, [1.0] * len(flds), tol=0.01, timeout=5.0)
+    [('PutFinished', 0.52), ('PutFinished', 1.03), ...]
+
+    See Also
+    --------
+    :func:`ensure_put`
+    """
+    n = len(fields)
+    tol = 0.01 if tol is None else tol
+    timeout = 10.0 if timeout is None else timeout
+    tols = list(tol) if isinstance(tol, (list, tuple)) else [tol] * n
+    timeouts = list(timeout) if isinstance(timeout, (list, tuple)) \
+        else [timeout] * n
+
+    def _callback(sq, idx, fld, **kws):
+        sq.put((idx, fld.value, kws.get('timestamp')))
+
+    q = Queue()
+    # {index: (readback PV, callback index, auto monitor)}, removed once the
+    # field is finished
+    watched = {}
+    result = [None] * n
+
+    def _release(idx):
+        if idx in watched:
+            pv, cid, am0 = watched.pop(idx)
+            pv.remove_callback(cid)
+            fields[idx].set_auto_monitor(am0)
+
+    def _finish(idx, ret):
+        fld = fields[idx]
+        _release(idx)
+        dt = time.time() - t0
+        result[idx] = (ret, dt)
+        _LOGGER.info(
+            f"Field '{fld.name}' of '{fld.ename}' reached: {fld.value}.")
+        if verbose:
+            print(f"{fld.ename}[{fld.name}] returns '{ret}' in {dt:.3f} sec")
+        if callback is not None:
+            callback(idx, fld, ret, dt)
+
+    try:
+        for i, fld in enumerate(fields):
+            pv = fld.readback_pv[0]
+            am0 = fld.get_auto_monitor()
+            fld.set_auto_monitor()
+            watched[i] = (pv, pv.add_callback(partial(_callback, q, i, fld)),
+                          am0)
+
+        t0 = time.time()
+        for fld, goal in zip(fields, goals):
+            fld.value = goal
+
+        for i, fld in enumerate(fields):
+            if _is_reached(fld.value, goals[i], tols[i]):
+                _finish(i, "PutFinished")
+
+        t_end = [t0 + t for t in timeouts]
+        while None in result:
+            t_left = min(t_end[i] for i in range(n) if result[i] is None) \
+                     - time.time()
+            try:
+                i, v, ts = q.get(timeout=max(t_left, 0))
+            except Empty:
+                pass
+            else:
+                if result[i] is None:
+                    if verbose:
+                        print(f"[{epoch2human(ts)[:-3]}]{fields[i].ename}"
+                              f"[{fields[i].name}] now is {v} (goal: {goals[i]})")
+                    _LOGGER.debug(f"Field '{fields[i].name}' of "
+                                  f"'{fields[i].ename}' reached: {v}[{goals[i]}].")
+                    if _is_reached(v, goals[i], tols[i]):
+                        _finish(i, "PutFinished")
+            t = time.time()
+            for j in range(n):
+                if result[j] is None and t >= t_end[j]:
+                    _finish(j, "Timeout")
+    finally:
+        # on error, do not leave the readback callbacks and auto monitor
+        for i in list(watched):
+            _release(i)
+    return result
+
+
+def _is_reached(value, goal, tol):
+    # test if *value* reaches *goal* within *tol*, element-wise for arrays,
+    # False if not comparable (None, string, mismatched shape).
+    if value is None:
+        return False
+    try:
+        d = np.abs(np.asarray(value, dtype=float) - np.asarray(goal, dtype=float))
+    except (TypeError, ValueError):
+        return False
+    return d.size > 0 and bool(np.all(d < tol))
+
+
 def caget_many(pvlist,
                as_string=False,
                count=None,
@@ -267,6 +403,134 @@ def caget_many(pvlist,
     return out
 
 
+class _RingBuffer:
+    """Preallocated ring buffer of values and timestamps of one PV, grows
+    (doubles) when full if *grow* is set, otherwise the oldest samples are
+    overwritten.
+    """
+
+    def __init__(self, capacity: int = 256, grow: bool = True, dtype=float):
+        self.grow = grow
+        self._data = np.full(capacity, None if dtype is object else np.nan,
+                             dtype=dtype)
+        self._ts = np.zeros(capacity)
+        self._start = 0  # index of the oldest sample
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    @property
+    def capacity(self):
+        return self._data.size
+
+    def clear(self):
+        self._start = 0
+        self._n = 0
+
+    def append(self, value, ts: float):
+        if value is None and self._data.dtype != object:
+            value = np.nan
+        cap = self._data.size
+        if self._n == cap:
+            if not self.grow:
+                self._data[self._start] = value
+                self._ts[self._start] = ts
+                self._start = (self._start + 1) % cap
+                return
+            self._resize(2 * cap)
+        i = (self._start + self._n) % self._data.size
+        self._data[i] = value
+        self._ts[i] = ts
+        self._n += 1
+
+    def _resize(self, capacity: int):
+        data = np.full(capacity, None if self._data.dtype == object else np.nan,
+                       dtype=self._data.dtype)
+        ts = np.zeros(capacity)
+        data[:self._n] = self.values()
+        ts[:self._n] = self.timestamps()
+        self._data, self._ts, self._start = data, ts, 0
+
+    def _ordered(self, arr: np.ndarray):
+        i0, i1 = self._start, self._start + self._n
+        if i1 <= arr.size:
+            return arr[i0:i1]
+        return np.concatenate((arr[i0:], arr[:i1 - arr.size]))
+
+    def values(self):
+        """Array of values, from the oldest to the newest."""
+        return self._ordered(self._data)
+
+    def timestamps(self):
+        """Array of timestamps, from the oldest to the newest."""
+        return self._ordered(self._ts)
+
+
+class _RunningStats:
+    """Online statistics of one PV, count/mean/std/min/max are updated for each sample by
+    Welford's algorithm, or calculated from the last *window* samples if *window* is set.
+    If *abs_z* is set, drop the data beyond the absolute z-score, which is against the mean and
+    std of all the samples before (the test starts from the third sample), or of the window.
+    """
+
+    def __init__(self, window: int = None, abs_z: float = None):
+        self._abs_z = abs_z
+        self._buf = None if window is None else _RingBuffer(window, grow=False)
+        self._n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min = np.inf
+        self._max = -np.inf
+        # of all the samples, reference for z-score
+        self._n0 = 0
+        self._mean0 = 0.0
+        self._m20 = 0.0
+
+    def append(self, value, ts: float):
+        if value is None or not np.isscalar(value):
+            return
+        if self._buf is not None:
+            self._buf.append(value, ts)
+            return
+        if self._abs_z is not None:
+            # test against the reference before updating it with value
+            _sub = value - self._mean0
+            is_outlier = self._n0 > 1 and _sub != 0.0 and \
+                _sub ** 2 > self._abs_z ** 2 * self._m20 / self._n0
+            self._n0 += 1
+            self._mean0 += _sub / self._n0
+            self._m20 += _sub * (value - self._mean0)
+            if is_outlier:
+                return
+        self._n += 1
+        delta = value - self._mean
+        self._mean += delta / self._n
+        self._m2 += delta * (value - self._mean)
+        self._min = min(self._min, value)
+        self._max = max(self._max, value)
+
+    def stats(self):
+        """Return a tuple of (count, mean, std, min, max)."""
+        if self._buf is None:
+            if self._n == 0:
+                return 0, np.nan, np.nan, np.nan, np.nan
+            return self._n, self._mean, np.sqrt(self._m2 / self._n), self._min, self._max
+        x = self._buf.values()
+        x = x[~np.isnan(x)]
+        if self._abs_z is not None and x.size > 1:
+            _sub = x - x.mean()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x = x[(_sub == 0.0) | ((_sub / x.std()) ** 2 <= self._abs_z ** 2)]
+        if x.size == 0:
+            return 0, np.nan, np.nan, np.nan, np.nan
+        return x.size, x.mean(), x.std(), x.min(), x.max()
+
+
 class DataFetcher:
     """ DataFetcher provides a more robust, flexible and efficient way for fetching data through CA.
     It's wrapping the `fetch_data` function but offers less overhead in terms of managing the
@@ -285,6 +549,9 @@ class DataFetcher:
         via <DataFetcher instance>.timeout = <new timeout>.
     verbose : bool
         If set, show more print out messages, defaults False.
+    buffer_size : int
+        Initial size of the preallocated buffer for each PV, defaults 256, the buffer grows
+        if more data points are fetched.
 
     See Also
     --------
@@ -311,6 +578,11 @@ class DataFetcher:
     >>> avg, df = data_fetcher(1.0, with_data=True, data_opt={'with_timestamp': True})
     >>> # returned df with timestamp as the index, PV names as columns, timestamps are
     >>> # aligned with fillna_method of 'linear'.
+    >>> # continuous mode, yield the statistics every 0.5 second, of the last 20 samples.
+    >>> for snapshot in data_fetcher.stream(0.5, window=20, abs_z=3):
+    >>>     print(snapshot['mean'])
+    >>> # or call back in the background, stop it by data_fetcher.stop()
+    >>> data_fetcher.start_stream(lambda snapshot: print(snapshot['mean']), 0.5)
     >>> # clean up (optional)
     >>> data_fetcher.clean_up()
     >>> # Re-instantiation is required after clean_up if working with the DataFetcher with
@@ -328,8 +600,18 @@ class DataFetcher:
         #
         self.timeout = kws.get('timeout', 5)
         self.verbose = kws.get('verbose', False)
+        # data buffers, created with the first shot
+        self._buffer_size = kws.get('buffer_size', 256)
+        self._bufs = [None] * self._npv
+        # where the monitor callbacks write to, data buffers or running statistics
+        self._sinks = self._bufs
+        self._lock = Lock()
+        # set to end the time window
+        self._evt = Event()
         # start data accumulating if set.
         self._run = False
+        # held by the fetching in progress, fixed time window or continuous mode
+        self._busy = Lock()
         #
         self.pre_setup()
 
@@ -428,9 +710,6 @@ class DataFetcher:
     def pre_setup(self):
         """Preparation for the data fetch procedure.
         """
-        # clear the data container
-        self._data_list = [[] for _ in range(self._npv)]
-        self._data_ts_list = [[] for _ in range(self._npv)]
         # if all PVs are ready, just return
         self._all_pvs_ready = self.__check_all_pvs()
         if self._all_pvs_ready:
@@ -442,11 +721,13 @@ class DataFetcher:
             if self._run:
                 val = kws.get('value')
                 ts = kws.get('timestamp')
-                self._data_list[idx].append(val)
-                self._data_ts_list[idx].append(ts)
+                with self._lock:
+                    self._sinks[idx].append(val, ts)
                 if self.verbose:
+                    v = f"{val:<6g}" if np.isscalar(val) else \
+                        f"array of {np.size(val)}"
                     click.secho(
-                        f"[{epoch2human(ts)[:-3]}] Get {kws.get('pvname')}: {val:<6g}",
+                        f"[{epoch2human(ts)[:-3]}] Get {kws.get('pvname')}: {v}",
                         fg="blue")
 
         #
@@ -496,56 +777,49 @@ class DataFetcher:
                  abs_z: float = None,
                  with_data: bool = False,
                  **kws):
+        if not self._busy.acquire(blocking=False):
+            raise RuntimeError("DataFetcher is busy, stop() the streaming first.")
+        try:
+            return self._fetch(time_span, abs_z, with_data, **kws)
+        finally:
+            self._busy.release()
+
+    def _fetch(self, time_span: float, abs_z: float, with_data: bool, **kws):
         verbose = kws.get('verbose', self.verbose)
         self.verbose = verbose
         #
         data_opt = {'with_timestamp': False, 'fillna_method': 'linear'}
         if kws.get('data_opt') is not None:
             data_opt.update(kws.get('data_opt'))
-        # initial data list
+        # initial data buffers
         ts0 = time.time()
-        self._data_first_shot = [o().value for o in self._pvs]
-        self._data_list = [[] for i in range(self._npv)]
-        self._data_ts_first_shot = [ts0 for o in self._pvs]
-        self._data_ts_list = [[] for i in range(self._npv)]
-        _tq = Queue()
-        _evt = Event()
-
-        def _tick_down(q):
-            self._run = True
-            while True:
-                if _evt.is_set():
-                    self._run = False
-                    break
-                q.put(time.time())
-                time.sleep(0.001)
-
-        th = Thread(target=_tick_down, args=(_tq, ))
-        th.start()
-        t0 = time.time()
-        t1 = t0 + time_span
-        while True:
-            try:
-                t = _tq.get(timeout=5)
-                if t >= t1: raise FetchDataFinishedException
-            except FetchDataFinishedException:
-                _evt.set()
-                if verbose:
-                    click.secho(f"Finished fetching data in {t - t0:.1f}s")
-                break
-        # amend the first element of the list container with initial shot
-        for i in range(self._npv):
-            if not self._data_list[i]:
-                self._data_list[i] = [self._data_first_shot[i]]
-                self._data_ts_list[i] = [self._data_ts_first_shot[i]]
+        first_shot = [o().value for o in self._pvs]
+        self._reset_buffers(first_shot)
+        self._sinks = self._bufs
+        # one timer for the whole time window
+        self._evt.clear()
+        self._run = True
+        self._evt.wait(time_span)
+        self._run = False
+        if verbose:
+            click.secho(f"Finished fetching data in {time.time() - ts0:.1f}s")
+        # amend the buffer with initial shot if no data
+        with self._lock:
+            for buf, v in zip(self._bufs, first_shot):
+                if len(buf) == 0:
+                    buf.append(v, ts0)
         # raw data
         if not data_opt['with_timestamp']:
-            df0 = pd.DataFrame(self._data_list, index=self._pvlist)
+            if not with_data and all(buf.dtype != object for buf in self._bufs):
+                # statistics on the buffers, skip pandas
+                return DataFetcher._average(self._bufs, abs_z), None
+            df0 = pd.DataFrame([buf.values() for buf in self._bufs], index=self._pvlist)
             return DataFetcher.pack_data(df0, abs_z, with_data, expanded=kws.get('expanded', True))
         else:
             dfs = []
-            for i, (_ts, _data) in enumerate(zip(self._data_ts_list, self._data_list)):
-                df = pd.DataFrame(zip(_ts, _data), columns=['timestamp', self._pvlist[i]])
+            for i, buf in enumerate(self._bufs):
+                df = pd.DataFrame({'timestamp': buf.timestamps().copy(),
+                                   self._pvlist[i]: buf.values().copy()})
                 df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
                 df.set_index('timestamp', inplace=True)
                 dfs.append(df)
@@ -561,6 +835,120 @@ class DataFetcher:
                 df = df.bfill().dropna()
             return df.mean(axis=0).to_numpy(), df
 
+    def stream(self, cadence: float = 1.0, window: int = None, abs_z: float = None,
+               count: int = None):
+        """Continuously fetch the data, yield the snapshot of the statistics of each PV every
+        *cadence* seconds, the PV subscriptions are kept open between snapshots. Only one
+        fetching runs at a time, RuntimeError is raised if the fixed time window or another
+        stream is in progress.
+
+        Parameters
+        ----------
+        cadence : float
+            Time interval in seconds between snapshots, defaults to 1.0.
+        window : int
+            If set, the statistics are of the last *window* samples of each PV, otherwise of
+            all the samples since the beginning (Welford's algorithm).
+        abs_z : float
+            The absolute value of z-score, drop the data beyond, if not set, keep all the data.
+        count : int
+            Total number of snapshots, if not set, stream until :meth:`stop` is called or
+            the generator is closed.
+
+        Yields
+        ------
+        r : dict
+            Snapshot of 'timestamp' and the arrays of '#', 'mean', 'std', 'min' and 'max',
+            each element of the array is for one PV, could be converted to a dataframe by
+            ``pd.DataFrame(r, index=<pvlist>)`` (without 'timestamp').
+
+        See Also
+        --------
+        start_stream, stop
+        """
+        if not self._busy.acquire(blocking=False):
+            raise RuntimeError("DataFetcher is busy, stop() the streaming first.")
+        stats = [_RunningStats(window, abs_z) for _ in range(self._npv)]
+        ts0 = time.time()
+        with self._lock:
+            for st, o in zip(stats, self._pvs):
+                st.append(o().value, ts0)
+            self._sinks = stats
+        self._evt.clear()
+        self._run = True
+        try:
+            i = 0
+            while count is None or i < count:
+                if self._evt.wait(cadence):
+                    break
+                yield self._snapshot(stats)
+                i += 1
+        finally:
+            self._run = False
+            self._sinks = self._bufs
+            self._busy.release()
+
+    def start_stream(self, callback, cadence: float = 1.0, window: int = None,
+                     abs_z: float = None, count: int = None):
+        """Stream the data in the background, the snapshot is passed to *callback* every
+        *cadence* seconds, see :meth:`stream` for the parameters, call :meth:`stop` to stop.
+
+        Returns
+        -------
+        r : Thread
+            The thread of streaming.
+        """
+        def _run():
+            for snapshot in self.stream(cadence, window, abs_z, count):
+                callback(snapshot)
+
+        th = Thread(target=_run, daemon=True)
+        th.start()
+        return th
+
+    def stop(self):
+        """Stop fetching the data, for either the fixed time window or continuous mode.
+        """
+        self._evt.set()
+
+    def _snapshot(self, stats: list):
+        with self._lock:
+            r = np.array([st.stats() for st in stats], dtype=float).reshape(-1, 5)
+        return {'timestamp': time.time(),
+                '#': r[:, 0].astype(int), 'mean': r[:, 1], 'std': r[:, 2],
+                'min': r[:, 3], 'max': r[:, 4]}
+
+    def _reset_buffers(self, first_shot: list):
+        # clear the data buffers, (re)allocate if the type of data changed.
+        with self._lock:
+            for i, v in enumerate(first_shot):
+                dtype = float if v is None or np.isscalar(v) else object
+                buf = self._bufs[i]
+                if buf is None or buf.dtype != np.dtype(dtype):
+                    self._bufs[i] = _RingBuffer(self._buffer_size, dtype=dtype)
+                else:
+                    buf.clear()
+
+    @staticmethod
+    def _average(bufs: list, abs_z: float = None):
+        """Return the average array of the data in *bufs*, drop the data beyond *abs_z* if set,
+        same as the average array returned by :meth:`pack_data`.
+        """
+        avg = np.full(len(bufs), np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for i, buf in enumerate(bufs):
+                x = buf.values()
+                x = x[~np.isnan(x)]
+                if x.size == 0:
+                    continue
+                _avg = x.mean()
+                if abs_z is not None:
+                    _sub = x - _avg
+                    x = x[(_sub == 0.0) | ((_sub / x.std()) ** 2 <= abs_z ** 2)]
+                    _avg = x.mean()
+                avg[i] = _avg
+        return avg
+
 
 def fetch_data(pvlist: List[str],
                time_span: float = 5.0,
@@ -639,6 +1027,37 @@ def fetch_data(pvlist: List[str],
     return avg, df
 
 
+def stream_data(pvlist: List[str],
+                cadence: float = 1.0,
+                window: int = None,
+                abs_z: float = None,
+                count: int = None,
+                verbose=False,
+                **kws):
+    """Continuously fetch the readback data from a list of given PVs, yield the statistics of
+    each PV every *cadence* seconds, see :meth:`DataFetcher.stream`.
+
+    Keyword Arguments
+    -----------------
+    timeout : float
+        Connection timeout for all PVs, defaults 5.0 seconds.
+
+    Examples
+    --------
+    >>> from phantasy import stream_data
+    >>> # print the rolling average of the last 10 samples every second, for 60 seconds.
+    >>> for snapshot in stream_data(pvs, 1.0, window=10, count=60):
+    >>>     print(snapshot['mean'])
+    """
+    data_fetcher = DataFetcher(pvlist,
+                               timeout=kws.get('timeout', 5),
+                               verbose=verbose)
+    try:
+        yield from data_fetcher.stream(cadence, window, abs_z, count)
+    finally:
+        data_fetcher.clean_up()
+
+
 class PVsAreReady(Exception):
 
     def __init__(self, *args, **kws):
@@ -23,9 +23,7 @@ def unicorn_read(fn):
     >>>     return rp(x)
     """
     def decorator(read_policy):
-        def f(x):
-            return fn(read_policy(x))
-        return f
+        return _UnicornReadPolicy(fn, read_policy)
     return decorator
 
 
@@ -49,12 +47,32 @@ def unicorn_write(fn):
     >>>     wp(x, v, **kws)
     """
     def decorator(write_policy):
-        def f(x, v, **kws):
-            write_policy(x, fn(v), **kws)
-        return f
+        return _UnicornWritePolicy(fn, write_policy)
     return decorator
 
 
+class _UnicornReadPolicy(object):
+    # read policy with scaling law applied, could be pickled if both *fn*
+    # and *read_policy* could be.
+    def __init__(self, fn, read_policy):
+        self.fn = fn
+        self.read_policy = read_policy
+
+    def __call__(self, x):
+        return self.fn(self.read_policy(x))
+
+
+class _UnicornWritePolicy(object):
+    # write policy with scaling law applied, could be pickled if both *fn*
+    # and *write_policy* could be.
+    def __init__(self, fn, write_policy):
+        self.fn = fn
+        self.write_policy = write_policy
+
+    def __call__(self, x, v, **kws):
+        self.write_policy(x, self.fn(v), **kws)
+
+
 if __name__ == '__main__':
     """class to simulate epics PV.
     """
@@ -238,7 +238,9 @@ def get_settings_from_element_list(elem_list, data_source='control',
     """
     def get_phy_field_setting(elem, phy_fld, settings, data_source):
         # get the value of current physics field setting.
-        phy_val = elem.current_setting(phy_fld)
+        phy_val = live_settings.get((elem.name, phy_fld), None)
+        if phy_val is None:
+            phy_val = elem.current_setting(phy_fld)
         if data_source == 'model':
             m_settings = settings.get(ename, {})
             if phy_fld in m_settings:
@@ -256,6 +258,14 @@ def get_settings_from_element_list(elem_list, data_source='control',
     if field_of_interest is None:
         field_of_interest = {}
 
+    # read current settings of all physics fields at once.
+    from phantasy.library.lattice.element import read_fields
+    elems = [elem for elem in elem_list if not elem.is_diag()]
+    phy_fields = sorted({f for elem in elems for f in elem.get_phy_fields()})
+    values, valid = read_fields(elems, phy_fields, handle='setpoint')
+    live_settings = {(elems[i].name, phy_fields[j]): float(values[i, j])
+                     for i, j in zip(*np.nonzero(valid))}
+
     s = Settings()
     for elem in elem_list:
         # elemeng name
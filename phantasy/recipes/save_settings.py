@@ -23,16 +23,17 @@ def init_mp(machine, segments=None, **kws):
     -----------------
     wait : float
         If set, wait *wait* seconds after mp initialization.
+    max_workers : int
+        Maximum number of threads to load segments concurrently.
 
     Returns
     -------
     o :
         MachinePortal instance.
     """
-    mp = MachinePortal(machine)
-    segs = mp.get_all_segment_names() if segments is None else segments
-    for seg in segs:
-        mp.load_lattice(seg)
+    segs = '*' if segments is None else segments
+    mp = MachinePortal(machine, segment=segs,
+                       max_workers=kws.get('max_workers', None))
     t = kws.get('wait', None)
     if t is not None:
         print("Sleep {} secs...".format(t))
@@ -98,7 +99,7 @@ def save_all_settings(filepath=None, segments=["LEBT", "MEBT"], machine="FRIB",
                     v = elem.convert(field=phy_fld_name, value=elem_phy_conf[phy_fld_name])
                     settings[elem_name].update({eng_fields[0]: v})
 
-    settings.update(**{k:v for k,v in kws.items() if k not in ["wait",]})
+    settings.update(**{k:v for k,v in kws.items() if k not in ["wait", "max_workers"]})
     if filepath is not None:
         with open(filepath, 'w') as f:
             json.dump(settings, f, indent=2)
@@ -56,6 +56,85 @@ def test_mp_load_lattice(mp_from_config):
     assert mp.work_lattice_name == 'LS1'
 
 
+def test_mp_lattice_cache(tmp_path):
+    mpath = os.path.join(config_dir, TEST_MACH)
+    cache_dir = str(tmp_path)
+    mp0 = MachinePortal(machine=mpath, use_cache=True, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    mp1 = MachinePortal(machine=mpath, use_cache=True, cache_dir=cache_dir)
+    lat0, lat1 = mp0.work_lattice_conf, mp1.work_lattice_conf
+    assert lat0 is not lat1
+    assert [e.name for e in lat0] == [e.name for e in lat1]
+    assert lat0.get_elements(type='BPM', srange=(0, 50)) == \
+           lat1.get_elements(type='BPM', srange=(0, 50))
+    for e0, e1 in zip(lat0, lat1):
+        assert e0.fields == e1.fields
+        assert e0.design_settings == e1.design_settings
+        for f in e0.fields:
+            assert e0.pv(field=f) == e1.pv(field=f)
+
+
+def test_mp_lattice_cache_auto_monitor(tmp_path):
+    mpath = os.path.join(config_dir, TEST_MACH)
+    cache_dir = str(tmp_path)
+    MachinePortal(machine=mpath, use_cache=True, cache_dir=cache_dir,
+                  auto_monitor=True)
+    mp = MachinePortal(machine=mpath, use_cache=True, cache_dir=cache_dir,
+                       auto_monitor=True)
+    fld = mp.get_elements(type='BPM')[0].get_field('X')
+    # subscribed at loading, as loaded from data source
+    assert fld._rdbk_pv is not None
+    assert all(pv.auto_monitor for pv in fld._rdbk_pv)
+    mp = MachinePortal(machine=mpath, use_cache=True, cache_dir=cache_dir,
+                       auto_monitor=True, lazy=True)
+    fld = mp.get_elements(type='BPM')[0].get_field('X')
+    assert fld._rdbk_pv is None
+    assert all(pv.auto_monitor for pv in fld.readback_pv)
+
+
+def test_mp_load_multiple_segments():
+    mpath = os.path.join(config_dir, TEST_MACH)
+    mp0 = MachinePortal(machine=mpath, segment='*')
+    mp1 = MachinePortal(machine=mpath, segment=['LS1', 'FS1', 'LINAC'],
+                        max_workers=1)
+    assert mp0.work_lattice_name == 'LINAC'
+    assert sorted(mp0.lattice_names) == ['FS1', 'LINAC', 'LS1']
+    assert sorted(mp1.lattice_names) == ['FS1', 'LINAC', 'LS1']
+    for name in mp0.lattice_names:
+        lat0, lat1 = mp0.lattices[name], mp1.lattices[name]
+        assert [e.name for e in lat0] == [e.name for e in lat1]
+    # configuration is shared by segments
+    lats = list(mp0.lattices.values())
+    assert all(lat.config is lats[0].config for lat in lats)
+
+
+def test_mp_lazy_pvs():
+    mpath = os.path.join(config_dir, TEST_MACH)
+    mp = MachinePortal(machine=mpath, lazy=True)
+    elem = mp.get_elements(type='BPM')[0]
+    fld = elem.get_field('X')
+    assert fld._rdbk_pv is None
+    assert [pv.pvname for pv in fld.readback_pv] == fld.readback
+    assert fld._cset_pv is None
+    pvs = mp.prewarm(elem, 'Y', handle='readback', timeout=0)
+    assert [pv.pvname for pv in pvs] == elem.get_field('Y').readback
+    # bulk reading does not create PV objects
+    elem = mp.get_elements(type='BPM')[1]
+    mp.work_lattice_conf.read_fields([elem], ['X', 'Y'], timeout=0.1)
+    assert elem.get_field('X')._rdbk_pv is None
+    assert elem.get_field('Y')._rdbk_pv is None
+
+
+def test_mp_array_mode():
+    mpath = os.path.join(config_dir, TEST_MACH)
+    mp = MachinePortal(machine=mpath, lazy=True)
+    assert mp.get_elements(type='BPM')[0].get_field('X').array_mode == 'list'
+    mp = MachinePortal(machine=mpath, lazy=True, array_mode='copy')
+    for elem in mp.work_lattice_conf:
+        for f in elem.fields:
+            assert elem.get_field(f).array_mode == 'copy'
+
+
 def test_get_elements_names_exact(mp_from_config):
     _, mp = mp_from_config
     lat_name = mp.work_lattice_name
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test processing slow devices.
+"""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from phantasy.library.physics import devices
+from phantasy.library.physics.devices import process_devices
+
+
+class _StubElement(object):
+    def __init__(self, name, family='PM'):
+        self.name = name
+        self.family = family
+
+
+class TestProcessDevices(unittest.TestCase):
+    def setUp(self):
+        # devices of name in blocked are processed until released
+        self.blocked = {}
+        self.processed = []
+
+        def _process(elem):
+            if elem.name in self.blocked:
+                self.blocked[elem.name].wait(10.0)
+            else:
+                time.sleep(0.2)
+            self.processed.append(elem.name)
+
+        def _fail(elem):
+            raise RuntimeError("failed")
+
+        patcher = mock.patch.dict(devices.device_processors,
+                                  {'PM': _process, 'VD': _fail})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for e in self.blocked.values():
+            e.set()
+        self._wait_idle()
+
+    def _wait_idle(self, timeout=5.0):
+        t0 = time.time()
+        while devices._IN_FLIGHT and time.time() - t0 < timeout:
+            time.sleep(0.01)
+        self.assertEqual(devices._IN_FLIGHT, {})
+
+    def _block(self, *names):
+        for name in names:
+            self.blocked[name] = threading.Event()
+
+    def test_concurrent(self):
+        elems = [_StubElement('PM{}'.format(i)) for i in range(4)]
+        elems.append(_StubElement('BPM1', 'BPM'))
+        t0 = time.time()
+        r = process_devices(elems)
+        # max() other than sum() of the processing time
+        self.assertTrue(time.time() - t0 < 0.6)
+        self.assertEqual(r, {'PM{}'.format(i): "Processed" for i in range(4)})
+        self.assertEqual(process_devices(elems[-1:]), {})
+
+    def test_error(self):
+        r = process_devices([_StubElement('PM1'), _StubElement('VD1', 'VD')])
+        self.assertEqual(r, {'PM1': "Processed", 'VD1': "Error"})
+        self._wait_idle()
+
+    def test_timeout_busy(self):
+        self._block('PM1')
+        elems = [_StubElement('PM1'), _StubElement('PM2')]
+        t0 = time.time()
+        r = process_devices(elems, device_timeout=0.3)
+        self.assertTrue(0.3 <= time.time() - t0 < 0.8)
+        self.assertEqual(r, {'PM1': "Timeout", 'PM2': "Processed"})
+        self.assertEqual(list(devices._IN_FLIGHT), ['PM1'])
+        # not started again while in flight
+        r = process_devices(elems, device_timeout=0.3)
+        self.assertEqual(r, {'PM1': "Busy", 'PM2': "Processed"})
+        self.blocked['PM1'].set()
+        self._wait_idle()
+        self.assertEqual(self.processed.count('PM1'), 1)
+        del self.blocked['PM1']
+        r = process_devices(elems, device_timeout=0.3)
+        self.assertEqual(r, {'PM1': "Processed", 'PM2': "Processed"})
+
+    def test_cancelled(self):
+        self._block('PM1', 'PM2')
+        elems = [_StubElement(n) for n in ('PM1', 'PM2', 'PM3')]
+        t0 = time.time()
+        r = process_devices(elems, device_timeout=0.2, max_workers=1)
+        self.assertTrue(time.time() - t0 < 0.6)
+        self.assertEqual(r, {'PM1': "Timeout", 'PM2': "Cancelled",
+                             'PM3': "Cancelled"})
+        self.assertEqual(list(devices._IN_FLIGHT), ['PM1'])
+        self.blocked['PM1'].set()
+        self._wait_idle()
+        self.assertEqual(self.processed, ['PM1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
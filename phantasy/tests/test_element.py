@@ -8,6 +8,8 @@ Tong Zhang <zhangt@frib.msu.edu>
 """
 
 import json
+import math
+import numpy as np
 import os
 import pytest
 import time
@@ -248,3 +250,63 @@ def test_read_write_policy(mp_from_config2):
 
     assert fld.value == 0.1
     assert list(fld.get('readback', timeout=1.0)['mean']) == [-fld.value, fld.value]
+
+
+def test_apply_scaling():
+    from phantasy.library.lattice.element import _apply_scaling
+    x = np.array([1.0, -2.0, 3.0])
+    assert np.allclose(_apply_scaling(None, x), x)
+    assert np.allclose(_apply_scaling(lambda v: 2 * v + 1, x), [3, -3, 7])
+    # scaling law only supports scalar input
+    y = _apply_scaling(lambda v: v if v > 0 else 0.0, x)
+    assert np.allclose(y, [1, 0, 3])
+    y = _apply_scaling(math.sqrt, x)
+    assert np.isnan(y[1]) and np.allclose(y[[0, 2]], [1, math.sqrt(3)])
+
+
+def test_field_value_cache(mp_from_config3):
+    _, mp = mp_from_config3
+    elem = mp.work_lattice_conf[0]
+    fname = elem.fields[0]
+    fld = elem.get_field(fname)
+    assert fld.cache_info() is None
+    elem.enable_cache(fname, max_age=0.5)
+    assert fld.cache_info() == {'hits': 0, 'misses': 0, 'max_age': 0.5}
+    assert all(pv.auto_monitor for pv in fld.readback_pv)
+    elem.disable_cache()
+    assert fld.cache_info() is None
+    assert not any(pv.auto_monitor for pv in fld.readback_pv)
+
+
+def test_field_set_am_keeps_cache(mp_from_config3):
+    _, mp = mp_from_config3
+    elem = mp.work_lattice_conf[0]
+    fld = elem.get_field(elem.fields[0])
+    fld.enable_cache()
+    cids = fld._cache['cids']
+    fld.set_am()
+    fld.set_am()
+    for pv, cid in zip(fld.readback_pv, cids):
+        assert cid in pv.callbacks
+        assert fld._am_cid_map[pv.pvname] in pv.callbacks
+        assert len(pv.callbacks) == 2
+    fld.disable_cache()
+    for pv in fld.readback_pv:
+        assert list(pv.callbacks) == [fld._am_cid_map[pv.pvname]]
+        assert pv.auto_monitor
+
+
+def test_field_array_mode():
+    from phantasy.library.lattice.element import CaField
+    fld = CaField('X')
+    x = np.arange(4.0)
+    assert fld.array_mode == 'list'
+    assert fld._array_value(x) == [0.0, 1.0, 2.0, 3.0]
+    assert fld._array_value(1.0) == 1.0
+    fld.array_mode = 'copy'
+    y = fld._array_value(x)
+    assert isinstance(y, np.ndarray) and not np.shares_memory(x, y)
+    fld.array_mode = 'view'
+    y = fld._array_value(x)
+    assert np.shares_memory(x, y) and not y.flags.writeable
+    assert x.flags.writeable
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test epics_tools module.
+"""
+
+import threading
+import time
+import unittest
+from unittest import mock
+import numpy as np
+
+from phantasy.library.pv import epics_tools
+from phantasy.library.pv.epics_tools import DataFetcher
+from phantasy.library.pv.epics_tools import ensure_put_many
+from phantasy.library.pv.epics_tools import _RingBuffer
+from phantasy.library.pv.epics_tools import _RunningStats
+
+
+class _FakePV(object):
+    def __init__(self, pvname, value=0.0):
+        self.pvname = pvname
+        self.value = value
+        self.connected = True
+        self._cbs = {}
+
+    def add_callback(self, callback, **kws):
+        idx = len(self._cbs) + 1
+        self._cbs[idx] = callback
+        return idx
+
+    def remove_callback(self, idx):
+        self._cbs.pop(idx, None)
+
+    def emit(self, value):
+        self.value = value
+        for cb in list(self._cbs.values()):
+            cb(pvname=self.pvname, value=value, timestamp=time.time())
+
+
+class _FakeField(object):
+    # setpoint is written to readback after *delay* seconds, if not None,
+    # or raise RuntimeError if *error*
+    def __init__(self, name, value=0.0, delay=0.0, error=False):
+        self.name = 'I'
+        self.ename = name
+        self.readback_pv = [_FakePV(name + ':I_RD', value)]
+        self._delay = delay
+        self._error = error
+        self._am = False
+
+    @property
+    def value(self):
+        return self.readback_pv[0].value
+
+    @value.setter
+    def value(self, v):
+        if self._error:
+            raise RuntimeError("put failed")
+        if self._delay is None:
+            return
+        if self._delay == 0:
+            self.readback_pv[0].emit(v)
+        else:
+            threading.Timer(self._delay, self.readback_pv[0].emit,
+                            (v,)).start()
+
+    def get_auto_monitor(self):
+        return self._am
+
+    def set_auto_monitor(self, auto_monitor=True):
+        self._am = auto_monitor
+
+
+class TestEnsurePutMany(unittest.TestCase):
+    def test_reached(self):
+        flds = [_FakeField('Q1'), _FakeField('Q2', delay=0.05),
+                _FakeField('Q3', value=1.0, delay=None)]
+        called = []
+        r = ensure_put_many(flds, [1.0, 2.0, 1.0], timeout=2.0,
+                            callback=lambda i, *args: called.append(i))
+        self.assertEqual([i[0] for i in r], ['PutFinished'] * 3)
+        self.assertTrue(r[1][1] >= 0.05)
+        self.assertEqual(sorted(called), [0, 1, 2])
+        self.assertEqual(called[-1], 1)
+        # callbacks are removed, auto monitor is restored
+        for fld in flds:
+            self.assertEqual(fld.readback_pv[0]._cbs, {})
+            self.assertFalse(fld.get_auto_monitor())
+
+    def test_timeout(self):
+        flds = [_FakeField('Q1'), _FakeField('Q2', delay=None)]
+        t0 = time.time()
+        r = ensure_put_many(flds, [1.0, 2.0], tol=[0.01, 0.1],
+                            timeout=[2.0, 0.1])
+        self.assertEqual([i[0] for i in r], ['PutFinished', 'Timeout'])
+        self.assertTrue(0.1 <= r[1][1] < 1.0)
+        self.assertTrue(time.time() - t0 < 1.0)
+        self.assertEqual(flds[1].readback_pv[0]._cbs, {})
+
+    def test_error(self):
+        flds = [_FakeField('Q1'), _FakeField('Q2', error=True),
+                _FakeField('Q3', delay=None)]
+        flds[0].set_auto_monitor(True)
+        self.assertRaises(RuntimeError, ensure_put_many, flds,
+                          [1.0, 2.0, 3.0], timeout=1.0)
+        # callbacks are removed, auto monitor is restored for all
+        for fld, am in zip(flds, (True, False, False)):
+            self.assertEqual(fld.readback_pv[0]._cbs, {})
+            self.assertEqual(fld.get_auto_monitor(), am)
+        # error in callback
+        flds = [_FakeField('Q1'), _FakeField('Q2', delay=None)]
+
+        def _callback(i, *args):
+            raise ValueError
+
+        self.assertRaises(ValueError, ensure_put_many, flds, [1.0, 2.0],
+                          timeout=1.0, callback=_callback)
+        for fld in flds:
+            self.assertEqual(fld.readback_pv[0]._cbs, {})
+            self.assertFalse(fld.get_auto_monitor())
+
+    def test_waveform(self):
+        flds = [_FakeField('WF1', value=np.zeros(4), delay=None),
+                _FakeField('WF2', value=np.zeros(4)),
+                _FakeField('WF3', value=np.zeros(4), delay=None),
+                _FakeField('S1', value='OFF', delay=None)]
+        goals = [0.0, np.ones(4), np.ones(3), 1.0]
+        r = ensure_put_many(flds, goals, timeout=0.1)
+        self.assertEqual([i[0] for i in r],
+                         ['PutFinished', 'PutFinished', 'Timeout', 'Timeout'])
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_growth(self):
+        buf = _RingBuffer(4)
+        for i in range(10):
+            buf.append(float(i), 100.0 + i)
+        self.assertEqual(len(buf), 10)
+        self.assertEqual(buf.capacity, 16)
+        self.assertEqual(list(buf.values()), list(range(10)))
+        self.assertEqual(list(buf.timestamps()), [100.0 + i for i in range(10)])
+
+    def test_wraparound(self):
+        buf = _RingBuffer(4, grow=False)
+        for i in range(6):
+            buf.append(float(i), float(i))
+        self.assertEqual(len(buf), 4)
+        self.assertEqual(buf.capacity, 4)
+        # oldest to newest
+        self.assertEqual(list(buf.values()), [2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(list(buf.timestamps()), [2.0, 3.0, 4.0, 5.0])
+        for i in range(6, 9):
+            buf.append(float(i), float(i))
+        self.assertEqual(list(buf.values()), [5.0, 6.0, 7.0, 8.0])
+
+    def test_growth_after_wraparound(self):
+        buf = _RingBuffer(4)
+        for i in range(4):
+            buf.append(float(i), float(i))
+        buf.grow = False
+        buf.append(4.0, 4.0)
+        buf.grow = True
+        buf.append(5.0, 5.0)
+        self.assertEqual(buf.capacity, 8)
+        self.assertEqual(list(buf.values()), [1.0, 2.0, 3.0, 4.0, 5.0])
+
+    def test_clear(self):
+        buf = _RingBuffer(2)
+        for i in range(3):
+            buf.append(float(i), float(i))
+        buf.clear()
+        self.assertEqual(len(buf), 0)
+        self.assertEqual(buf.values().size, 0)
+        buf.append(9.0, 9.0)
+        self.assertEqual(list(buf.values()), [9.0])
+
+    def test_nan(self):
+        buf = _RingBuffer(4)
+        buf.append(1.0, 0.0)
+        buf.append(None, 1.0)
+        buf.append(np.nan, 2.0)
+        x = buf.values()
+        self.assertEqual(len(buf), 3)
+        self.assertTrue(np.array_equal(np.isnan(x), [False, True, True]))
+        self.assertTrue(np.allclose(DataFetcher._average([buf]), [1.0]))
+
+    def test_object(self):
+        buf = _RingBuffer(2, dtype=object)
+        buf.append(np.arange(3), 0.0)
+        buf.append(None, 1.0)
+        buf.append(np.arange(2), 2.0)
+        x = buf.values()
+        self.assertEqual(buf.capacity, 4)
+        self.assertEqual(x.dtype, object)
+        self.assertIsNone(x[1])
+        self.assertEqual(list(x[2]), [0, 1])
+
+
+class TestRunningStats(unittest.TestCase):
+    def test_welford(self):
+        x = np.random.default_rng(1).normal(size=50)
+        st = _RunningStats()
+        st.append(None, 0)
+        st.append(np.arange(3), 0)
+        for i, v in enumerate(x):
+            st.append(v, i)
+        n, avg, std, vmin, vmax = st.stats()
+        self.assertEqual(n, 50)
+        self.assertAlmostEqual(avg, x.mean())
+        self.assertAlmostEqual(std, x.std())
+        self.assertEqual(vmin, x.min())
+        self.assertEqual(vmax, x.max())
+
+    def test_empty(self):
+        for st in (_RunningStats(), _RunningStats(5, 3.0)):
+            n, avg = st.stats()[:2]
+            self.assertEqual(n, 0)
+            self.assertTrue(np.isnan(avg))
+
+    def test_abs_z(self):
+        st = _RunningStats(abs_z=3.0)
+        for i, v in enumerate([0.0, 2.0, 1.0, 10.0, 1.0]):
+            st.append(v, i)
+        # 10 is tested against the samples before (mean 1, std 0.82)
+        n, avg, _, _, vmax = st.stats()
+        self.assertEqual(n, 4)
+        self.assertAlmostEqual(avg, 1.0)
+        self.assertEqual(vmax, 2.0)
+
+    def test_abs_z_first_samples(self):
+        st = _RunningStats(abs_z=1.0)
+        st.append(1.0, 0)
+        st.append(5.0, 1)
+        self.assertEqual(st.stats()[0], 2)
+
+    def test_window(self):
+        x = np.arange(20, dtype=float)
+        st = _RunningStats(window=5)
+        for i, v in enumerate(x):
+            st.append(v, i)
+        n, avg, std, vmin, vmax = st.stats()
+        self.assertEqual(n, 5)
+        self.assertAlmostEqual(avg, x[-5:].mean())
+        self.assertAlmostEqual(std, x[-5:].std())
+        self.assertEqual((vmin, vmax), (15.0, 19.0))
+        # drop the outlier in the window
+        st = _RunningStats(window=5, abs_z=1.5)
+        for i, v in enumerate([1.0, 1.1, 0.9, 1.0, 50.0]):
+            st.append(v, i)
+        self.assertEqual(st.stats()[0], 4)
+
+
+class TestDataFetcherStream(unittest.TestCase):
+    def setUp(self):
+        self.pvs = {n: _FakePV(n, float(i))
+                    for i, n in enumerate(('PV:A', 'PV:B'))}
+
+        def _get_pv(pvname, connection_callback=None, **kws):
+            o = self.pvs[pvname]
+            connection_callback(pvname=pvname, conn=True)
+            return o
+
+        with mock.patch.object(epics_tools, 'get_pv', _get_pv):
+            self.fetcher = DataFetcher(list(self.pvs))
+
+    def tearDown(self):
+        # remove the callbacks while the PVs are alive, DataFetcher
+        # keeps weakrefs
+        self.fetcher.clean_up()
+        del self.fetcher
+
+    def test_stream(self):
+        g = self.fetcher.stream(0.01, count=2)
+        r = next(g)
+        self.assertEqual(list(r['#']), [1, 1])
+        self.assertEqual(list(r['mean']), [0.0, 1.0])
+        for v in (2.0, 4.0):
+            self.pvs['PV:A'].emit(v)
+        r = next(g)
+        self.assertEqual(list(r['#']), [3, 1])
+        self.assertEqual(list(r['mean']), [2.0, 1.0])
+        self.assertEqual(list(r['max']), [4.0, 1.0])
+        self.assertRaises(StopIteration, next, g)
+
+    def test_stop(self):
+        g = self.fetcher.stream(0.01)
+        next(g)
+        self.fetcher.stop()
+        self.assertRaises(StopIteration, next, g)
+
+    def test_busy(self):
+        g = self.fetcher.stream(0.01)
+        next(g)
+        # time window fetching is not allowed while streaming
+        self.assertRaises(RuntimeError, self.fetcher, 0.01)
+        self.assertRaises(RuntimeError, next, self.fetcher.stream(0.01))
+        g.close()
+        avg, _ = self.fetcher(0.01)
+        self.assertEqual(list(avg), [0.0, 1.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test IMPACT lattice and model.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+import numpy as np
+
+from phantasy.library.lattice import ImpactRunPool
+from phantasy.library.model import impact as impact_model
+from phantasy.library.model.impact import RESULT_CACHE_FILENAME
+from phantasy.library.model.impact import Result
+from phantasy.library.model.impact import read_columns
+from phantasy.library.model.impact import read_modelmap
+from phantasy.library.parser import Configuration
+
+
+class TestRunPool(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.tmpdir, 'data')
+        os.makedirs(self.data_dir)
+        for f in ('rfdata1', 'fort.1'):
+            with open(os.path.join(self.data_dir, f), 'w') as fp:
+                fp.write(f)
+        self.config = Configuration()
+        self.config.set('DEFAULT', 'impact_data_dir', self.data_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _nworkers(self, **kws):
+        with mock.patch('os.cpu_count', return_value=8):
+            with ImpactRunPool(config=self.config, **kws) as pool:
+                return pool.nworkers
+
+    def test_default_nworkers(self):
+        self.assertEqual(self._nworkers(), 8)
+        self.assertEqual(self._nworkers(nprocessors=2), 4)
+        self.assertEqual(self._nworkers(nprocessors=3), 2)
+        self.assertEqual(self._nworkers(nprocessors=16), 1)
+        self.config.set('DEFAULT', 'impact_nprocessors', '4')
+        self.assertEqual(self._nworkers(), 2)
+        self.assertEqual(self._nworkers(nprocessors=1), 8)
+
+    def test_nworkers(self):
+        self.assertEqual(self._nworkers(nworkers=3), 3)
+        self.assertEqual(self._nworkers(nworkers=3, nprocessors=8), 3)
+        self.assertEqual(self._nworkers(nworkers=0), 1)
+
+    def test_work_dirs(self):
+        work_dir = os.path.join(self.tmpdir, 'work')
+        with ImpactRunPool(config=self.config, work_dir=work_dir,
+                           nworkers=2) as pool:
+            self.assertEqual(sorted(os.listdir(work_dir)),
+                             ['run_0', 'run_1'])
+            for d in ('run_0', 'run_1'):
+                path = os.path.join(work_dir, d, 'rfdata1')
+                self.assertTrue(os.path.islink(path))
+                self.assertEqual(os.path.realpath(path),
+                                 os.path.realpath(os.path.join(
+                                     self.data_dir, 'rfdata1')))
+            self.assertRaises(TypeError, pool.submit, object())
+        # given work directory is kept
+        self.assertTrue(os.path.isdir(work_dir))
+        with ImpactRunPool(config=self.config, nworkers=1) as pool:
+            work_dir = pool.work_dir
+            self.assertTrue(os.path.isdir(work_dir))
+        self.assertFalse(os.path.exists(work_dir))
+
+    def test_invalid_data_dir(self):
+        self.assertRaises(RuntimeError, ImpactRunPool, config=Configuration())
+        self.assertRaises(RuntimeError, ImpactRunPool, config=self.config,
+                          data_dir=os.path.join(self.tmpdir, 'none'))
+
+
+class TestResult(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        rng = np.random.default_rng(2021)
+        self.n = 5
+        self.fort = {18: rng.normal(size=(self.n, 5))}
+        self.fort[18][:, 0] = np.arange(self.n) * 0.5
+        for i in (24, 25, 26):
+            self.fort[i] = rng.normal(size=(self.n, 8))
+        for i, data in self.fort.items():
+            np.savetxt(os.path.join(self.tmpdir, 'fort.{}'.format(i)), data)
+        self.names = ['NONE', 'Q1', 'Q1', 'BPM1', 'Q1']
+        self.orders = [0, 1, 2, 1, 3]
+        with open(os.path.join(self.tmpdir, 'model.map'), 'w') as fp:
+            for name, order in zip(self.names, self.orders):
+                fp.write('{} {}\n\n'.format(name, order))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _result(self, **kws):
+        r = Result('FRIB', self.tmpdir)
+        r.updateResult(**kws)
+        return r
+
+    def test_read_columns(self):
+        path = os.path.join(self.tmpdir, 'fort.24')
+        usecols = (1, 3, 2, 4, 7, 5, 6)
+        a = read_columns(path, usecols)
+        self.assertTrue(a.flags['C_CONTIGUOUS'])
+        self.assertTrue(np.allclose(a, np.loadtxt(path, usecols=usecols)))
+        with open(path) as fp:
+            self.assertTrue(np.allclose(read_columns(fp, usecols), a))
+        a = read_columns(io.StringIO('1 2 3\n'), (2, 0))
+        self.assertEqual(a.tolist(), [[3.0, 1.0]])
+
+    def test_read_modelmap(self):
+        path = os.path.join(self.tmpdir, 'model.map')
+        self.assertEqual(read_modelmap(path), (self.names, self.orders))
+        with open(path) as fp:
+            self.assertEqual(read_modelmap(fp), (self.names, self.orders))
+
+    def test_result(self):
+        r = self._result()
+        f18, f24 = self.fort[18], self.fort[24]
+        self.assertEqual(r.totalelements, self.n)
+        self.assertTrue(np.allclose(r.getSPosition(), f18[:, 0]))
+        self.assertTrue(np.allclose(r.getEnergy(), f18[:, 3]))
+        self.assertTrue(np.allclose(r.getGamma(), f18[:, 2]))
+        self.assertTrue(np.allclose(r.getOrbit('X'), f24[:, 1]))
+        self.assertTrue(np.allclose(r.getTwissBeta('X'), f24[:, 6]))
+
+    def test_select(self):
+        r = self._result()
+        z = self.fort[18][:, 0]
+        # the last data index of name, or (name, order) in a list
+        self.assertEqual(r.getElemIndex('Q1'), 4)
+        self.assertEqual(r.getElemIndex([('Q1', 2)]), [2])
+        self.assertEqual(r.getSPosition('Q1'), z[4])
+        self.assertEqual(r.getSPosition([('Q1', 1)]).tolist(), [z[1]])
+        self.assertEqual(r.getSPosition(3), z[3])
+        # list of elements, ordered by data index
+        self.assertTrue(np.allclose(
+            r.getSPosition(['Q1', 'BPM1', ('Q1', 1)]), z[[1, 3, 4]]))
+        self.assertTrue(np.allclose(r.getSPosition([3, 3, 0]), z[[0, 3]]))
+        x, y = r.getOrbit('XY', ['BPM1'])
+        self.assertTrue(np.allclose(x, self.fort[24][[3], 1]))
+        self.assertTrue(np.allclose(y, self.fort[25][[3], 1]))
+        self.assertRaises(KeyError, r.getSPosition, 'NONE')
+        self.assertRaises(RuntimeError, r.getSPosition, [self.n + 1])
+
+    def test_cache(self):
+        cachepath = os.path.join(self.tmpdir, RESULT_CACHE_FILENAME)
+        self._result()
+        self.assertFalse(os.path.exists(cachepath))
+        r0 = self._result(cache=True)
+        self.assertTrue(os.path.isfile(cachepath))
+        # loaded from cache without parsing
+        with mock.patch.object(impact_model, 'read_columns',
+                               side_effect=RuntimeError), \
+                mock.patch.object(impact_model, 'read_modelmap',
+                                  side_effect=RuntimeError):
+            r1 = self._result(cache=True)
+        for m in ('getSPosition', 'getEnergy', 'getOrbit', 'getEmittance'):
+            self.assertTrue(np.array_equal(getattr(r0, m)(),
+                                           getattr(r1, m)()))
+        self.assertEqual(r1.getElemIndex([('Q1', 2)]), [2])
+        self.assertEqual(r1.getSPosition(['BPM1']).tolist(),
+                         r0.getSPosition(['BPM1']).tolist())
+        # outdated cache is not used
+        t = time.time() + 10
+        os.utime(os.path.join(self.tmpdir, 'fort.18'), (t, t))
+        with mock.patch.object(impact_model, 'read_columns',
+                               wraps=read_columns) as f:
+            self._result(cache=True)
+            self.assertEqual(f.call_count, 4)
+
+    def test_not_keep(self):
+        r = self._result(keep=False, cache=True)
+        self.assertEqual(r.totalelements, self.n)
+        self.assertFalse(os.path.exists(self.tmpdir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,7 @@ Tong Zhang <zhangt@frib.msu.edu>
 
 import unittest
 import os
+import numpy as np
 
 from phantasy import MachinePortal
 from phantasy import Settings
@@ -46,6 +47,56 @@ class TestLattice(unittest.TestCase):
         names = lat.get_all_names()
         self.assertEqual(names, [e.name for e in lat._elements])
 
+    def test_get_elements_index(self):
+        lat = self.mp.work_lattice_conf
+        all_elems = [e for e in lat if not e.virtual]
+        bpms = sorted([e for e in all_elems if e.family == 'BPM'],
+                      key=lambda e: e.sb)
+        self.assertEqual(lat.get_elements(type='BPM'), bpms)
+        self.assertEqual(
+            lat.get_elements(name='LS1_CA01:*', type='BPM'),
+            [e for e in bpms if e.name.startswith('LS1_CA01:')])
+        self.assertEqual(
+            lat.get_elements(srange=(10, 11)),
+            sorted([e for e in all_elems if 10 < e.sb <= 11],
+                   key=lambda e: e.sb))
+
+        elem = bpms[1]
+        srange = (elem.sb - 0.01, elem.sb + 0.01)
+        lat.remove(elem.name)
+        self.assertEqual(lat.get_elements(name=elem.name), [])
+        self.assertNotIn(elem, lat.get_elements(srange=srange))
+        lat.insert(elem)
+        self.assertEqual(lat.get_elements(name=elem.name), [elem])
+        self.assertIn(elem, lat.get_elements(srange=srange))
+
+    def test_read_fields(self):
+        lat = self.mp.work_lattice_conf
+        bpms = lat.get_elements(type='BPM')[:3]
+        value, valid = lat.read_fields(bpms, ['X', 'NOEXISTS'], timeout=0.1)
+        self.assertEqual(value.shape, (3, 2))
+        self.assertEqual(valid.shape, (3, 2))
+        self.assertFalse(valid[:, 1].any())
+        self.assertTrue(np.isnan(value[~valid]).all())
+        value, valid = lat.read_fields([e.name for e in bpms], 'X',
+                                       timeout=0.1)
+        self.assertEqual(value.shape, (3,))
+
+    def test_set_many_model(self):
+        lat = self.mp.work_lattice_conf
+        lat.trace = 'on'
+        cors = lat.get_elements(type='HCOR')[:3]
+        v0 = [lat.settings[c.name]['ANG'] for c in cors]
+        v1 = [0.001 * (k + 1) for k in range(len(cors))]
+        lat.set_many({(c.name, 'ANG'): v for c, v in zip(cors, v1)},
+                     source='model')
+        self.assertEqual([lat.settings[c.name]['ANG'] for c in cors], v1)
+        history = lat.trace_history(rtype='raw', type='model')
+        self.assertEqual(len(history), 3)
+        self.assertEqual(len({e['group'] for e in history}), 1)
+        lat.roll_back(type='model')
+        self.assertEqual([lat.settings[c.name]['ANG'] for c in cors], v0)
+
     def test_attributes(self):
         lat = self.mp.work_lattice_conf
         self.assertEqual(lat.mname, TEST_MACH)
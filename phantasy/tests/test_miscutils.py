@@ -66,7 +66,25 @@ class TestMiscUtils(unittest.TestCase):
         
         a, b, c = [1,2], [3,4], [2,3]
         self.assertEqual(miscutils.get_intersection(a, b, c), [])
-  
+
+    def test_pattern_filter(self):
+        a = ['BPM', 'BEND', 'VCOR', 'PM', 'HCOR']
+        self.assertEqual(miscutils.pattern_filter(a, 'BP*'), ['BPM'])
+        self.assertEqual(miscutils.pattern_filter(a, '*PM*'), ['BPM', 'PM'])
+        self.assertEqual(miscutils.pattern_filter(a, '?COR'), ['VCOR', 'HCOR'])
+        self.assertEqual(miscutils.pattern_filter(a, ['*COR', 'B*']),
+                         ['BPM', 'BEND', 'VCOR', 'HCOR'])
+        self.assertEqual(miscutils.pattern_filter(a, '[!B]*'),
+                         ['VCOR', 'PM', 'HCOR'])
+        self.assertEqual(miscutils.pattern_filter(a, 'BP'), [])
+
+    def test_compile_pattern(self):
+        r1 = miscutils.compile_pattern(['LS1_*', 'FS1_*'])
+        r2 = miscutils.compile_pattern(('LS1_*', 'FS1_*'))
+        self.assertIs(r1, r2)
+        self.assertTrue(r1.match('FS1_BMS:BPM_D2664'))
+        self.assertFalse(r1.match('LS2_BMS:BPM_D2664'))
+
 def t_1():
     l0 = [1,2,3]
     l1 = miscutils.flatten(l0)
@@ -0,0 +1,463 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test orbit response matrix.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+
+from phantasy.library.lattice import Lattice
+from phantasy.library.lattice import element
+from phantasy.library.physics import get_excitation_pattern
+from phantasy.library.physics import solve_regularized
+from phantasy.library.physics import fit_slopes
+from phantasy.library.physics import get_transfer_matrices
+from phantasy.library.physics import get_orm_from_model
+from phantasy.library.physics import OrbitResponse
+from phantasy.library.physics import orm as orm_module
+from phantasy.library.physics import wait_settle
+
+
+class TestORMFitting(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(2021)
+
+    def test_orthogonal_pattern(self):
+        for n, nbump in ((7, 3), (10, 4), (5, None), (1, 3)):
+            p = get_excitation_pattern(n, nbump=nbump)
+            k = n if nbump is None else nbump
+            self.assertEqual(p.shape[1], n)
+            self.assertTrue(np.all(np.isin(p, (-1, 0, 1))))
+            self.assertTrue(np.all(np.count_nonzero(p, axis=1) <= k))
+            # columns are orthogonal
+            g = np.dot(p.T, p)
+            self.assertTrue(np.allclose(g, np.diag(np.diag(g))))
+            self.assertTrue(np.all(np.diag(g) > 0))
+
+    def test_random_pattern(self):
+        p = get_excitation_pattern(8, pattern='random', nbump=2, nstep=30,
+                                   seed=1)
+        self.assertEqual(p.shape, (30, 8))
+        self.assertTrue(np.all(np.count_nonzero(p, axis=1) == 2))
+        self.assertTrue(np.array_equal(
+            p, get_excitation_pattern(8, pattern='random', nbump=2,
+                                      nstep=30, seed=1)))
+        self.assertRaises(ValueError, get_excitation_pattern, 8, 'invalid')
+
+    def test_orm_recovery(self):
+        m, n = 20, 7
+        orm = self.rng.normal(size=(m, n))
+        for p in (get_excitation_pattern(n),
+                  get_excitation_pattern(n, nbump=None),
+                  get_excitation_pattern(n, 'random', nbump=4, nstep=20,
+                                         seed=2)):
+            delta = p * 0.0015
+            orbit = np.dot(delta, orm.T)
+            r = solve_regularized(delta, orbit).T
+            self.assertTrue(np.allclose(r, orm))
+            # small regularization, small bias
+            r = solve_regularized(delta, orbit, 1e-6).T
+            self.assertTrue(np.allclose(r, orm, atol=1e-6))
+            # with noise
+            noisy = orbit + self.rng.normal(scale=1e-8, size=orbit.shape)
+            r = solve_regularized(delta, noisy, 1e-6).T
+            self.assertTrue(np.allclose(r, orm, atol=1e-4))
+
+    def test_solve_regularized_1d(self):
+        a = self.rng.normal(size=(6, 3))
+        x = self.rng.normal(size=3)
+        self.assertTrue(np.allclose(solve_regularized(a, np.dot(a, x)), x))
+
+    def test_fit_slopes(self):
+        x = np.linspace(-0.003, 0.003, 5)
+        y = self.rng.normal(size=(5, 12)) + np.outer(x, np.arange(12))
+        self.assertTrue(np.allclose(
+            fit_slopes(x, y),
+            [np.polyfit(x, y[:, k], 1)[0] for k in range(12)]))
+        self.assertTrue(np.allclose(fit_slopes(list(x), y.tolist()),
+                                    fit_slopes(x, y)))
+
+
+class _StubState(object):
+    def __init__(self, transmat, ionq):
+        self.transmat = transmat
+        self.IonQ = ionq
+
+
+class _StubMachine(object):
+    # element-wise transfer matrices of shape (7, 7, ncharge), and NCharge
+    # of each element, orbit correctors kick after the element
+    def __init__(self, transmat, ionq):
+        self.transmat = transmat
+        self.ionq = ionq
+        self.names = ['E{}'.format(i) for i in range(len(transmat))]
+
+    def __len__(self):
+        return len(self.transmat)
+
+    def allocState(self, conf):
+        return None
+
+    def propagate(self, s, start, max, observe=None):
+        return [(i, _StubState(self.transmat[i], self.ionq[i]))
+                for i in observe]
+
+    def find(self, name):
+        return [i for i, n in enumerate(self.names) if n == name]
+
+    def orbit(self, kicks):
+        # centroid (x, y) of all elements, kicks: {(index, col): angle}
+        x, q0, ret = np.zeros((7, 1)), None, []
+        x[6] = 1.0
+        for i, (t, q) in enumerate(zip(self.transmat, self.ionq)):
+            q = np.asarray(q, dtype=float) / np.sum(q)
+            if q0 is not None and (len(q) != len(q0) or np.any(q != q0)):
+                x = np.tile(np.dot(x, q0)[:, np.newaxis], (1, len(q)))
+            x = np.einsum('abk,bk->ak', t, x)
+            for (j, col), v in kicks.items():
+                if j == i:
+                    x[col] += v
+            ret.append(np.dot(x, q)[[0, 2]])
+            q0 = q
+        return np.array(ret)
+
+
+class _StubElement(object):
+    def __init__(self, name, family):
+        self.name = name
+        self.family = family
+
+
+def _stub_matrices(rng, n, ncharge):
+    # random transfer matrices, last row and column for the kicks
+    t = np.zeros((n, 7, 7, ncharge))
+    t[:, :6, :6] = rng.normal(scale=0.5, size=(n, 6, 6, ncharge)) + \
+        np.eye(6)[:, :, np.newaxis]
+    t[:, 6, 6] = 1.0
+    return t
+
+
+class TestTransferMatrices(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(2021)
+
+    def test_multi_charge(self):
+        n, ncharge = 5, 3
+        m = _stub_matrices(self.rng, n, ncharge)
+        q = [1.0, 2.0, 5.0]
+        tm, w = get_transfer_matrices(_StubMachine(m, [q] * n))
+        self.assertEqual(tm.shape, (n, ncharge, 7, 7))
+        self.assertTrue(np.allclose(w, np.divide(q, 8.0)))
+        for i in range(n):
+            for k in range(ncharge):
+                pk = np.eye(7)
+                for j in range(i + 1):
+                    pk = np.dot(m[j, :, :, k], pk)
+                self.assertTrue(np.allclose(tm[i, k], pk))
+
+    def test_single_charge(self):
+        m = _stub_matrices(self.rng, 4, 1)
+        tm, w = get_transfer_matrices(_StubMachine(m, [[10.0]] * 4))
+        self.assertTrue(np.allclose(
+            tm[-1, 0], np.linalg.multi_dot(m[:, :, :, 0][::-1])))
+        self.assertTrue(np.all(w == 1.0))
+
+    def test_charge_change(self):
+        # 2 to 5 charge states at the stripper, index 3
+        m = [t for t in _stub_matrices(self.rng, 3, 2)] + \
+            [t for t in _stub_matrices(self.rng, 4, 5)]
+        q = [[1.0, 3.0]] * 3 + [[1.0, 2.0, 3.0, 2.0, 1.0]] * 4
+        tm, w = get_transfer_matrices(_StubMachine(m, q))
+        self.assertEqual(tm.shape, (7, 5, 7, 7))
+        self.assertTrue(np.allclose(w[2], [0.25, 0.75, 0, 0, 0]))
+        self.assertTrue(np.allclose(tm[2, 2:], np.eye(7)))
+        # new charge states from the centroid
+        p = np.einsum('k,kab->ab', w[2, :2], tm[2, :2])
+        for k in range(5):
+            self.assertTrue(np.allclose(tm[3, k], np.dot(m[3][:, :, k], p)))
+
+
+class TestORMFromModel(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2021)
+        # 2 charge states, 5 after stripper at 6, 3 after stripper at 11
+        m = [t for t in _stub_matrices(rng, 6, 2)] + \
+            [t for t in _stub_matrices(rng, 5, 5)] + \
+            [t for t in _stub_matrices(rng, 5, 3)]
+        q = [[1.0, 3.0]] * 6 + [[1.0, 2.0, 3.0, 2.0, 1.0]] * 5 + \
+            [[2.0, 1.0, 1.0]] * 5
+        self.machine = _StubMachine(m, q)
+        self.cors = [_StubElement('E{}'.format(i), f)
+                     for i in (1, 4, 7, 12) for f in ('HCOR', 'VCOR')]
+        self.bpms = [_StubElement('E{}'.format(i), 'BPM')
+                     for i in (0, 2, 5, 6, 8, 10, 11, 13, 15)]
+
+    def _finite_difference(self, xoy, d=1.0e-3):
+        idx = [int(e.name[1:]) for e in self.bpms]
+        rows = {'x': 0, 'y': 1}
+        orbit0 = self.machine.orbit({})
+        r = np.zeros([len(idx) * len(xoy), len(self.cors)])
+        for j, cor in enumerate(self.cors):
+            col = 3 if cor.family == 'VCOR' else 1
+            orbit = self.machine.orbit({(int(cor.name[1:]), col): d})
+            r[:, j] = np.concatenate([
+                (orbit - orbit0)[idx, rows[p]] for p in xoy]) / d * 1.0e-3
+        return r
+
+    def test_orm(self):
+        for xoy in ('xy', 'x', 'y'):
+            r = get_orm_from_model(self.cors, self.bpms, None, xoy=xoy,
+                                   machine=self.machine)
+            self.assertEqual(r.shape, (len(self.bpms) * len(xoy),
+                                       len(self.cors)))
+            self.assertTrue(np.allclose(r, self._finite_difference(xoy)))
+
+    def test_not_found(self):
+        self.assertRaises(RuntimeError, get_orm_from_model,
+                          [_StubElement('NONE', 'HCOR')], self.bpms, None,
+                          machine=self.machine)
+
+
+class _StubDevice(object):
+    # readings of field are func(field, t), t is the time since set
+    def __init__(self, name, sb, func, tolerance=0.01):
+        self.name = name
+        self.sb = sb
+        self.func = func
+        self.tolerance = tolerance
+
+    def get_field(self, field):
+        return self
+
+
+class _Clock(object):
+    # replaces time module, sleep advances the time
+    def __init__(self):
+        self.t = 0.0
+
+    def time(self):
+        return self.t
+
+    def sleep(self, dt):
+        self.t += dt
+
+
+class TestWaitSettle(unittest.TestCase):
+    def setUp(self):
+        self.read = []
+        self.clock = _Clock()
+
+        def _read_fields(elements, fields, **kws):
+            t = self.clock.time() - self.t0
+            self.read.append([e.name for e in elements])
+            if isinstance(fields, str):
+                v = np.array([e.func(fields, t) for e in elements])
+            else:
+                v = np.array([[e.func(f, t) for f in fields]
+                              for e in elements])
+            return v, ~np.isnan(v)
+
+        for patcher in (
+                mock.patch.object(element, 'read_fields', _read_fields),
+                mock.patch.object(orm_module, 'time', self.clock)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.kws = {'wait': 2.0, 'settle_dt': 0.01, 'settle_window': 0.1}
+
+    def _ramp(self, goal, duration):
+        # from 0 to goal in duration
+        return lambda f, t: goal * min(1.0, t / duration)
+
+    def _wait_settle(self, *args, **kws):
+        self.t0 = self.clock.time()
+        return wait_settle(*args, **dict(self.kws, **kws))
+
+    def test_reached(self):
+        # 0.05 of the step size is tighter than the field tolerance
+        cor = _StubDevice('COR1', 1.0, self._ramp(1.0, 0.4), tolerance=0.5)
+        t = self._wait_settle(cor, 'ANG', 1.0)
+        self.assertAlmostEqual(t, 0.38, delta=0.011)
+        settle_times = []
+        t = self._wait_settle(cor, 'ANG', 1.0, settle_rtol=0.5,
+                              settle_times=settle_times)
+        self.assertAlmostEqual(t, 0.2, delta=0.011)
+        self.assertEqual(settle_times, [('COR1', t)])
+        # step size from origins
+        t = self._wait_settle(cor, 'ANG', 1.0, origins=-1.0, settle_rtol=0.25)
+        self.assertAlmostEqual(t, 0.2, delta=0.011)
+        # tol overrides
+        t = self._wait_settle(cor, 'ANG', 1.0, tol=0.75)
+        self.assertAlmostEqual(t, 0.1, delta=0.011)
+
+    def test_timeout(self):
+        cors = [_StubDevice('COR1', 1.0, lambda f, t: 1.0),
+                _StubDevice('COR2', 2.0, lambda f, t: 0.0)]
+        settle_times = []
+        t = self._wait_settle(cors, 'ANG', [1.0, 1.0], wait=0.3,
+                              settle_times=settle_times)
+        self.assertEqual(t, 0.3)
+        self.assertAlmostEqual(self.clock.time() - self.t0, 0.3)
+        self.assertEqual(settle_times, [('COR1,COR2', 0.3)])
+
+    def test_no_settle(self):
+        cor = _StubDevice('COR1', 1.0, lambda f, t: 0.0)
+        settle_times = []
+        t = self._wait_settle(cor, 'ANG', 1.0, wait=0.2, settle=False,
+                              settle_times=settle_times)
+        self.assertEqual(t, 0.2)
+        self.assertAlmostEqual(self.clock.time() - self.t0, 0.2)
+        self.assertEqual(self.read, [])
+        self.assertEqual(settle_times, [('COR1', 0.2)])
+
+    def _bpm(self, name, sb, t_settle, amp=1.0):
+        # step at 0.05 sec, then oscillate until t_settle
+        def _func(f, t):
+            if t < 0.05:
+                return 0.0
+            v = 0.5 if f == 'X' else -0.5
+            if t < t_settle:
+                v += amp * np.sin(t * 100.0)
+            return v
+        return _StubDevice(name, sb, _func)
+
+    def test_flat_window(self):
+        cor = _StubDevice('COR1', 1.0, lambda f, t: 1.0)
+        bpms = [self._bpm('BPM1', 2.0, 0.05), self._bpm('BPM2', 3.0, 0.4)]
+        t = self._wait_settle(cor, 'ANG', 1.0, bpms)
+        # flat over 0.1 sec since 0.4 sec
+        self.assertAlmostEqual(t, 0.5, delta=0.011)
+        t = self._wait_settle(cor, 'ANG', 1.0, bpms, settle_window=0.3)
+        self.assertAlmostEqual(t, 0.7, delta=0.011)
+        # variation within tolerance
+        t = self._wait_settle(cor, 'ANG', 1.0, bpms, settle_bpm_tol=2.5)
+        self.assertAlmostEqual(t, 0.1, delta=0.011)
+
+    def test_downstream(self):
+        cor = _StubDevice('COR1', 1.0, lambda f, t: 1.0)
+        # upstream BPM never settles, not watched
+        bpms = [self._bpm('BPM0', 0.5, 100.0), self._bpm('BPM1', 2.0, 0.2),
+                _StubDevice('BPM2', None, lambda f, t: 0.1 * t)]
+        t = self._wait_settle(cor, 'ANG', 1.0, bpms, settle_bpm_tol=0.1)
+        self.assertAlmostEqual(t, 0.3, delta=0.011)
+        self.assertNotIn('BPM0', sum(self.read, []))
+        self.assertIn('BPM1', sum(self.read, []))
+
+    def test_not_updated(self):
+        # readings not changed since the first reading
+        cor = _StubDevice('COR1', 1.0, lambda f, t: 1.0)
+        bpms = [_StubDevice('BPM1', 2.0, lambda f, t: 0.5)]
+        t = self._wait_settle(cor, 'ANG', 1.0, bpms, wait=0.3)
+        self.assertEqual(t, 0.3)
+        t = self._wait_settle(cor, 'ANG', 1.0, [], wait=0.3)
+        self.assertEqual(t, 0.0)
+
+
+class TestOrbitResponse(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2021)
+        self.cors = ['COR{}'.format(i) for i in range(5)]
+        self.bpms = ['BPM{}'.format(i) for i in range(8)]
+        self.m = rng.normal(size=(16, 5))
+        self.orm = OrbitResponse(self.m, self.cors, self.bpms,
+                                 timestamp=1600000000.0)
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_invalid_shape(self):
+        self.assertRaises(ValueError, OrbitResponse, self.m, self.cors[:4],
+                          self.bpms)
+        self.assertRaises(ValueError, OrbitResponse, self.m, self.cors,
+                          self.bpms, 'x')
+
+    def test_read_only(self):
+        m = self.m.copy()
+        orm = OrbitResponse(m)
+        m[0, 0] = 100.0
+        self.assertTrue(np.array_equal(orm.matrix, self.m))
+        with self.assertRaises(ValueError):
+            orm.matrix[0, 0] = 100.0
+        with self.assertRaises(ValueError):
+            orm.pinv()[0, 0] = 100.0
+        with self.assertRaises(ValueError):
+            orm.svd()[1][0] = 100.0
+        with self.assertRaises(ValueError):
+            self.orm.select(['COR1'], ['BPM1']).matrix[0, 0] = 100.0
+        self.assertTrue(np.allclose(orm.pinv(), np.linalg.pinv(self.m)))
+
+    def test_lattice_orm(self):
+        lat = Lattice('test')
+        lat.orm = self.m
+        with self.assertRaises(ValueError):
+            lat.orm[0, 0] = 100.0
+        m_inv = lat.orbit_response.pinv()
+        # set a new one to change
+        m = self.m.copy()
+        m[0, 0] = 100.0
+        lat.orm = m
+        self.assertTrue(np.array_equal(lat.orm, m))
+        self.assertFalse(np.allclose(lat.orbit_response.pinv(), m_inv))
+        self.assertTrue(np.allclose(lat.orbit_response.pinv(),
+                                    np.linalg.pinv(m)))
+
+    def test_select(self):
+        self.assertIs(self.orm.select(self.cors, self.bpms), self.orm)
+        sub = self.orm.select(['COR3', 'COR1'], ['BPM2', 'BPM5'], 'y')
+        self.assertEqual(sub.shape, (2, 2))
+        self.assertTrue(np.array_equal(
+            sub.matrix, self.m[np.ix_([8 + 2, 8 + 5], [3, 1])]))
+        self.assertEqual(sub.correctors, ['COR3', 'COR1'])
+        sub = self.orm.select(['COR0'], ['BPM1', 'BPM0'])
+        self.assertTrue(np.array_equal(
+            sub.matrix, self.m[np.ix_([1, 0, 9, 8], [0])]))
+        self.assertIs(sub, self.orm.select(['COR0'], ['BPM1', 'BPM0']))
+        self.assertTrue(self.orm.contains(['COR4'], ['BPM7'], 'x'))
+        self.assertFalse(self.orm.contains(['COR5'], ['BPM7']))
+
+    def test_pinv(self):
+        self.assertTrue(np.allclose(self.orm.pinv(), np.linalg.pinv(self.m)))
+        self.assertIs(self.orm.pinv(), self.orm.pinv())
+        # truncated
+        U, s, Vt = np.linalg.svd(self.m, full_matrices=False)
+        self.assertTrue(np.allclose(
+            self.orm.pinv(nsv=3), np.dot(Vt[:3].T / s[:3], U[:, :3].T)))
+        # regularized
+        lam = (0.1 * s[0]) ** 2
+        self.assertTrue(np.allclose(
+            self.orm.pinv(alpha=0.1),
+            np.linalg.solve(np.dot(self.m.T, self.m) + lam * np.eye(5),
+                            self.m.T)))
+
+    def _check_loaded(self, orm):
+        self.assertTrue(np.array_equal(orm.matrix, self.m))
+        self.assertEqual(orm.correctors, self.cors)
+        self.assertEqual(orm.monitors, self.bpms)
+        self.assertEqual(orm.xoy, 'xy')
+        self.assertEqual(orm.timestamp, 1600000000.0)
+
+    def test_save_load_npz(self):
+        for name in ('orm.npz', 'orm', 'orm.dat'):
+            filepath = os.path.join(self.tmpdir, name)
+            saved = self.orm.save(filepath)
+            self.assertTrue(saved.endswith('.npz'))
+            self.assertTrue(os.path.isfile(saved))
+            self._check_loaded(OrbitResponse.load(filepath))
+            self._check_loaded(OrbitResponse.load(saved))
+
+    def test_save_load_no_names(self):
+        filepath = OrbitResponse(self.m).save(
+            os.path.join(self.tmpdir, 'orm.npz'))
+        orm = OrbitResponse.load(filepath)
+        self.assertIsNone(orm.correctors)
+        self.assertIsNone(orm.monitors)
+        self.assertTrue(np.array_equal(orm.matrix, self.m))
+
+
+if __name__ == '__main__':
+    unittest.main()
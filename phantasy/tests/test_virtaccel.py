@@ -0,0 +1,535 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test virtual accelerator.
+"""
+
+import io
+import math
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+
+try:
+    from flame import Machine
+except ImportError:
+    Machine = None
+
+try:
+    from phantasy.facility.frib.virtaccel import common as va_common
+except ImportError:
+    va_common = None
+
+curdir = os.path.abspath(os.path.dirname(__file__))
+LATFILE = os.path.join(curdir, 'lattice', 'out2_0.lat')
+
+
+def _bpm_plan(conf):
+    """Return the output plan of all the BPMs of FLAME lattice *conf*."""
+    from phantasy.facility.frib.virtaccel import flame as va_flame
+    from phantasy.library.layout import BPMElement
+    names = [e['name'] for e in conf['elements']]
+    elemmap, readfieldmap = {}, {}
+    for e in conf['elements']:
+        if e['type'] == 'bpm':
+            elemmap[e['name']] = BPMElement(0.0, 0.0, 0.0, e['name'])
+            readfieldmap[e['name']] = {
+                f: e['name'] + ':' + f
+                for f in ('XPOS', 'YPOS', 'PHASE', 'ENERGY')}
+    return va_flame._OutputPlan(names, elemmap, readfieldmap)
+
+
+@unittest.skipIf(va_common is None, "VA dependencies are not installed")
+class TestEpicsDB(unittest.TestCase):
+    def setUp(self):
+        self.epicsdb = [
+            ('ao', 'VA:Q1:I_CSET', {'DRVL': -10.0, 'DRVH': 10.0,
+                                    'PREC': 5, 'VAL': 1.5}),
+            ('ai', 'VA:Q1:I_RD', {'PREC': 5, 'DESC': 'quad', 'EGU': None}),
+        ]
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _epicsdb(self, rname='VA:Q1:I_CSET', **fields):
+        db = [(t, n, dict(f)) for t, n, f in self.epicsdb]
+        db[0] = (db[0][0], rname, dict(db[0][2], **fields))
+        return db
+
+    def test_iter_epicsdb(self):
+        lines = list(va_common.iter_epicsdb(self.epicsdb))
+        self.assertEqual(lines, [
+            'record(ao, "VA:Q1:I_CSET") {\r\n',
+            '    field("DRVL", -10.0)\r\n',
+            '    field("DRVH", 10.0)\r\n',
+            '    field("PREC", 5)\r\n',
+            '    field("VAL", 1.5)\r\n',
+            '}\r\n\r\n',
+            'record(ai, "VA:Q1:I_RD") {\r\n',
+            '    field("PREC", 5)\r\n',
+            '    field("DESC", "quad")\r\n',
+            '}\r\n\r\n'])
+        buf = io.StringIO()
+        va_common.write_epicsdb(self.epicsdb, buf)
+        self.assertEqual(buf.getvalue(), ''.join(lines))
+
+    def test_epicsdb_key(self):
+        key = va_common.epicsdb_key(self.epicsdb, 'a')
+        self.assertEqual(key, va_common.epicsdb_key(self._epicsdb(), 'a'))
+        # initial values are not counted
+        self.assertEqual(key, va_common.epicsdb_key(self._epicsdb(VAL=2.0),
+                                                    'a'))
+        self.assertEqual(key, va_common.epicsdb_key(self._epicsdb(EGU=None),
+                                                    'a'))
+        # schema, record names and extra arguments are counted
+        for db, args in ((self._epicsdb(DRVH=20.0), ('a',)),
+                         (self._epicsdb(EGU='A'), ('a',)),
+                         (self._epicsdb('TEST:Q1:I_CSET'), ('a',)),
+                         (self.epicsdb, ('b',)),
+                         (self.epicsdb, ())):
+            self.assertNotEqual(key, va_common.epicsdb_key(db, *args))
+
+    def test_prepare_cached_work_dir(self):
+        cache_dir = os.path.join(self.tmpdir, 'cache')
+        work_dir, reuse = va_common.prepare_cached_work_dir(
+            cache_dir, 'va_test', self.epicsdb, 'a')
+        self.assertFalse(reuse)
+        self.assertEqual(os.path.dirname(work_dir), cache_dir)
+        self.assertTrue(os.path.basename(work_dir).startswith('va_test_'))
+        self.assertEqual(os.listdir(work_dir), [va_common.EPICSDB_FILENAME])
+        with open(os.path.join(work_dir, va_common.EPICSDB_FILENAME)) as fp:
+            self.assertEqual(fp.read(), ''.join(
+                va_common.iter_epicsdb(self.epicsdb)).replace('\r\n', '\n'))
+        # reused with different initial values
+        r = va_common.prepare_cached_work_dir(
+            cache_dir, 'va_test', self._epicsdb(VAL=3.0), 'a')
+        self.assertEqual(r, (work_dir, True))
+        # new one for different schema
+        work_dir1, reuse = va_common.prepare_cached_work_dir(
+            cache_dir, 'va_test', self._epicsdb(DRVH=20.0), 'a')
+        self.assertFalse(reuse)
+        self.assertNotEqual(work_dir1, work_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+    def test_link_data_files(self):
+        data_dir = os.path.join(self.tmpdir, 'data')
+        work_dir = os.path.join(self.tmpdir, 'work')
+        os.makedirs(os.path.join(data_dir, 'subdir'))
+        os.makedirs(work_dir)
+        for f in ('a.dat', 'b.dat'):
+            with open(os.path.join(data_dir, f), 'w') as fp:
+                fp.write(f)
+        os.symlink(os.path.join(self.tmpdir, 'none'),
+                   os.path.join(work_dir, 'b.dat'))
+        for _ in range(2):
+            va_common.link_data_files(data_dir, work_dir)
+            self.assertEqual(sorted(os.listdir(work_dir)), ['a.dat', 'b.dat'])
+            for f in ('a.dat', 'b.dat'):
+                self.assertEqual(os.readlink(os.path.join(work_dir, f)),
+                                 os.path.join(data_dir, f))
+
+
+@unittest.skipIf(Machine is None, "FLAME is not installed")
+class TestFlameSegments(unittest.TestCase):
+    def setUp(self):
+        from phantasy.facility.frib.virtaccel import flame as va_flame
+        self.va = va_flame
+        with open(LATFILE, 'rb') as fp:
+            self.conf = Machine(fp).conf()
+        # two charge states
+        self.conf.update({'IonChargeStates': np.array([0.138, 0.140]),
+                          'NCharge': np.array([10111.0, 10531.0])})
+        self.conf['P1'] = self.conf['P0']
+        self.conf['S1'] = self.conf['S0']
+
+    def _full_propagate(self, m, outputs):
+        S = m.allocState({})
+        r = m.propagate(S, 0, len(m), observe=outputs)
+        return {i: self.va._state_components(s) for i, s in r}
+
+    def test_state_dict_round_trip(self):
+        m = Machine(self.conf)
+        S = m.allocState({})
+        m.propagate(S, 0, 200)
+        self.assertEqual(len(S.IonZ), 2)
+        d = pickle.loads(pickle.dumps(self.va._state_to_dict(S)))
+        S1 = self.va._state_from_dict(m, d)
+        for k in self.va._STATE_ATTRS:
+            self.assertTrue(np.allclose(getattr(S, k), getattr(S1, k)), k)
+        # continue propagation from both
+        m.propagate(S, 200, len(m) - 200)
+        m.propagate(S1, 200, len(m) - 200)
+        self.assertTrue(np.allclose(S.moment0, S1.moment0))
+        self.assertTrue(np.allclose(S.moment1, S1.moment1))
+        self.assertAlmostEqual(S.ref_IonEk, S1.ref_IonEk)
+
+    def test_segmented_propagation(self):
+        m = Machine(self.conf)
+        n = len(m)
+        outputs = [i for i in range(n) if m.conf(i)['type'] == 'bpm']
+        bounds = [(0, 300), (300, 700), (700, n)]
+        plan = _bpm_plan(self.conf)
+        self.assertEqual(sorted(plan.rows), outputs)
+        pool = self.va._SegmentPool(bounds, 50)
+        try:
+            pool.configure(self.conf, plan)
+            pool.submit()
+            pool.collect(plan, 60.0)
+            full = self._full_propagate(m, outputs)
+            self.assertTrue(np.allclose(
+                plan.data, [full[i] for i in outputs], equal_nan=True))
+
+            # change one corrector of the middle segment
+            idx = [i for i in range(400, 700)
+                   if m.conf(i)['type'] == 'orbtrim'][0]
+            pool.reconfigure(idx, {'theta_x': 0.001})
+            pool.submit()
+            pool.collect(plan, 60.0)
+            m.reconfigure(idx, {'theta_x': 0.001})
+            full = self._full_propagate(m, outputs)
+            self.assertTrue(np.allclose(
+                plan.data, [full[i] for i in outputs], equal_nan=True))
+        finally:
+            pool.close()
+
+
+@unittest.skipIf(Machine is None, "FLAME is not installed")
+class TestFlamePropagation(unittest.TestCase):
+    def setUp(self):
+        from phantasy.facility.frib.virtaccel import flame as va_flame
+        from phantasy.library.lattice import FlameLatticeFactory
+        self.va_flame = va_flame
+        with open(LATFILE, 'rb') as fp:
+            self.conf = Machine(fp).conf()
+        self.va = va_flame.VirtualAccelerator(
+            FlameLatticeFactory(None, settings={}), {}, 'VA', curdir,
+            checkpoint_interval=50)
+        elems = self.conf['elements']
+        self.outputs = [i for i, e in enumerate(elems) if e['type'] == 'bpm']
+        self.plan = _bpm_plan(self.conf)
+        # FLAME lattice elements, (name, type, conf, meta)
+        self.elements = [
+            (e['name'], e['type'],
+             {k: v for k, v in e.items() if k not in ('name', 'type')},
+             {'name': e['name']}) for e in elems]
+        self.corrector = [i for i, e in enumerate(elems)
+                          if e['type'] == 'orbtrim' and i > 500][0]
+
+    def _full_propagate(self, m):
+        S = m.allocState({})
+        r = m.propagate(S, 0, len(m), observe=range(len(m)))
+        return {i: s for i, s in r}
+
+    def _check_data(self, states):
+        self.assertTrue(np.allclose(
+            self.plan.data,
+            [self.va_flame._state_components(states[i]) for i in self.outputs],
+            equal_nan=True))
+
+    def test_resume(self):
+        m = Machine(self.conf)
+        checkpoints = {}
+        self.va._propagate(m, 0, checkpoints, self.plan)
+        self.assertEqual(sorted(checkpoints),
+                         list(range(50, len(m), 50)))
+        self._check_data(self._full_propagate(m))
+
+        idx = self.corrector
+        k = idx - idx % 50
+        last = dict(checkpoints)
+        m.reconfigure(idx, {'theta_x': 0.001})
+        starts = []
+        propagate = m.propagate
+
+        class _Machine(object):
+            # record the start index of propagation
+            def __len__(self):
+                return len(m)
+
+            def allocState(self, conf):
+                return m.allocState(conf)
+
+            def propagate(self, S, start, max):
+                starts.append(start)
+                return propagate(S, start, max)
+
+        self.va._propagate(_Machine(), idx, checkpoints, self.plan)
+        self.assertEqual(starts[0], k)
+        states = self._full_propagate(m)
+        self._check_data(states)
+        # upstream checkpoints are kept, downstream ones are rewritten
+        for i, S in checkpoints.items():
+            if i < k:
+                self.assertIs(S, last[i])
+            else:
+                self.assertIsNot(S, last[i])
+                # the state before propagating element i
+                self.assertTrue(np.allclose(S.moment0,
+                                            states[i - 1].moment0))
+                if i > idx:
+                    self.assertFalse(np.allclose(S.moment0,
+                                                 last[i].moment0))
+
+    def test_reconfigure(self):
+        m = Machine(self.conf)
+        confs = [e[2] for e in self.elements]
+        va = self.va
+        self.assertEqual(va._reconfigure(m, self.elements, confs, None), [])
+        # changed elements only
+        idx = self.corrector
+        elements = list(self.elements)
+        elements[idx] = elements[idx][:2] + (
+            dict(elements[idx][2], theta_x=0.001),) + elements[idx][3:]
+        self.assertEqual(va._reconfigure(m, elements, confs, None), [idx])
+        self.assertEqual(m.conf(idx)['theta_x'], 0.001)
+
+        # init beam config, applied on update, or the element reconfigured
+        p0 = self.conf['P0'] * 0.5
+        va._bsrc = {'index': 0, 'properties': {'P0': p0}}
+        confs = [e[2] for e in elements]
+        self.assertEqual(va._reconfigure(m, elements, confs, None), [0])
+        self.assertTrue(np.allclose(m.conf(0)['P0'], p0))
+        self.assertEqual(va._reconfigure(m, elements, confs, va._bsrc), [])
+        elements[0] = elements[0][:2] + (
+            dict(elements[0][2], P0=self.conf['P0'] * 2.0),) + elements[0][3:]
+        changed = va._reconfigure(m, elements, confs, va._bsrc)
+        self.assertEqual(min(changed), 0)
+        self.assertTrue(np.allclose(m.conf(0)['P0'], p0))
+        # new machine
+        m = Machine(self.conf)
+        self.assertEqual(va._reconfigure(m, elements, None, None), [0])
+        self.assertTrue(np.allclose(m.conf(0)['P0'], p0))
+
+
+@unittest.skipIf(Machine is None, "FLAME is not installed")
+class TestOutputPlan(unittest.TestCase):
+    def setUp(self):
+        from phantasy.facility.frib.virtaccel import flame as va_flame
+        from phantasy.library.lattice import FlameLatticeFactory
+        from phantasy.library.layout import BPMElement
+        from phantasy.library.layout import PMElement
+        self.va_flame = va_flame
+        self.bpm = BPMElement(0.0, 0.0, 0.0, 'BPM1')
+        self.pm = PMElement(0.0, 0.0, 0.0, 'PM1', sign=-1.0)
+        self.pm2 = PMElement(0.0, 0.0, 0.0, 'PM2', sign=1.0)
+        elemmap = {e.name: e for e in (self.bpm, self.pm, self.pm2)}
+        readfieldmap = {
+            'BPM1': {f: 'BPM1:' + f for f in
+                     ('XPOS', 'YPOS', 'PHASE', 'ENERGY')},
+            'PM1': {f: 'PM1:' + f for f in
+                    ('XCEN', 'YCEN', 'XRMS', 'YRMS', 'XY', 'XYRMS', 'CXY')},
+            'PM2': {f: 'PM2:' + f for f in
+                    ('XCEN', 'YCEN', 'XRMS', 'YRMS', 'XY', 'XYRMS', 'CXY')},
+        }
+        self.plan = va_flame._OutputPlan(
+            [None, 'PM1', 'D1', 'BPM1', 'PM2'], elemmap, readfieldmap)
+        self.va = va_flame.VirtualAccelerator(
+            FlameLatticeFactory(None, settings={}), {}, 'VA', curdir,
+            deadband=0.01)
+        self.va._published = {}
+
+    def _readbacks(self, elem, c):
+        # scalar formulas of readbacks, c: _STATE_COMPONENTS of elem
+        x, y, xrms, yrms, phis, ek, s00, s22, s02 = c
+        f = elem.fields
+        if elem.name.startswith('BPM'):
+            return {f.x_phy: x / 1.0e3, f.y_phy: y / 1.0e3,
+                    f.phase_phy: self.va_flame._normalize_phase(
+                        2.0 * phis * (180.0 / math.pi)),
+                    f.energy_phy: ek / 1.0e6}
+        sign = elem.sign
+        x_rms, y_rms = xrms / 1.0e3, yrms / 1.0e3
+        return {f.x: x / 1.0e3, f.y: y / 1.0e3, f.xrms: x_rms, f.yrms: y_rms,
+                f.xy: (sign * x / 1.0e3 + y / 1.0e3) / math.sqrt(2.0),
+                f.xyrms: 1.0e-3 * math.sqrt((s00 + s22) * 0.5 + sign * s02),
+                f.cxy: sign * s02 * 1e-6 / x_rms / y_rms}
+
+    def test_values(self):
+        plan = self.plan
+        self.assertEqual(plan.rows, {1: 0, 3: 1, 4: 2})
+        self.assertEqual(len(plan.channels), 18)
+        self.assertTrue(np.all(np.isnan(plan.values())))
+        rng = np.random.default_rng(2021)
+        for phis in (-7.0, -1.0, 0.5, 3.0, 12.0):
+            plan.data[:] = rng.uniform(0.5, 2.0, plan.data.shape)
+            plan.data[:, 4] = phis + rng.normal(size=3)
+            plan.data[:, 8] -= 1.0
+            expected = {}
+            for row, elem in enumerate((self.pm, self.bpm, self.pm2)):
+                for field, v in self._readbacks(
+                        elem, plan.data[row]).items():
+                    expected['{}:{}'.format(elem.name, field)] = v
+            self.assertEqual(sorted(plan.channels), sorted(expected))
+            self.assertTrue(np.allclose(
+                plan.values(), [expected[ch] for ch in plan.channels]))
+
+    def test_publish_deadband(self):
+        puts = []
+
+        class _Batch(dict):
+            def caput(self, **kws):
+                puts.append(dict(self))
+
+        names = ['A', 'B', 'C']
+        with mock.patch.object(self.va_flame.catools, 'CABatch', _Batch):
+            self.va._publish('readback', names, np.array([1.0, 2.0, 3.0]))
+            self.assertEqual(puts[-1], {'A': 1.0, 'B': 2.0, 'C': 3.0})
+            # changed beyond deadband only
+            self.va._publish('readback', names, np.array([1.005, 2.5, 3.0]))
+            self.assertEqual(puts[-1], {'B': 2.5})
+            # drift is compared with the last put value
+            self.va._publish('readback', names, np.array([1.011, 2.5, 3.0]))
+            self.assertEqual(puts[-1], {'A': 1.011})
+            n = len(puts)
+            self.va._publish('readback', names, np.array([1.011, 2.5, 3.0]))
+            self.assertEqual(len(puts), n)
+            # NaN is always put
+            self.va._publish('readback', names, np.array([1.011, np.nan, 3.0]))
+            self.assertEqual(list(puts[-1]), ['B'])
+            # groups are independent
+            self.va._publish('setting', names, np.array([1.0, 2.0, 3.0]))
+            self.assertEqual(len(puts[-1]), 3)
+            # no deadband
+            self.va._deadband = None
+            self.va._publish('setting', names, np.array([1.0, 2.0, 3.0]))
+            self.assertEqual(len(puts[-1]), 3)
+
+
+@unittest.skipIf(Machine is None, "FLAME is not installed")
+class TestSettingsArray(unittest.TestCase):
+    def setUp(self):
+        from phantasy.facility.frib.virtaccel import flame as va_flame
+        from phantasy.library.lattice import FlameLatticeFactory
+        settings = {'Q1': {'B2': 1.0}, 'Q2': {'B2': -2.0},
+                    'C1': {'TM': 0.001, 'L': 0.2}}
+        self.va = va_flame.VirtualAccelerator(
+            FlameLatticeFactory(None, settings={}), settings, 'VA', curdir,
+            noise=0.0)
+        for name, field in (('Q1', 'B2'), ('C1', 'TM'), ('Q2', 'B2')):
+            self.va.append_rw(name + ':CSET', name + ':RSET', name + ':RD',
+                              (name, field))
+        self.va._init_settings_array()
+
+    def test_init(self):
+        va = self.va
+        names = ['VA:Q1:{}', 'VA:C1:{}', 'VA:Q2:{}']
+        self.assertEqual(va._cset_names, [n.format('CSET') for n in names])
+        self.assertEqual(va._rset_names, [n.format('RSET') for n in names])
+        self.assertEqual(va._read_names, [n.format('RD') for n in names])
+        self.assertEqual(va._setting_values.tolist(), [1.0, 0.001, -2.0])
+
+    def test_cset_monitor(self):
+        va = self.va
+        va._settings_changed = False
+        va._handle_cset_monitor(0.002, 1)
+        self.assertTrue(va._settings_changed)
+        self.assertEqual(va._setting_values.tolist(), [1.0, 0.002, -2.0])
+        self.assertEqual(va._settings['C1'], {'TM': 0.002, 'L': 0.2})
+        self.assertEqual(va._settings['Q1'], {'B2': 1.0})
+        va._handle_cset_monitor(3.0, 2)
+        self.assertEqual(va._settings['Q2']['B2'], 3.0)
+        # copied settings follow the updates
+        settings, values = va._copy_settings_with_noise()
+        self.assertEqual(values.tolist(), [1.0, 0.002, 3.0])
+        self.assertEqual(settings['C1'], {'TM': 0.002, 'L': 0.2})
+        self.assertEqual(settings['Q2']['B2'], 3.0)
+
+    def test_no_noise(self):
+        va = self.va
+        settings, values = va._copy_settings_with_noise()
+        self.assertEqual(settings, va._settings)
+        self.assertIsNot(settings, va._settings)
+        self.assertTrue(np.array_equal(values, va._setting_values))
+
+    def test_noise(self):
+        va = self.va
+        va._noise = 0.01
+        settings, values = va._copy_settings_with_noise()
+        v0 = va._setting_values
+        self.assertFalse(np.array_equal(values, v0))
+        self.assertTrue(np.all(np.abs(values - v0) <= np.abs(v0) * 0.01))
+        self.assertEqual([settings[n][f] for n, f in va._setting_fields],
+                         values.tolist())
+        # not applied to the settings or the fields without CSET
+        self.assertEqual(va._settings['Q1'], {'B2': 1.0})
+        self.assertEqual(settings['C1']['L'], 0.2)
+
+
+@unittest.skipIf(Machine is None, "FLAME is not installed")
+class TestCycleStats(unittest.TestCase):
+    def setUp(self):
+        from phantasy.facility.frib.virtaccel import flame as va_flame
+        self.va_flame = va_flame
+
+    def _cycle(self, stats, t, stages):
+        # stages: list of (name, duration)
+        stats.start_cycle(t)
+        ticks = []
+        for _, dt in stages:
+            ticks.extend([0.0, dt])
+        with mock.patch.object(self.va_flame.time, 'perf_counter',
+                               side_effect=ticks):
+            for name, _ in stages:
+                with stats.stage(name):
+                    pass
+
+    def test_stages(self):
+        stats = self.va_flame._CycleStats()
+        self.assertEqual([k for k, _, _ in stats.CHANNELS],
+                         list(stats.values()))
+        # publish is entered twice per cycle
+        self._cycle(stats, 100.0, [('settings', 0.001), ('propagate', 0.1),
+                                   ('publish', 0.002), ('publish', 0.003)])
+        stats.end_cycle(0.2, 1.0)
+        r = stats.values()
+        self.assertAlmostEqual(r['T_SETTINGS'], 1.0)
+        self.assertAlmostEqual(r['T_PROPAGATE'], 100.0)
+        self.assertAlmostEqual(r['T_PUBLISH'], 5.0)
+        self.assertEqual(r['T_BUILD'], 0.0)
+        self.assertAlmostEqual(r['T_CYCLE'], 200.0)
+        self.assertEqual(r['RATE_RD'], 0.0)
+        # reset for a new cycle
+        self._cycle(stats, 100.5, [('publish', 0.001)])
+        r = stats.values()
+        self.assertEqual(r['T_SETTINGS'], 0.0)
+        self.assertEqual(r['T_PROPAGATE'], 0.0)
+        self.assertAlmostEqual(r['T_PUBLISH'], 1.0)
+        self.assertAlmostEqual(r['RATE_RD'], 2.0)
+
+    def test_stage_error(self):
+        stats = self.va_flame._CycleStats()
+        stats.start_cycle(0.0)
+        with mock.patch.object(self.va_flame.time, 'perf_counter',
+                               side_effect=[0.0, 0.5]):
+            with self.assertRaises(RuntimeError):
+                with stats.stage('build'):
+                    raise RuntimeError
+        self.assertAlmostEqual(stats.values()['T_BUILD'], 500.0)
+
+    def test_cycles(self):
+        stats = self.va_flame._CycleStats(window=10)
+        r = stats.values()
+        self.assertEqual((r['T_CYCLE'], r['T_CYCLE_P50'], r['T_CYCLE_P95'],
+                          r['DROPPED']), (0.0, 0.0, 0.0, 0))
+        # the oldest 5 cycles are out of window
+        delts = [5.0] * 5 + [0.1 * (i + 1) for i in range(10)]
+        for i, delt in enumerate(delts):
+            stats.start_cycle(i * 0.5)
+            stats.end_cycle(delt, 0.5)
+        r = stats.values()
+        window = np.array(delts[-10:]) * 1.0e3
+        self.assertAlmostEqual(r['T_CYCLE'], 1000.0)
+        self.assertAlmostEqual(r['T_CYCLE_P50'], np.percentile(window, 50))
+        self.assertAlmostEqual(r['T_CYCLE_P95'], np.percentile(window, 95))
+        self.assertAlmostEqual(r['RATE_RD'], 2.0)
+        # slower than 0.5 sec
+        self.assertEqual(r['DROPPED'], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
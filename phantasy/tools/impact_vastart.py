@@ -30,6 +30,7 @@ parser.add_argument("--start", help="name of accelerator element to start proces
 parser.add_argument("--end", help="name of accelerator element to end processing")
 parser.add_argument("--data", dest="datapath", help="path to directory with IMPACT data")
 parser.add_argument("--work", dest="workpath", help="path to directory for executing IMPACT")
+parser.add_argument("--cache", dest="cachepath", help="path to directory for cached working directories")
 
 
 print_help = parser.print_help
@@ -84,7 +85,8 @@ def main():
 
     try:
         va = build_impact_virtaccel(layout, config=config, channels=channels, settings=settings,
-                             start=args.start, end=args.end, data_dir=args.datapath, work_dir=args.workpath)
+                             start=args.start, end=args.end, data_dir=args.datapath, work_dir=args.workpath,
+                             cache_dir=args.cachepath)
     except Exception as e:
         if args.verbosity > 0: traceback.print_exc()
         print("Error building virtual accelerator:", e, file=sys.stderr)